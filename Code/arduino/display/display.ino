@@ -9,6 +9,17 @@
  This sketch displays text sent over the serial port
  (e.g. from the Serial Monitor) on an attached LCD.
 
+ The finger counter can also send compact binary frames, holding only the
+ fields that changed, which update the LCD without clearing it:
+   0xA5, length, flags, [mode], [value], crc
+ flags bit 0: the mode byte follows (0 decimal, 1 binary)
+ flags bit 1: the value follows, as an unsigned LEB128 varint of at most
+ 64 bits. A longer one shows "Too large" instead of a wrong number.
+ length counts the bytes from flags up to the crc, and the crc is CRC-8
+ (polynomial 0x07) over length and those bytes. The counter asks for this
+ format by sending the lines "Protocol:" and "binary1", and this sketch
+ answers "BIN1". Any other text is shown as before.
+
  The circuit:
  * LCD RS pin to digital pin 12
  * LCD Enable pin to digital pin 11
@@ -48,22 +59,126 @@
 const int rs = 12, en = 11, d4 = 10, d5 = 9, d6 = 6, d7 = 5;
 LiquidCrystal lcd(rs, en, d4, d5, d6, d7);
 
+const int LCD_COLUMNS = 16;
+const byte SYNC = 0xA5;
+const byte FLAG_MODE = 0x01;
+const byte FLAG_VALUE = 0x02;
+const int MAX_FRAME = 16;  // MAX_LENGTH in serial_protocol.py
+const char *MODES[] = {"Decimal:", "Binary:"};
+
 void setup() {
   // set up the LCD's number of columns and rows:
-  lcd.begin(16, 2);
+  lcd.begin(LCD_COLUMNS, 2);
   // initialize the serial communications:
   Serial.begin(115200);
+  Serial.setTimeout(100);
 }
 
-void loop() {
+// CRC-8 with the polynomial 0x07, the same as serial_protocol.py
+byte crc8(const byte *data, int length) {
+  byte crc = 0;
+  for (int i = 0; i < length; i++) {
+    crc ^= data[i];
+    for (int bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x80) ? (crc << 1) ^ 0x07 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+// Writes text to a whole row, padding with spaces instead of clearing
+void printRow(int row, const char *text) {
+  char padded[LCD_COLUMNS + 1];
+  snprintf(padded, sizeof(padded), "%-16s", text);
+  lcd.setCursor(0, row);
+  lcd.print(padded);
+}
+
+void printValue(uint64_t value) {
+  char digits[21];
+  int i = sizeof(digits) - 1;
+  digits[i] = '\0';
+  do {
+    digits[--i] = '0' + value % 10;
+    value /= 10;
+  } while (value > 0);
+  printRow(1, &digits[i]);
+}
+
+// Reads one binary frame and updates the rows whose fields it holds.
+// Frames that are cut off or fail the check are dropped.
+void readFrame() {
+  byte frame[MAX_FRAME + 1];
+  Serial.read();  // SYNC
+  if (Serial.readBytes(frame, 1) != 1 || frame[0] < 1 ||
+      frame[0] > MAX_FRAME) {
+    return;
+  }
+  int length = frame[0];
+  byte crc;
+  if (Serial.readBytes(&frame[1], length) != (size_t) length ||
+      Serial.readBytes(&crc, 1) != 1 || crc8(frame, length + 1) != crc) {
+    return;
+  }
+  byte flags = frame[1];
+  int index = 2;
+  if (flags & FLAG_MODE) {
+    if (index > length || frame[index] > 1) {
+      return;
+    }
+    printRow(0, MODES[frame[index++]]);
+  }
+  if (flags & FLAG_VALUE) {
+    uint64_t value = 0;
+    for (int shift = 0; index <= length; shift += 7) {
+      byte part = frame[index++];
+      // The tenth byte only has room for bit 63, anything more would be
+      // cut off and show the wrong number
+      if (shift == 63 && part > 1) {
+        printRow(1, "Too large");
+        return;
+      }
+      value |= (uint64_t) (part & 0x7F) << shift;
+      if (!(part & 0x80)) {
+        printValue(value);
+        return;
+      }
+    }
+  }
+}
+
+// Reads a line, waiting for it to start arriving. Once it has started,
+// the serial timeout ends a line that is cut off.
+String readLine() {
   while(!Serial.available());
+  return Serial.readStringUntil('\n');
+}
+
+// Shows the counting type and number sent as two lines of text, echoing
+// them back
+void showText(String dataType, String numVal) {
   lcd.clear();
-  String dataType = Serial.readStringUntil('\n');
   Serial.println(dataType);
   lcd.print(dataType);
-  while(!Serial.available());
   lcd.setCursor(0, 1);
-  String numVal = Serial.readStringUntil('\n');
   Serial.println(numVal);
   lcd.print(numVal);
 }
+
+void loop() {
+  while(!Serial.available());
+  if (Serial.peek() == SYNC) {
+    readFrame();
+    return;
+  }
+  // Both lines are read before looking at them, since the second one
+  // may not have arrived when the first has been read
+  String dataType = readLine();
+  String numVal = readLine();
+  if (dataType == "Protocol:" && numVal == "binary1") {
+    Serial.println("BIN1");
+    lcd.clear();
+    return;
+  }
+  showText(dataType, numVal);
+}
@@ -0,0 +1,103 @@
+"""
+Measures the memory allocated for each frame between reading it from a video
+and counting its fingers, with and without the pooled buffers. A stub model
+that always finds the same hand stands in for HANDS, so only the frame
+handling is measured. The tracked case runs inference every fifth frame and
+follows the hands with optical flow in between.
+
+Run from the Code directory:
+    python benchmarks/frame_allocations.py
+"""
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import argparse
+import sys
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# pylint: disable=wrong-import-position
+from benchmarks.stubs import StubHands, write_video  # noqa: E402
+from buffers import BufferPool, PooledReader  # noqa: E402
+from detector import HandDetector  # noqa: E402
+from main import process_frame  # noqa: E402
+from sources import VideoFileSource  # noqa: E402
+from tracking import LandmarkTracker  # noqa: E402
+
+
+def measure(path, pooled, mirror=False, detect_every=1, warm_up=5):
+    """
+    Reads and processes every frame of a video, tracking the peak memory
+    allocated while handling each one.
+
+    Parameter:
+        path (str): the video file
+        pooled (bool): read and flip into pooled buffers
+        mirror (bool): mirror the landmarks instead of flipping the frame
+        detect_every (int): track the hands between inference frames when
+                            more than 1
+        warm_up (int): frames left out while the buffers are first allocated
+
+    return (list): bytes allocated at the peak of each measured frame
+    """
+    source = VideoFileSource(path)
+    detector = HandDetector(StubHands())
+    if detect_every > 1:
+        detector.tracker = LandmarkTracker(detect_every)
+    pool = BufferPool() if pooled else None
+    read = PooledReader(source, pool).read if pooled else source.read
+    peaks = []
+    frame_index = 0
+    tracemalloc.start()
+    try:
+        while True:
+            before, _peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            success, frame = read()
+            if not success:
+                break
+            result = process_frame(frame, frame_index, detector, mirror,
+                                   pool)
+            if pool is not None:
+                pool.release(result.image)
+            del frame, result
+            if frame_index >= warm_up:
+                peaks.append(tracemalloc.get_traced_memory()[1] - before)
+            frame_index += 1
+    finally:
+        tracemalloc.stop()
+        source.release()
+    return peaks
+
+
+def main(argv=None):
+    """
+    Prints the mean and largest allocation per frame for each mode.
+
+    Parameter:
+        argv (list): the command line arguments
+
+    return: None
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--size", type=int, nargs=2, default=(480, 640),
+                        metavar=("HEIGHT", "WIDTH"))
+    args = parser.parse_args(argv)
+    with TemporaryDirectory() as directory:
+        path = str(Path(directory) / "frames.avi")
+        write_video(path, args.frames, args.size)
+        for name, pooled, mirror, detect_every in (
+                ("allocating", False, False, 1),
+                ("pooled", True, False, 1),
+                ("pooled + mirror", True, True, 1),
+                ("pooled + tracked", True, False, 5)):
+            peaks = measure(path, pooled, mirror, detect_every)
+            print(f"{name:>16}: {np.mean(peaks) / 1024:9.1f} KiB mean, "
+                  f"{max(peaks) / 1024:9.1f} KiB max per frame")
+
+
+if __name__ == "__main__":
+    main()
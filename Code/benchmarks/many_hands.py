@@ -0,0 +1,119 @@
+"""
+Times counting the fingers of one frame as the number of hands grows, with
+finger_counter and with the per-hand loop it replaced. The loop counted the
+sideways hands after each hand again and added each finger's power of two
+separately, so its cost grew with the square of the hands. finger_counter
+finds the fingers of every hand in one vectorised step, then shifts a 5-bit
+mask per hand as it sums the upright hands from the right, so its cost stays
+close to flat.
+
+Run from the Code directory:
+    python benchmarks/many_hands.py
+"""
+from functools import partial
+from pathlib import Path
+import argparse
+import sys
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# pylint: disable=wrong-import-position
+from benchmarks.stubs import generate_landmarks  # noqa: E402
+from benchmarks.suite import time_call  # noqa: E402
+from counting import (collect_finger_points,  # noqa: E402
+                      convert_coords_to_pixels, finger_counter)
+
+IMAGE_SHAPE = (1080, 1920, 3)
+HAND_COUNTS = (1, 2, 4, 8, 12, 16, 32, 64)
+
+
+def per_hand_counter(finger_list, hand_sideways):
+    """
+    The per-hand loop finger_counter used to run, kept to compare against.
+    Each hand takes the slot after the upright hands to its right.
+
+    Parameter:
+        finger_list (ndarray): (num_hands, 5, 2) tip and joint positions
+        hand_sideways (list): booleans relating to if the hand is
+                              sideways/downwards
+
+    return (tuple): Number of fingers up, binary count
+    """
+    binary = 0
+    decimal = 0
+    for hand_index, hand in enumerate(finger_list):
+        upright_after = len(hand_sideways) - hand_index - 1 - int(
+            np.count_nonzero(hand_sideways[hand_index + 1:]))
+        exponent = (upright_after + 1) * len(hand) - 1
+        for finger_index, finger in enumerate(hand):
+            if finger[0] > finger[1]:
+                if not hand_sideways[hand_index]:
+                    binary += 2**(exponent - finger_index)
+                decimal += 1
+    return decimal, binary
+
+
+def frame_inputs(num_hands, seed=0):
+    """
+    Builds a frame's finger positions with about one hand in four sideways.
+
+    Parameter:
+        num_hands (int): number of hands
+        seed (int): seed of the random generator
+
+    return (tuple): the (num_hands, 5, 2) finger positions and the sideways
+                    flags
+    """
+    hand_list = convert_coords_to_pixels(generate_landmarks(num_hands, seed),
+                                         IMAGE_SHAPE)
+    hand_sideways = np.random.default_rng(seed).random(num_hands) < 0.25
+    return collect_finger_points(hand_list), hand_sideways
+
+
+def run(hand_counts=HAND_COUNTS, repeat=5):
+    """
+    Times both ways of counting for each number of hands, checking they
+    agree.
+
+    Parameter:
+        hand_counts (tuple): the numbers of hands
+        repeat (int): runs of each timing
+
+    return (dict): best time of a call in microseconds, keyed by the way of
+                   counting and then the number of hands
+    """
+    results = {"finger_counter": {}, "per_hand_counter": {}}
+    for num_hands in hand_counts:
+        inputs = frame_inputs(num_hands)
+        assert finger_counter(*inputs) == per_hand_counter(*inputs)
+        for name, counter in (("finger_counter", finger_counter),
+                              ("per_hand_counter", per_hand_counter)):
+            results[name][num_hands] = time_call(
+                partial(counter, *inputs), repeat)["best_us"]
+    return results
+
+
+def main(argv=None):
+    """
+    Prints the time of each way of counting by number of hands.
+
+    Parameter:
+        argv (list): the command line arguments
+
+    return: None
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hands", type=int, nargs="+", default=HAND_COUNTS)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    results = run(args.hands, args.repeat)
+    print(f"{'hands':>18}" + "".join(f"{hands:>9}" for hands in args.hands))
+    for name, timings in results.items():
+        print(f"{name:>18}" + "".join(f"{timings[hands]:>8.1f}u"
+                                      for hands in args.hands))
+
+
+if __name__ == "__main__":
+    main()
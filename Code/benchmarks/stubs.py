@@ -0,0 +1,98 @@
+"""
+Stand-ins used by the benchmarks: a model that finds the same hands in every
+image without running anything, generated landmarks and synthetic videos.
+"""
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+NUM_LANDMARKS = 21
+
+
+def generate_landmarks(num_hands, seed=0):
+    """
+    Builds random normalised landmarks, with each hand in its own strip of
+    the frame so they are ordered left to right like real hands.
+
+    Parameter:
+        num_hands (int): number of hands
+        seed (int): seed of the random generator
+
+    return (ndarray): (num_hands, 21, 3) normalised landmarks
+    """
+    rng = np.random.default_rng(seed)
+    landmarks = rng.uniform(0.0, 1.0, (num_hands, NUM_LANDMARKS, 3))
+    width = 1 / max(num_hands, 1)
+    landmarks[..., 0] = (np.arange(num_hands)[:, None] +
+                         landmarks[..., 0]) * width
+    landmarks[..., 2] = 0.0
+    return landmarks
+
+
+class StubHands:
+    """Finds the same hands in every image, without running a model."""
+
+    def __init__(self, num_hands=1, seed=0):
+        """
+        Parameter:
+            num_hands (int): number of hands found in every image
+            seed (int): seed of the generated landmarks
+        """
+        if num_hands == 1 and seed == 0:
+            # An open hand held upright in the middle of the frame
+            points = np.zeros((1, NUM_LANDMARKS, 2))
+            points[0, :, 0] = np.linspace(0.4, 0.6, NUM_LANDMARKS)
+            points[0, :, 1] = np.linspace(0.8, 0.2, NUM_LANDMARKS)
+        else:
+            points = generate_landmarks(num_hands, seed)[..., :2]
+        self._result = SimpleNamespace(
+            multi_hand_landmarks=[
+                SimpleNamespace(landmark=[
+                    SimpleNamespace(x=x, y=y, z=0.0) for x, y in hand])
+                for hand in points.tolist()],
+            multi_handedness=None)
+
+    def process(self, _image):
+        """
+        Parameter:
+            _image (ndarray): the RGB image, which is ignored
+
+        return (SimpleNamespace): results shaped like MediaPipe's
+        """
+        return self._result
+
+
+def random_frames(num_frames, shape, seed=0):
+    """
+    Builds random BGR frames.
+
+    Parameter:
+        num_frames (int): number of frames
+        shape (tuple): (height, width) of the frames
+        seed (int): seed of the random generator
+
+    return (list): the frames
+    """
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, (*shape, 3), np.uint8)
+            for _ in range(num_frames)]
+
+
+def write_video(path, num_frames, shape):
+    """
+    Writes a video of random frames.
+
+    Parameter:
+        path (str): the video file to write
+        num_frames (int): number of frames
+        shape (tuple): (height, width) of the frames
+
+    return: None
+    """
+    height, width = shape
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30,
+                             (width, height))
+    for frame in random_frames(num_frames, shape):
+        writer.write(frame)
+    writer.release()
@@ -0,0 +1,276 @@
+"""
+Benchmarks for the finger counter. The microbenchmarks time each step of
+counting the fingers over generated landmarks with one to max_hands hands.
+The end to end benchmark runs frames through the same pipeline as main, with
+a stub in place of HANDS.process, and reports the frames per second.
+
+The results are saved as JSON, and can be compared with an earlier run to
+catch regressions.
+
+Run from the Code directory:
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --compare results.json
+"""
+from datetime import datetime, timezone
+from functools import partial
+from itertools import cycle, islice
+from pathlib import Path
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import timeit
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# pylint: disable=wrong-import-position
+from benchmarks.stubs import (StubHands, generate_landmarks,  # noqa: E402
+                              random_frames)
+from buffers import BufferPool, PooledReader  # noqa: E402
+from counting import (collect_finger_points,  # noqa: E402
+                      convert_coords_to_pixels, finger_counter,
+                      is_hand_sideways)
+from detector import HandDetector  # noqa: E402
+from main import (draw_hands, print_hand_number, process_frame,  # noqa: E402
+                  release_result)
+from pipeline import FramePipeline  # noqa: E402
+from sources import ArraySource, VideoFileSource  # noqa: E402
+
+IMAGE_SHAPE = (480, 640, 3)
+DISTINCT_FRAMES = 8  # Synthetic videos loop over this many frames
+
+
+def counting_steps(num_hands):
+    """
+    Prepares the inputs of each counting step for a number of hands.
+
+    Parameter:
+        num_hands (int): number of hands in the generated landmarks
+
+    return (dict): the step's name and a function that runs it once
+    """
+    landmarks = generate_landmarks(num_hands)
+    image = np.zeros(IMAGE_SHAPE, dtype=np.uint8)
+    hand_list = convert_coords_to_pixels(landmarks, image)
+    finger_list = collect_finger_points(hand_list)
+    hand_sideways = is_hand_sideways(hand_list)
+    return {
+        "convert_coords_to_pixels":
+            partial(convert_coords_to_pixels, landmarks, image),
+        "collect_finger_points": partial(collect_finger_points, hand_list),
+        "finger_counter": partial(finger_counter, finger_list, hand_sideways),
+        "is_hand_sideways": partial(is_hand_sideways, hand_list),
+        "print_hand_number": partial(print_hand_number, image, hand_list,
+                                     hand_sideways, False),
+    }
+
+
+def time_call(function, repeat=5):
+    """
+    Times a function, calling it enough times for each run to take at least
+    0.2 seconds.
+
+    Parameter:
+        function (callable): called without arguments
+        repeat (int): number of runs
+
+    return (dict): the best and median time of a call in microseconds and
+                   the number of calls in each run
+    """
+    timer = timeit.Timer(function)
+    number, _seconds = timer.autorange()
+    calls = [seconds / number * 1e6
+             for seconds in timer.repeat(repeat, number)]
+    return {"best_us": min(calls), "median_us": statistics.median(calls),
+            "calls": number}
+
+
+def run_micro(max_hands, repeat=5):
+    """
+    Times every counting step with one to max_hands hands.
+
+    Parameter:
+        max_hands (int): the largest number of hands
+        repeat (int): number of runs of each step
+
+    return (dict): the timings of each step, keyed by its name and then the
+                   number of hands
+    """
+    results = {}
+    for num_hands in range(1, max_hands + 1):
+        for name, step in counting_steps(num_hands).items():
+            results.setdefault(name, {})[str(num_hands)] = time_call(
+                step, repeat)
+    return results
+
+
+def run_end_to_end(num_frames=300, num_hands=2, video=None, draw=False):
+    """
+    Runs frames through the capture and inference threads and counts them,
+    with a stub finding the hands.
+
+    Parameter:
+        num_frames (int): frames in the synthetic video
+        num_hands (int): hands the stub finds in each frame
+        video (str): a recorded video to read instead of synthetic frames
+        draw (bool): also draw the hands, like the window does
+
+    return (dict): the frames processed, the time taken and the frame rate
+    """
+    if video:
+        source = VideoFileSource(video)
+    else:
+        frames = random_frames(DISTINCT_FRAMES, IMAGE_SHAPE[:2])
+        source = ArraySource(islice(cycle(frames), num_frames))
+    detector = HandDetector(StubHands(num_hands))
+    pool = BufferPool()
+    pipeline = FramePipeline(
+        PooledReader(source, pool).read,
+        partial(process_frame, detector=detector, pool=pool),
+        drop_frames=False, pass_frame_index=True,
+        release_frame=pool.release,
+        release_result=partial(release_result, pool))
+    processed = 0
+    start = time.perf_counter()
+    pipeline.start()
+    try:
+        for _frame_index, frame in pipeline.indexed():
+            if draw:
+                draw_hands(frame, True)
+            processed += 1
+    finally:
+        pipeline.stop()
+        source.release()
+    seconds = time.perf_counter() - start
+    return {"source": video or "synthetic", "hands": num_hands,
+            "draw": draw, "frames": processed, "seconds": seconds,
+            "fps": processed / seconds}
+
+
+def environment():
+    """
+    return (dict): what the benchmarks were run on
+    """
+    return {"time": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "numpy": np.__version__, "opencv": cv2.__version__}
+
+
+def compare(baseline, results, tolerance=0.25):
+    """
+    Finds the benchmarks that are slower than in an earlier run.
+
+    Parameter:
+        baseline (dict): the earlier results
+        results (dict): the new results
+        tolerance (float): slowdown allowed before it counts as a regression
+
+    return (list): a description of each regression
+    """
+    regressions = []
+    for name, timings in results["micro"].items():
+        for num_hands, timing in timings.items():
+            old = baseline.get("micro", {}).get(name, {}).get(num_hands)
+            if old and timing["best_us"] > old["best_us"] * (1 + tolerance):
+                regressions.append(
+                    f"{name} with {num_hands} hands: {old['best_us']:.2f} us"
+                    f" -> {timing['best_us']:.2f} us")
+    old_runs = {(run["source"], run["hands"], run["draw"]): run
+                for run in baseline.get("end_to_end", [])}
+    for run in results["end_to_end"]:
+        old = old_runs.get((run["source"], run["hands"], run["draw"]))
+        if old and run["fps"] * (1 + tolerance) < old["fps"]:
+            regressions.append(
+                f"end to end with {run['hands']} hands: "
+                f"{old['fps']:.1f} fps -> {run['fps']:.1f} fps")
+    return regressions
+
+
+def print_results(results):
+    """
+    Prints a summary of the results.
+
+    Parameter:
+        results (dict): the benchmark results
+
+    return: None
+    """
+    for name, timings in results["micro"].items():
+        best = ", ".join(f"{num_hands}: {timing['best_us']:.2f}"
+                         for num_hands, timing in timings.items())
+        print(f"{name:>25} (us by hands) {best}")
+    for run in results["end_to_end"]:
+        print(f"{'end to end':>25} {run['hands']} hands"
+              f"{', drawn' if run['draw'] else ''}: {run['fps']:.1f} fps")
+
+
+def parse_args(argv=None):
+    """
+    Reads the command line options.
+
+    Parameter:
+        argv (list): the arguments, sys.argv is used when None
+
+    return (Namespace): the parsed options
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--max-hands", type=int, default=4,
+                        help="time the counting with 1 to this many hands")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="runs of each microbenchmark")
+    parser.add_argument("--frames", type=int, default=300,
+                        help="frames in the synthetic video")
+    parser.add_argument("--video",
+                        help="recorded video to use instead of synthetic "
+                             "frames")
+    parser.add_argument("--skip-end-to-end", action="store_true",
+                        help="only run the microbenchmarks")
+    parser.add_argument("--output", help="JSON file to save the results to")
+    parser.add_argument("--compare",
+                        help="JSON results of an earlier run, exits with an "
+                             "error if anything is slower")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="slowdown allowed when comparing, as a fraction")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Runs the benchmarks, then saves and compares the results.
+
+    Parameter:
+        argv (list): the command line arguments
+
+    return (dict): the results
+    """
+    args = parse_args(argv)
+    results = {"environment": environment(),
+               "micro": run_micro(args.max_hands, args.repeat),
+               "end_to_end": []}
+    if not args.skip_end_to_end:
+        for num_hands in (1, 2):
+            for draw in (False, True):
+                results["end_to_end"].append(run_end_to_end(
+                    args.frames, num_hands, args.video, draw))
+    print_results(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    if args.compare:
+        regressions = compare(json.loads(Path(args.compare).read_text()),
+                              results, args.tolerance)
+        for regression in regressions:
+            print(f"Slower: {regression}")
+        if regressions:
+            sys.exit(1)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Reuses the image arrays that each frame is read, flipped and converted into,
+so once the pipeline is running no new frame sized arrays are allocated.
+"""
+import sys
+import threading
+
+import numpy as np
+
+
+def _free_refcount():
+    """
+    Finds the reference count of a pooled buffer that nothing else is
+    using, which is what sys.getrefcount reports once it has been taken off
+    the pool's free list.
+
+    return (int): the reference count of an unused buffer
+    """
+    free = [np.empty(0)]
+    buffer = free.pop()
+    return sys.getrefcount(buffer)
+
+
+FREE_REFCOUNT = _free_refcount()
+
+
+class BufferPool:
+    """
+    Hands out arrays that have been given back. Each buffer belongs to
+    whoever acquired it until it is released, so the stages of the pipeline
+    release a frame's buffers once they have finished with the frame. The
+    pool only grows to the number of frames that are in flight at once, and
+    can be shared by the threads of the pipeline.
+    """
+
+    def __init__(self, check=False):
+        """
+        Parameter:
+            check (bool): assert that nothing still refers to a buffer when
+                          it is handed out again, which finds buffers
+                          released too early while debugging
+        """
+        self.check = check
+        self._free = []
+        self._in_use = {}  # The buffers handed out, by id
+        self._lock = threading.Lock()
+
+    def acquire(self, shape, dtype=np.uint8):
+        """
+        Returns a released buffer, allocating one only if none is free.
+
+        Parameter:
+            shape (tuple): shape of the buffer
+            dtype (dtype): type of the buffer's elements
+
+        return (ndarray): an uninitialised buffer, to be given back with
+                          release
+        """
+        with self._lock:
+            index = next((index for index, free in enumerate(self._free)
+                          if free.shape == shape and free.dtype == dtype),
+                         None)
+            buffer = None if index is None else self._free.pop(index)
+        if buffer is None:
+            buffer = np.empty(shape, dtype)
+        elif self.check:
+            assert sys.getrefcount(buffer) == FREE_REFCOUNT, \
+                "a released buffer is still in use"
+        with self._lock:
+            self._in_use[id(buffer)] = buffer
+        return buffer
+
+    def release(self, buffer):
+        """
+        Gives a buffer back, so it can be handed out again. Arrays that
+        didn't come from the pool are ignored.
+
+        Parameter:
+            buffer (ndarray): a buffer from acquire
+
+        return: None
+        """
+        with self._lock:
+            buffer = self._in_use.pop(id(buffer), None)
+            if buffer is not None:
+                self._free.append(buffer)
+
+    def __len__(self):
+        return len(self._free) + len(self._in_use)
+
+
+class PooledReader:
+    """
+    Reads a source's frames into pooled buffers. Each frame's buffer is
+    released to the pool once the frame is finished with. Sources that
+    can't read into a buffer, such as image files, still allocate each
+    frame.
+    """
+
+    def __init__(self, source, pool=None):
+        """
+        Parameter:
+            source (FrameSource): the source to read from
+            pool (BufferPool): where the buffers come from, a new pool
+                               when None
+        """
+        self.source = source
+        self.pool = BufferPool() if pool is None else pool
+        self._shape = None
+
+    def read(self):
+        """
+        return (tuple): success bool and the frame array
+        """
+        buffer = None
+        if self._shape is not None:
+            buffer = self.pool.acquire(self._shape)
+        success, frame = self.source.read(buffer)
+        if buffer is not None and (not success or frame is not buffer):
+            self.pool.release(buffer)
+        if success:
+            self._shape = frame.shape
+        return success, frame
+
+    def release(self):
+        """
+        Releases the source.
+
+        return: None
+        """
+        self.source.release()
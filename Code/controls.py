@@ -0,0 +1,82 @@
+"""
+The keys that control the finger counter. The window reads them through
+cv2.waitKey, while headless mode takes them from stdin and signals:
+
+    q: quit (also SIGINT and SIGTERM)
+    b: count in binary
+    d: count in decimal
+    t: toggle between decimal and binary (also SIGUSR1)
+"""
+from queue import SimpleQueue
+from threading import Thread
+import signal
+import sys
+
+SIGNAL_TOGGLE = getattr(signal, "SIGUSR1", None)  # Not on Windows
+
+
+def handle_key(pressed_key, count_decimal, success):
+    """
+    This applies a key press to the counting mode and running state. The
+    keys are the same whether they come from the window or from stdin.
+
+    Parameter:
+        pressed_key (int): code of the key that was pressed
+        count_decimal (bool): Determines if counting in decimal or binary
+        success (bool): Determines if program continues
+
+    return (tuple): boolean values
+    """
+    if pressed_key == ord('q'):
+        success = False
+    elif pressed_key == ord('b'):
+        count_decimal = False
+    elif pressed_key == ord('d'):
+        count_decimal = True
+    elif pressed_key == ord('t'):
+        count_decimal = not count_decimal
+    return count_decimal, success
+
+
+def start_headless_input():
+    """
+    Without a window there is no cv2.waitKey, so the keys are read from
+    stdin on a background thread instead. SIGINT and SIGTERM quit the
+    program and SIGUSR1 toggles between decimal and binary.
+
+    return (SimpleQueue): receives the code of each key that is pressed
+    """
+    keys = SimpleQueue()
+
+    def read_stdin():
+        for line in sys.stdin:
+            for key in line.strip():
+                keys.put(ord(key))
+
+    def on_signal(signal_number, _frame):
+        keys.put(ord('t') if signal_number == SIGNAL_TOGGLE else ord('q'))
+
+    Thread(target=read_stdin, name="stdin", daemon=True).start()
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+    if SIGNAL_TOGGLE is not None:
+        signal.signal(SIGNAL_TOGGLE, on_signal)
+    return keys
+
+
+def headless_input(keys, count_decimal, success):
+    """
+    This handles every key that has arrived from stdin or a signal since the
+    last frame.
+
+    Parameter:
+        keys (SimpleQueue): key codes from start_headless_input
+        count_decimal (bool): Determines if counting in decimal or binary
+        success (bool): Determines if program continues
+
+    return (tuple): boolean values
+    """
+    while not keys.empty():
+        count_decimal, success = handle_key(keys.get(), count_decimal,
+                                            success)
+    return count_decimal, success
@@ -0,0 +1,70 @@
+"""
+Writes the count of every processed frame to a CSV or JSON lines file, so
+recorded sessions can be scored and compared offline.
+"""
+import csv
+import json
+from pathlib import Path
+import time
+
+FIELDS = ["frame", "time", "hands", "decimal", "binary"]
+
+
+class CountWriter:
+    """
+    Writes one row per frame. The format is picked from the file extension:
+    .csv for CSV and anything else for JSON lines.
+    """
+
+    def __init__(self, path):
+        """
+        Parameter:
+            path (str): the file the counts are written to
+        """
+        self.path = Path(path)
+        self.is_csv = self.path.suffix.lower() == ".csv"
+        self.start_time = time.monotonic()
+        # pylint: disable-next=consider-using-with
+        self._file = open(self.path, "w", newline="", encoding="utf-8")
+        self._csv = None
+        if self.is_csv:
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(FIELDS)
+
+    def write(self, frame_index, num_hands, decimal, binary,
+              timestamp=None):
+        """
+        Writes the count for one frame.
+
+        Parameter:
+            frame_index (int): number of the frame in its source
+            num_hands (int): number of hands found in the frame
+            decimal (int): number of fingers up
+            binary (int): binary count of the fingers
+            timestamp (float): seconds into the source, or None to use the
+                               time since the writer was opened
+
+        return: None
+        """
+        if timestamp is None:
+            timestamp = time.monotonic() - self.start_time
+        row = [int(frame_index), round(timestamp, 6), int(num_hands),
+               int(decimal), int(binary)]
+        if self._csv:
+            self._csv.writerow(row)
+        else:
+            self._file.write(json.dumps(dict(zip(FIELDS, row))) + "\n")
+
+    def close(self):
+        """
+        Flushes and closes the file.
+
+        return: None
+        """
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc_info):
+        self.close()
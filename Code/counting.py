@@ -0,0 +1,321 @@
+"""
+The finger counting logic: turning the landmarks into pixel positions,
+finding which fingers are up and which hands are sideways, and counting
+them. It only needs NumPy, so the tests and batch workers can import it in
+milliseconds without loading OpenCV, MediaPipe or the serial port.
+"""
+import numpy as np
+
+FINGER_COORD = [(8, 6), (12, 10), (16, 14), (20, 18)]
+THUMB_COORD = [(4, 5), ]  # Thumb tip and index MCP
+WRIST = 0
+THUMB_CMC = 1
+THUMB_MCP = 2
+PINKY_MCP = 17
+NUM_LANDMARKS = 21
+FOCAL_INDICES = [PINKY_MCP, WRIST, WRIST, WRIST, WRIST]  # thumb then fingers
+
+
+def landmarks_to_array(hand_lms):
+    """
+    Copies the normalised x, y and z values of every landmark out of the
+    MediaPipe results into a single array.
+
+    Parameter:
+        hand_lms (list): list containing x, y, z  of finger points
+
+    return (ndarray): float array with the shape (num_hands, 21, 3)
+    """
+    return np.array(
+        [[(landmark.x, landmark.y, landmark.z)
+          for landmark in hand_landmarks.landmark]
+         for hand_landmarks in hand_lms],
+        dtype=np.float64).reshape(-1, NUM_LANDMARKS, 3)
+
+
+def convert_coords_to_pixels(hand_lms, image):
+    """
+    Convert each of the co-ordinates for every landmark to pixel
+    positions
+
+    Parameter:
+        hand_lms (list): list containing x, y, z  of finger points, or an
+                         array of them from landmarks_to_array
+        image (array): array containing content about the image, or just
+                       the image's shape
+
+    return (ndarray): int32 array with the shape (num_hands, 21, 2)
+                      containing the finger points in pixels
+    """
+    height, width = getattr(image, "shape", image)[:2]
+    if isinstance(hand_lms, np.ndarray):
+        landmarks = hand_lms
+    else:
+        landmarks = landmarks_to_array(hand_lms)
+    hand_array = (landmarks[..., :2] * (width, height)).astype(np.int32)
+    return order_hands(hand_array)
+
+
+def wrist_position(hand):
+    """
+
+    Parameter:
+        hand (list): contains tuple that has each joints co-ordinates
+
+    return (int): int value relating to the wrist x-position
+    """
+    return hand[0][0]
+
+
+def order_hands(hand_list):
+    """
+    This orders the hand in the order they appear from left to right. This is
+    done by comparing the x-values of each hand's wrist.
+
+    Parameter:
+        hand_list (ndarray): array containing the finger points in pixels
+
+    return (ndarray): hand_list ordered with hands from left to right
+    """
+    hand_list = np.asarray(hand_list)
+    return hand_list[np.argsort(hand_list[:, WRIST, 0], kind="stable")]
+
+
+def relative_finger_positions(hand_list, finger_coord, focal_index):
+    """
+    Vectorised form of finger_position_relative_to_focal_point. It works on
+    every hand at once, taking the largest of the x/y distance between each
+    joint and the focal point of its finger.
+
+    Parameter:
+        hand_list (ndarray): array with the shape (num_hands, 21, 2)
+        finger_coord (list): contains tuple containing the indices that are
+                             compared for the fingers/thumb.
+        focal_index (array): focal landmark index for each finger
+
+    return (ndarray): array with the shape (num_hands, num_fingers, 2)
+    """
+    hand_list = np.asarray(hand_list)
+    finger_points = hand_list[:, np.asarray(finger_coord)]
+    focal_points = hand_list[:, focal_index, np.newaxis]
+    return np.abs(focal_points - finger_points).max(axis=-1)
+
+
+def finger_position_relative_to_focal_point(hand_list, finger_coord,
+                                            thumb=False):
+    """
+
+    hand_list (list): list containing the finger points in pixels
+    finger_coord (list): contains tuple containing the indices that are
+                         compared for the fingers/thumb.
+    thumb (bool): used to indicate if the thumb coord is passed in
+
+    return (list): contains the x/y value relative to the focal point
+    """
+    focal_index = PINKY_MCP if thumb else WRIST
+    focal_indices = np.full(len(finger_coord), focal_index)
+    return relative_finger_positions(np.asarray(hand_list)[np.newaxis],
+                                     finger_coord, focal_indices)[0].tolist()
+
+
+def determine_thumb_position(hand_list, finger_list):
+    """
+    Determines the order of the list. When given the list the thumb is the
+    first item on the list. But, if the thumb is on the right side of the
+    hand (from user facing the screen), then the list needs to be reversed.
+
+    Parameter:
+        hand_list (list): tuple containing the joints coords
+        finger_list (list): list containing the x or y points of the joints
+
+    return (list): list of fingers points in order from left to right of the
+    screen
+    """
+    wrist = hand_list[0][0]
+    thumb_knuckle = hand_list[1][0]
+    if thumb_knuckle > wrist:
+        finger_list.reverse()
+    return finger_list
+
+
+def collect_finger_points(hand_list):
+    """
+    This creates the finger_list based on the data from hand_list and the
+    FINGER_COORD and THUMB_COORD. It creates the list so the thumb is in the
+    0th index and then goes from index to pinky. Finally, it checks the
+    position of the thumb and will reverse the list if the thumb is on the
+    right side.
+
+    Parameter:
+        hand_list (ndarray): array with the shape (num_hands, 21, 2)
+
+    return (ndarray): array with the shape (num_hands, 5, 2) containing the
+                      x or y values relative to the focal point
+    """
+    hand_list = np.asarray(hand_list).reshape(-1, NUM_LANDMARKS, 2)
+    finger_list = relative_finger_positions(hand_list,
+                                            THUMB_COORD + FINGER_COORD,
+                                            FOCAL_INDICES)
+    thumb_right = hand_list[:, THUMB_CMC, 0] > hand_list[:, WRIST, 0]
+    finger_list[thumb_right] = finger_list[thumb_right, ::-1]
+    return finger_list
+
+
+def is_hand_sideways(hand_list):
+    """
+    The hand is counted as sideways or downwards if the thumb MCP or pinky
+    MCP joint is below the wrist. In terms of pixels if their y-position is
+    greater than the wrist it will be counted as sideways or downwards.
+
+    Parameter:
+        hand_list (ndarray): array with the shape (num_hands, 21, 2)
+
+    return (ndarray): booleans relating to if the hand is sideways/downwards
+    """
+    hand_list = np.asarray(hand_list).reshape(-1, NUM_LANDMARKS, 2)
+    joints_y = hand_list[:, (THUMB_MCP, PINKY_MCP), 1]
+    return (joints_y > hand_list[:, WRIST, np.newaxis, 1]).any(axis=1)
+
+
+def upright_hands_after(hand_sideways):
+    """
+    Counts the upright hands to the right of each hand with one suffix sum,
+    rather than counting the flags after each hand again.
+
+    Parameter:
+        hand_sideways (list): booleans relating to if the hand is
+                              sideways/downwards, from left to right
+
+    return (ndarray): int64 number of upright hands after each hand
+    """
+    upright = ~np.asarray(hand_sideways, dtype=bool)
+    upright_after = np.zeros(len(upright), dtype=np.int64)
+    upright_after[:-1] = np.cumsum(upright[:0:-1])[::-1]
+    return upright_after
+
+
+def finger_counter(finger_list, hand_sideways):
+    """
+    Returns the number of fingers/thumbs that are up.
+    Additionally, it calculates the binary representation if each finger is a
+    binary digit.
+    The counter also starts from the leftmost hand to the right. Each upright
+    hand's fingers make a 5-bit mask, shifted past the upright hands to its
+    right, so the rightmost upright hand's fingers are 2**4 to 2**0. The
+    shift is summed from the right as the masks are put together, which
+    takes linear time, and Python ints hold any number of hands.
+
+    Parameter:
+        finger_list (list): list containing the x or y points of the joints
+        hand_sideways (list): booleans relating to if the hand is
+                              sideways/downwards
+
+    return (tuple): Number of fingers up, binary count
+    """
+    if len(finger_list) == 0:
+        return 0, 0
+    finger_list = np.asarray(finger_list)
+    fingers_up = finger_list[..., 0] > finger_list[..., 1]
+    finger_tot = fingers_up.shape[1]  # In most circumstance it is 5
+    masks = fingers_up @ np.left_shift(1, np.arange(finger_tot - 1, -1, -1))
+    binary = 0
+    shift = 0
+    for mask, sideways in zip(masks.tolist()[::-1],
+                              np.asarray(hand_sideways).tolist()[::-1]):
+        if not sideways:
+            binary |= mask << shift
+            shift += finger_tot
+    return int(np.count_nonzero(fingers_up)), binary
+
+
+def count_landmarks(landmarks, image_shape):
+    """
+    Counts the fingers up in one frame's normalised landmarks.
+
+    Parameter:
+        landmarks (ndarray): (num_hands, 21, 3) normalised landmarks
+        image_shape (tuple): shape of the frame they were found in
+
+    return (tuple): Number of fingers up, binary count
+    """
+    hand_list = convert_coords_to_pixels(landmarks, image_shape)
+    return finger_counter(collect_finger_points(hand_list),
+                          is_hand_sideways(hand_list))
+
+
+def segment_sums(values, hands_per_frame):
+    """
+    Sums the per-hand values belonging to each frame. The hands of a frame
+    are stored next to each other, so this is a difference of a running
+    total, which is also correct for frames without any hands.
+
+    Parameter:
+        values (ndarray): int64 value for each hand, or Python ints in an
+                          object array
+        hands_per_frame (ndarray): number of hands in each frame
+
+    return (ndarray): sum for each frame, with the dtype of values
+    """
+    running_total = np.zeros(len(values) + 1, dtype=values.dtype)
+    np.cumsum(values, out=running_total[1:])
+    frame_ends = np.cumsum(hands_per_frame)
+    return running_total[frame_ends] - running_total[frame_ends -
+                                                     hands_per_frame]
+
+
+def count_fingers_batch(hand_list, hands_per_frame):
+    """
+    Counts the fingers for many frames in one vectorised call. The result for
+    each frame matches finger_counter run on that frame's hands, with the
+    hands ordered from left to right and each upright hand taking five
+    binary digits.
+
+    The hands can be given in one of two layouts:
+      - packed: shape (total_hands, 21, 2), with each frame's hands stored
+        next to each other
+      - padded: shape (num_frames, max_hands, 21, 2), where only the first
+        hands_per_frame[i] hands of frame i are used
+
+    Parameter:
+        hand_list (ndarray): pixel positions of the hands for every frame
+        hands_per_frame (array): number of hands in each frame
+
+    return (tuple): int64 arrays of the decimal and binary count per frame.
+                    The binary count holds Python ints when a frame has
+                    more than 12 hands.
+    """
+    hands_per_frame = np.asarray(hands_per_frame, dtype=np.int64)
+    hand_list = np.asarray(hand_list)
+    if hand_list.ndim == 4:
+        padding_mask = (np.arange(hand_list.shape[1]) <
+                        hands_per_frame[:, np.newaxis])
+        hand_list = hand_list[padding_mask]
+    hand_list = hand_list.reshape(-1, NUM_LANDMARKS, 2)
+    num_frames = len(hands_per_frame)
+    frame_ids = np.repeat(np.arange(num_frames), hands_per_frame)
+    hand_list = hand_list[np.lexsort((hand_list[:, WRIST, 0], frame_ids))]
+
+    finger_list = collect_finger_points(hand_list)
+    fingers_up = finger_list[..., 0] > finger_list[..., 1]
+    finger_tot = fingers_up.shape[1]
+    upright = ~is_hand_sideways(hand_list)
+
+    # Number of upright hands to the right of each hand in the same frame
+    upright_after = np.zeros(len(hand_list) + 1, dtype=np.int64)
+    upright_after[:-1] = np.cumsum(upright[::-1])[::-1]
+    frame_ends = np.repeat(np.cumsum(hands_per_frame), hands_per_frame)
+    upright_after = upright_after[1:] - upright_after[frame_ends]
+
+    finger_bits = np.left_shift(1, np.arange(finger_tot - 1, -1, -1))
+    hand_bits = fingers_up.astype(np.int64) @ finger_bits
+    if hands_per_frame.max(initial=0) * finger_tot >= 63:
+        # The count doesn't fit in int64, so the masks are shifted as
+        # Python ints
+        hand_bits = hand_bits.astype(object)
+    hand_bits = np.where(upright,
+                         np.left_shift(hand_bits, upright_after * finger_tot),
+                         0)
+
+    decimal = segment_sums(fingers_up.sum(axis=1), hands_per_frame)
+    binary = segment_sums(hand_bits, hands_per_frame)
+    return decimal, binary
@@ -0,0 +1,247 @@
+"""
+Finds the hand landmarks in a frame. HandDetector puts together the ways of
+avoiding or shrinking inference: the landmark cache, tracking between
+inference frames, skipping empty scenes and cropping to the hands, along
+with recording the landmarks that were found.
+"""
+import threading
+
+import cv2
+import numpy as np
+
+from counting import landmarks_to_array
+
+
+def make_hands(max_num_hands=2, **options):
+    """
+    Builds the MediaPipe model. MediaPipe is imported here, so modules that
+    only count fingers or hand out frames never load it.
+
+    Parameter:
+        max_num_hands (int): most hands found in a frame
+        options (dict): other options of the model, such as
+                        model_complexity and min_detection_confidence
+
+    return (Hands): the model
+    """
+    import mediapipe as mp  # pylint: disable=import-outside-toplevel
+    return mp.solutions.hands.Hands(max_num_hands=max_num_hands, **options)
+
+
+def _close(hands):
+    # MediaPipe's models hold a graph and its threads until they are closed
+    close = getattr(hands, "close", None)
+    if close is not None:
+        close()
+
+
+class LazyHands:
+    """
+    Stands in for the model until it is first used, then builds it. The
+    model can also be built early on a background thread, while the camera
+    opens, so the first frame doesn't wait for it.
+    """
+
+    def __init__(self, build=make_hands):
+        """
+        Parameter:
+            build (callable): builds the model
+        """
+        self.build = build
+        self._hands = None
+        self._lock = threading.RLock()
+
+    @property
+    def built(self):
+        """
+        return (bool): True once the model has been built
+        """
+        return self._hands is not None
+
+    def prewarm(self):
+        """
+        Starts building the model on a background thread.
+
+        return (Thread): the thread building the model
+        """
+        thread = threading.Thread(target=self.get, name="prewarm",
+                                  daemon=True)
+        thread.start()
+        return thread
+
+    def rebuild(self, build):
+        """
+        Replaces the model with one made by another builder. A model that
+        is in use keeps being used until the new one is built on a
+        background thread, then it is closed.
+
+        Parameter:
+            build (callable): builds the new model
+
+        return (Thread): the thread building the model, or None when the
+                         model hasn't been built yet
+        """
+        with self._lock:
+            self.build = build
+            if self._hands is None:
+                return None
+
+        def swap():
+            hands = build()
+            with self._lock:
+                # The lock is held while the model runs, so the model that
+                # is left over isn't in use and can be closed
+                if self.build is build:
+                    hands, self._hands = self._hands, hands
+            _close(hands)
+
+        thread = threading.Thread(target=swap, name="rebuild", daemon=True)
+        thread.start()
+        return thread
+
+    def get(self):
+        """
+        Builds the model, or waits for the prewarm thread to finish it.
+
+        return (Hands): the model
+        """
+        with self._lock:
+            if self._hands is None:
+                self._hands = self.build()
+        return self._hands
+
+    def process(self, image):
+        """
+        Runs the model, building it first if it hasn't been.
+
+        Parameter:
+            image (ndarray): the RGB image
+
+        return (NamedTuple): the model's results
+        """
+        with self._lock:
+            return self.get().process(image)
+
+
+class HandDetector:  # pylint: disable=too-many-instance-attributes
+    """
+    Runs the model on frames, with the optional cache, recorder, tracker and
+    region of interest. Only the model is required.
+    """
+
+    def __init__(self, hands, cache=None, recorder=None, tracker=None,
+                 roi=None):
+        """
+        Parameter:
+            hands (Hands): the MediaPipe model, or anything with the same
+                           process method
+            cache (CachedLandmarks): the landmarks cached for this source
+            recorder (LandmarkRecorder): the recording being written
+            tracker (LandmarkTracker): tracks the landmarks between
+                                       inference frames
+            roi (RegionOfInterest): crops and scales the inference image.
+                                    When it crops, the model should be in
+                                    static_image_mode.
+        """
+        self.hands = hands
+        self.cache = cache
+        self.recorder = recorder
+        self.tracker = tracker
+        self.roi = roi
+        self.gate = None  # PresenceGate that skips inference on empty scenes
+        self.reduced_model = False  # Set while a cheaper model is in use
+        # Reused for each frame's colour conversion, whatever the crop's size
+        self._rgb_buffer = np.empty(0, dtype=np.uint8)
+
+    def detect(self, image, frame_index=None):
+        """
+        Finds the landmarks of the hands in a frame.
+
+        Parameter:
+            image (ndarray): the BGR image
+            frame_index (int): number of the frame in its source, needed
+                               when there is a cache
+
+        return (ndarray): (num_hands, 21, 3) normalised landmarks, or None
+                          when there are no hands
+        """
+        handedness = []
+
+        def infer():
+            landmarks, labels = self._detect(image, frame_index)
+            handedness.extend(labels or [])
+            return landmarks
+
+        if self.tracker is None:
+            landmarks = infer()
+        else:
+            landmarks = self.tracker.update(image, infer)
+        # Every frame is recorded, including tracked ones, so a recording
+        # lines up with its source. Only inference gives the handedness.
+        if self.recorder is not None:
+            self.recorder.record(
+                np.zeros((0, 21, 3)) if landmarks is None else landmarks,
+                image.shape, handedness)
+        return landmarks
+
+    def run_model(self, image):
+        """
+        Runs the model on a BGR image.
+
+        Parameter:
+            image (ndarray): the BGR image
+
+        return (tuple): the (num_hands, 21, 3) normalised landmarks and the
+                        handedness label of each hand
+        """
+        if self._rgb_buffer.size < image.size:
+            self._rgb_buffer = np.empty(image.size, dtype=np.uint8)
+        rgb_image = cv2.cvtColor(
+            image, cv2.COLOR_BGR2RGB,
+            dst=self._rgb_buffer[:image.size].reshape(image.shape))
+        results = self.hands.process(rgb_image)
+        handedness = [hand.classification[0].label
+                      for hand in results.multi_handedness or []]
+        return (landmarks_to_array(results.multi_hand_landmarks or []),
+                handedness)
+
+    def _detect(self, image, frame_index):
+        landmarks = None
+        if self.cache is not None:
+            landmarks = self.cache.get(frame_index)
+        handedness = None
+        if landmarks is None:
+            if self.gate is None:
+                inferred = self._infer(image)
+            else:
+                inferred = self.gate.update(image,
+                                            lambda: self._infer(image))
+            if inferred is None:
+                # The gate skipped the frame, which isn't cached since the
+                # model never saw it
+                landmarks = np.zeros((0, 21, 3), dtype=np.float32)
+            else:
+                landmarks, handedness = inferred
+                if self.cache is not None and self._full_quality():
+                    self.cache.put(frame_index, landmarks)
+        return (landmarks if len(landmarks) else None), handedness
+
+    def _full_quality(self):
+        # The cache is keyed by the source alone, so landmarks from a crop,
+        # a downscaled frame or a cheaper model would be replayed by full
+        # quality runs
+        return not self.reduced_model and (self.roi is None or
+                                           not self.roi.reduced)
+
+    def _infer(self, image):
+        if self.roi is None:
+            return self.run_model(image)
+        inference_image, box = self.roi.prepare(image)
+        landmarks, handedness = self.run_model(inference_image)
+        if box is not None and len(landmarks) == 0:
+            # The hands left the crop, so search the whole frame
+            landmarks, handedness = self.run_model(self.roi.resize(image))
+            box = None
+        landmarks = self.roi.to_full_frame(landmarks, box, image.shape)
+        self.roi.update(landmarks, image.shape)
+        return landmarks, handedness
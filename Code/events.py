@@ -0,0 +1,196 @@
+"""
+Keeps the count as a stream of change events instead of one row per frame.
+An event is only made when the decimal count, the binary count or the
+counting mode changes, so the log grows with how often the count changes
+rather than with the frame rate.
+
+The log is run-length encoded as JSON lines. Each line starts a run of
+frames with the same count, giving the time and frame it started at, and
+the run lasts until the next line. The last line marks the end of the log:
+
+    {"time": 12.5, "frame": 375, "mode": "Decimal", "decimal": 3, "binary": 7}
+    {"time": 14.0, "frame": 420, "mode": "Decimal", "decimal": 2, "binary": 3}
+    {"time": 20.1, "frame": 603, "end": true}
+"""
+from bisect import bisect_right
+from collections import namedtuple
+import json
+import time
+
+import numpy as np
+
+CountRun = namedtuple("CountRun", [
+    "time", "frame", "mode", "decimal", "binary", "frames", "duration"])
+
+
+class CountEventLog:  # pylint: disable=too-many-instance-attributes
+    """
+    Turns each frame's count into change events and holds the runs between
+    them. The events are written to the file, if there is one, as they
+    happen, so the file is complete up to the latest change.
+    """
+
+    def __init__(self, path=None, fps=None, clock=time.time):
+        """
+        Parameter:
+            path (str): JSON lines file to write the events to
+            fps (float): frame rate of a recorded source, used for the
+                         events' times. Live sources use the clock.
+            clock (callable): returns the time in seconds
+        """
+        self.fps = fps
+        self.clock = clock
+        self.runs = []
+        # Start frame and time of each run, for looking them up
+        self._starts = []
+        self._times = []
+        self._key = None
+        self._end = None  # Time and frame just after the last run
+        # pylint: disable-next=consider-using-with
+        self._file = None if path is None else open(path, "w",
+                                                    encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc_info):
+        self.close()
+
+    def update(self, frame_index, decimal, binary, count_decimal):
+        """
+        Adds a frame's count.
+
+        Parameter:
+            frame_index (int): number of the frame in its source
+            decimal (int): the decimal count
+            binary (int): the binary count
+            count_decimal (bool): Determines if counting in decimal or binary
+
+        return (CountRun): the run the frame starts when its count changed,
+                           otherwise None
+        """
+        now = frame_index / self.fps if self.fps else self.clock()
+        self._end = ((frame_index + 1) / self.fps if self.fps else now,
+                     frame_index + 1)
+        key = ("Decimal" if count_decimal else "Binary", int(decimal),
+               int(binary))
+        if key == self._key:
+            return None
+        self._key = key
+        self._finish_run(now, frame_index)
+        run = CountRun(now, frame_index, *key, None, None)
+        self._add(run)
+        self._write({"time": now, "frame": frame_index, "mode": key[0],
+                     "decimal": key[1], "binary": key[2]})
+        return run
+
+    def close(self):
+        """
+        Ends the last run and closes the file.
+
+        return: None
+        """
+        if self._end is not None:
+            self._finish_run(*self._end)
+            self._write({"time": self._end[0], "frame": self._end[1],
+                         "end": True})
+            self._end = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a log written by CountEventLog.
+
+        Parameter:
+            path (str): the JSON lines file
+
+        return (CountEventLog): the log with its runs
+        """
+        log = cls()
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                event = json.loads(line)
+                log._finish_run(event["time"], event["frame"])
+                if not event.get("end"):
+                    log._add(CountRun(
+                        event["time"], event["frame"], event["mode"],
+                        event["decimal"], event["binary"], None, None))
+        return log
+
+    def at_frame(self, frame_index):
+        """
+        Parameter:
+            frame_index (int): number of a frame
+
+        return (CountRun): the run the frame is in, or None before the first
+        """
+        index = bisect_right(self._starts, frame_index) - 1
+        return self.runs[index] if index >= 0 else None
+
+    def at_time(self, when):
+        """
+        Parameter:
+            when (float): a time in the log's clock
+
+        return (CountRun): the run at that time, or None before the first
+        """
+        index = bisect_right(self._times, when) - 1
+        return self.runs[index] if index >= 0 else None
+
+    def between(self, start, end):
+        """
+        Parameter:
+            start (float): start of the time range
+            end (float): end of the time range
+
+        return (list): the runs that overlap the range
+        """
+        return [run for run in self.runs if run.time < end and
+                (run.duration is None or run.time + run.duration > start)]
+
+    def per_frame(self):
+        """
+        Expands the finished runs back into one count per frame.
+
+        return (tuple): int64 arrays of the decimal and binary count of each
+                        frame, from the first run's frame
+        """
+        runs = [run for run in self.runs if run.frames is not None]
+        lengths = [run.frames for run in runs]
+        return (np.repeat([run.decimal for run in runs], lengths),
+                np.repeat([run.binary for run in runs], lengths))
+
+    def replay(self, realtime=False, sleep=time.sleep):
+        """
+        Yields the runs in order, waiting between them in real time mode so
+        they change at the pace they were recorded at.
+
+        Parameter:
+            realtime (bool): wait for each run's time
+            sleep (callable): waits for a number of seconds
+
+        return (generator): the runs
+        """
+        for run in self.runs:
+            yield run
+            if realtime and run.duration:
+                sleep(run.duration)
+
+    def _add(self, run):
+        self.runs.append(run)
+        self._starts.append(run.frame)
+        self._times.append(run.time)
+
+    def _finish_run(self, now, frame_index):
+        if self.runs and self.runs[-1].frames is None:
+            last = self.runs[-1]
+            self.runs[-1] = last._replace(frames=frame_index - last.frame,
+                                          duration=now - last.time)
+
+    def _write(self, event):
+        if self._file is not None:
+            self._file.write(json.dumps(event) + "\n")
+            self._file.flush()
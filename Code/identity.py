@@ -0,0 +1,85 @@
+"""
+Gives each hand an ID that stays the same from frame to frame. The hands are
+ordered by their wrist's x position for counting, so when hands cross or one
+leaves the frame their order changes, but their IDs don't. Per-hand state,
+such as smoothing and the colour a hand is drawn in, is kept by ID.
+"""
+import numpy as np
+
+
+class HandIdentities:  # pylint: disable=too-few-public-methods
+    """
+    Matches the hands in each frame to the tracks of the hands seen before,
+    nearest landmark centroid first. A hand that doesn't match any track
+    starts a new one, and a track that isn't matched for max_missed frames
+    is removed, so only the hands in view and those that just left are
+    kept.
+    """
+
+    def __init__(self, max_distance=0.2, max_missed=15, max_tracks=8):
+        """
+        Parameter:
+            max_distance (float): furthest a hand's centroid can move
+                                  between frames and keep its ID, as a
+                                  fraction of the image diagonal
+            max_missed (int): frames a track is kept without its hand
+            max_tracks (int): most tracks kept at once, the ones missed for
+                              longest are removed first
+        """
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.max_tracks = max_tracks
+        self.tracks = {}  # ID: [centroid, frames missed]
+        self._next_id = 0
+
+    def update(self, hand_list, image_shape):
+        """
+        Matches this frame's hands to the tracks.
+
+        Parameter:
+            hand_list (ndarray): (num_hands, 21, 2) points in pixels, None
+                                 when there are no hands
+            image_shape (tuple): shape of the frame
+
+        return (ndarray): int64 ID of each hand, in the order of hand_list
+        """
+        for track in self.tracks.values():
+            track[1] += 1
+        if hand_list is None or len(hand_list) == 0:
+            self._evict()
+            return np.zeros(0, dtype=np.int64)
+        diagonal = np.hypot(*image_shape[:2])
+        centroids = np.asarray(hand_list, dtype=np.float64).mean(axis=1)
+        centroids /= diagonal
+        ids = np.full(len(centroids), -1, dtype=np.int64)
+        track_ids = list(self.tracks)
+        if track_ids:
+            previous = np.array([self.tracks[track_id][0]
+                                 for track_id in track_ids])
+            distances = np.linalg.norm(
+                centroids[:, None] - previous[None], axis=-1)
+            # Greedy matching: the closest remaining pair is matched first
+            for flat in np.argsort(distances, axis=None, kind="stable"):
+                hand, track = divmod(int(flat), len(track_ids))
+                if distances[hand, track] > self.max_distance:
+                    break
+                if ids[hand] < 0 and track_ids[track] not in ids:
+                    ids[hand] = track_ids[track]
+        for hand, centroid in enumerate(centroids):
+            if ids[hand] < 0:
+                ids[hand] = self._next_id
+                self._next_id += 1
+            self.tracks[int(ids[hand])] = [centroid, 0]
+        self._evict()
+        return ids
+
+    def _evict(self):
+        stale = [track_id for track_id, (_centroid, missed)
+                 in self.tracks.items() if missed > self.max_missed]
+        for track_id in stale:
+            del self.tracks[track_id]
+        if len(self.tracks) > self.max_tracks:
+            by_missed = sorted(self.tracks,
+                               key=lambda track_id: self.tracks[track_id][1])
+            for track_id in by_missed[self.max_tracks:]:
+                del self.tracks[track_id]
@@ -0,0 +1,219 @@
+"""
+An on-disk cache of the landmarks MediaPipe finds in recorded videos. When a
+video is processed again, for example after changing the counting logic, the
+landmarks are read back from the cache instead of running HANDS.process.
+
+Each video has one file of fixed size records, one record per frame, which is
+memory-mapped so reading a frame's landmarks doesn't copy them. A record
+holds the number of hands plus one and the normalised x, y and z of every
+landmark as float32. A zero-filled record means the frame hasn't been cached.
+The cache has a size limit and removes the least recently used videos to stay
+under it.
+"""
+from hashlib import sha1
+from pathlib import Path
+import os
+import numpy as np
+
+NUM_LANDMARKS = 21
+FILE_SUFFIX = ".lmk"
+DEFAULT_MAX_BYTES = 1 << 30  # 1 GiB
+MIN_CAPACITY = 1024  # Records allocated when a file is first created
+HASH_CHUNK = 1 << 20  # Bytes read from each end of a file to hash it
+
+
+def record_dtype(max_hands):
+    """
+    Parameter:
+        max_hands (int): the most hands stored for a frame
+
+    return (dtype): the layout of one frame's record
+    """
+    return np.dtype([("hands", np.uint8),
+                     ("landmarks", np.float32, (max_hands, NUM_LANDMARKS, 3))])
+
+
+class CachedLandmarks:
+    """
+    The cached landmarks of one video, indexed by frame number.
+    """
+
+    def __init__(self, path, max_hands):
+        """
+        Parameter:
+            path (Path): the file the records are stored in
+            max_hands (int): the most hands stored for a frame
+        """
+        self.path = path
+        self.dtype = record_dtype(max_hands)
+        self.hits = 0
+        self.misses = 0
+        self._records = None
+        if not path.exists() or path.stat().st_size % self.dtype.itemsize:
+            # Missing, or written with a different number of hands
+            path.write_bytes(b"")
+        self._map(path.stat().st_size // self.dtype.itemsize)
+
+    def get(self, frame_index):
+        """
+        Looks up a frame's landmarks.
+
+        Parameter:
+            frame_index (int): number of the frame in the video
+
+        return (ndarray): memory-mapped (num_hands, 21, 3) array, or None if
+                          the frame isn't cached
+        """
+        if frame_index >= len(self._records):
+            self.misses += 1
+            return None
+        num_hands = int(self._records["hands"][frame_index]) - 1
+        if num_hands < 0:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._records["landmarks"][frame_index, :num_hands]
+
+    def put(self, frame_index, landmarks):
+        """
+        Stores a frame's landmarks. Hands past max_hands are not stored.
+
+        Parameter:
+            frame_index (int): number of the frame in the video
+            landmarks (ndarray): (num_hands, 21, 3) normalised landmarks
+
+        return: None
+        """
+        if frame_index >= len(self._records):
+            self._map(max(MIN_CAPACITY, frame_index + 1,
+                          2 * len(self._records)))
+        max_hands = self.dtype["landmarks"].shape[0]
+        landmarks = np.asarray(landmarks)[:max_hands]
+        self._records["landmarks"][frame_index, :len(landmarks)] = landmarks
+        self._records["hands"][frame_index] = len(landmarks) + 1
+
+    def size(self):
+        """
+        return (int): size of the file in bytes
+        """
+        return len(self._records) * self.dtype.itemsize
+
+    def close(self):
+        """
+        Writes the records to disk and unmaps the file.
+
+        return: None
+        """
+        if self._records is not None and len(self._records):
+            self._records.flush()
+        self._records = None
+
+    def _map(self, capacity):
+        if self._records is not None and len(self._records):
+            self._records.flush()
+        self._records = None
+        with open(self.path, "r+b") as file:
+            file.truncate(capacity * self.dtype.itemsize)
+        if capacity:
+            self._records = np.memmap(self.path, dtype=self.dtype,
+                                      mode="r+", shape=(capacity,))
+        else:
+            self._records = np.zeros(0, dtype=self.dtype)
+
+
+class LandmarkCache:
+    """
+    A directory of CachedLandmarks files with a limit on their total size.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, max_hands=2):
+        """
+        Parameter:
+            directory (str): where the cache files are kept
+            max_bytes (int): total size the cache files are kept under
+            max_hands (int): the most hands stored for a frame
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_hands = max_hands
+        self._open = {}
+
+    @staticmethod
+    def source_key(source, by_content=False):
+        """
+        Builds the key a video is cached under. By default this is the
+        video's path, size and modification time, so an edited video isn't
+        matched with stale landmarks. Keying by content hashes the size and
+        the start and end of the file instead, so a copied or renamed video
+        still matches.
+
+        Parameter:
+            source (str): path to the video or directory of images
+            by_content (bool): key by the file's content instead of its path
+
+        return (str): hex digest used as the cache file name
+        """
+        path = Path(source).resolve()
+        stat = path.stat()
+        digest = sha1()
+        if by_content and path.is_file():
+            digest.update(str(stat.st_size).encode("ascii"))
+            with open(path, "rb") as file:
+                digest.update(file.read(HASH_CHUNK))
+                file.seek(max(0, stat.st_size - HASH_CHUNK))
+                digest.update(file.read(HASH_CHUNK))
+        else:
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+                          .encode("utf-8"))
+        return digest.hexdigest()
+
+    def open(self, key):
+        """
+        Opens the landmarks cached for a video, creating an empty file if
+        the video hasn't been seen before.
+
+        Parameter:
+            key (str): key from source_key
+
+        return (CachedLandmarks): the video's cached landmarks
+        """
+        if key not in self._open:
+            path = self.directory / f"{key}{FILE_SUFFIX}"
+            self._open[key] = CachedLandmarks(path, self.max_hands)
+        os.utime(self._open[key].path)  # Marks it as recently used
+        self.evict()
+        return self._open[key]
+
+    def close(self):
+        """
+        Closes every open file and evicts down to the size limit.
+
+        return: None
+        """
+        for entry in self._open.values():
+            entry.close()
+        self._open.clear()
+        self.evict()
+
+    def evict(self):
+        """
+        Deletes the least recently used files until the cache is under its
+        size limit. Files that are open are never deleted.
+
+        return (list): paths of the deleted files
+        """
+        open_paths = {entry.path for entry in self._open.values()}
+        files = sorted(self.directory.glob(f"*{FILE_SUFFIX}"),
+                       key=lambda path: path.stat().st_mtime_ns)
+        total = sum(path.stat().st_size for path in files)
+        evicted = []
+        for path in files:
+            if total <= self.max_bytes:
+                break
+            if path in open_paths:
+                continue
+            total -= path.stat().st_size
+            path.unlink()
+            evicted.append(path)
+        return evicted
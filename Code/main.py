@@ -25,106 +25,88 @@ Hand landmark numbers:
 19. PINKY DIP
 20. PINKY TIP
 """
+from collections import namedtuple
+from contextlib import ExitStack
+from functools import partial
 from math import cos, sin, atan
-from random import randint
+import argparse
+import asyncio
 import sys
+import time
 import cv2
-import mediapipe as mp
+import numpy as np
 import serial
 import serial.tools.list_ports
+from buffers import BufferPool, PooledReader
+from controls import handle_key, headless_input, start_headless_input
+from count_writer import CountWriter
+from counting import (FINGER_COORD, THUMB_COORD, collect_finger_points,
+                      convert_coords_to_pixels, count_fingers_batch,
+                      finger_counter, is_hand_sideways, upright_hands_after)
+from detector import HandDetector, LazyHands, make_hands
+from events import CountEventLog
+from identity import HandIdentities
+from landmark_cache import LandmarkCache
+from metrics import (MetricsExporter, StageMetrics, draw_metrics,
+                     update_gate_gauges, update_pipeline_gauges)
+from pipeline import FramePipeline
+from presence import IdleThrottle, PresenceGate
+from quality import QualityController, apply_level, relative_levels
+from recording import LandmarkRecorder, LandmarkReplayer
+from roi import RegionOfInterest
+from serial_protocol import negotiate
+from serial_writer import SerialWriter
+from service import serve
+from sinks import count_message, open_sink
+from smoothing import CountSmoother
+from sources import open_source
+from streams import count_streams
+from tracking import LandmarkTracker
 
 PORT_NAME = '/dev/cu.usbmodem1413101'
 BAUD_RATE = 115200
-FINGER_COORD = [(8, 6), (12, 10), (16, 14), (20, 18)]
-THUMB_COORD = [(4, 5), ]  # Thumb tip and index MCP
-MP_DRAW = mp.solutions.drawing_utils  # Used to draw the hands
-MP_HANDS = mp.solutions.hands  # Used to detect hands in the input image
-HANDS = MP_HANDS.Hands(max_num_hands=2)  # Used to process the detected hands
-hand_dict = {}
-
-
-def start_camera():
-    """
-    This checks if there is a camera that can be used locally. If not it closes
-    the program.
-
-    return (tuple): contains - bool, array and address to camera
-    """
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
-        print("Cannot open camera")
-        sys.exit()
-    success, image = cap.read()
-    return success, image, cap
-
-
-def start_serial():
+WRITE_TIMEOUT = 0.5  # Seconds before a stalled display counts as gone
+HANDS = LazyHands()  # Used to process the detected hands, built on first use
+DETECTOR = HandDetector(HANDS)  # Runs HANDS on every frame
+# The joints joined by lines, the same as MediaPipe's HAND_CONNECTIONS
+HAND_CONNECTIONS = [(0, 1), (0, 5), (0, 17), (1, 2), (2, 3), (3, 4), (5, 6),
+                    (5, 9), (6, 7), (7, 8), (9, 10), (9, 13), (10, 11),
+                    (11, 12), (13, 14), (13, 17), (14, 15), (15, 16),
+                    (17, 18), (18, 19), (19, 20)]
+REPLAY_CHUNK = 1 << 16  # Frames counted at a time when replaying
+HAND_COLOURS = [(255, 0, 0), (0, 0, 255), (0, 255, 0), (255, 0, 255),
+                (255, 255, 0), (0, 255, 255), (128, 0, 255), (255, 128, 0)]
+FrameResult = namedtuple("FrameResult", [
+    "image", "landmarks", "hand_list", "finger_list", "hand_sideways",
+    "decimal", "binary", "hand_ids"], defaults=[None])
+
+
+def start_serial(report=True):
     """
     This starts the serial communication for the decided port.
 
+    Parameter:
+        report (bool): print the ports found and if the port is missing
+
     return (Serial): the serial connection to the specified port,
     """
     serial_com = None
     my_ports = [tuple(p) for p in list(serial.tools.list_ports.comports())]
     for ports in my_ports:
-        print(ports)
+        if report:
+            print(ports)
         if PORT_NAME in ports[0]:
             serial_com = serial.Serial(port=PORT_NAME, baudrate=BAUD_RATE,
-                                       timeout=1)
+                                       timeout=1,
+                                       write_timeout=WRITE_TIMEOUT)
             if serial_com.isOpen():
                 serial_com.close()
             serial_com.open()
-    if not serial_com:
+    if not serial_com and report:
         print("Serial port not found")
     return serial_com
 
 
-def convert_coords_to_pixels(hand_lms, image):
-    """
-    Convert each of the co-ordinates for every landmark to pixel
-    positions
-
-    Parameter:
-        hand_lms (list): list containing x, y, z  of finger points
-        image (array): array containing content about the image
-
-    return (list): list containing the finger points in pixels
-    """
-    hands_list = []
-    for _i, hand_landmarks in enumerate(hand_lms):
-        hand_container = []
-        for _idx, landmark in enumerate(hand_landmarks.landmark):
-            height, width, _coordinate = image.shape
-            c_x, c_y = int(landmark.x * width), int(landmark.y * height)
-            hand_container.append((c_x, c_y))
-        hands_list.append(hand_container)
-    return order_hands(hands_list)
-
-
-def wrist_position(hand):
-    """
-
-    Parameter:
-        hand (list): contains tuple that has each joints co-ordinates
-
-    return (int): int value relating to the wrist x-position
-    """
-    return hand[0][0]
-
-
-def order_hands(hand_list):
-    """
-    This orders the hand in the order they appear from left to right. This is
-    done by comparing the x-values of each hand's wrist.
-
-    Parameter:
-        hand_list (list): list containing the finger points in pixels
-
-    return (list): hand_list ordered with hands from left to right
-    """
-    return sorted(hand_list, key=wrist_position, reverse=False)
-
-
 def draw_points(hand_list, image, hand_colour):
     """
     This draws the circles above each of the hand landmarks
@@ -132,167 +114,15 @@ def draw_points(hand_list, image, hand_colour):
     parameter:
         hand_list (list): list containing the finger points in pixels
         image (array): array containing content about the image
-        hand_colour (dict): contains tuples that have three ints from 0-255
+        hand_colour (list): tuples that have three ints from 0-255, one for
+                            each hand
 
     return:
     """
     for index, hand in enumerate(hand_list):
         colour = hand_colour[index]
-        for point in hand:
-            cv2.circle(image, point, 10, colour, cv2.FILLED)
-
-
-def finger_position_relative_to_focal_point(hand_list, finger_coord,
-                                            thumb=False):
-    """
-
-    hand_list (list): list containing the finger points in pixels
-    finger_coord (list): contains tuple containing the indices that are
-                         compared for the fingers/thumb.
-    thumb (bool): used to indicate if the thumb coord is passed in
-
-    return (list): contains the x/y value relative to the focal point
-    """
-    if thumb:
-        focal_index = 17  # pinky MCP
-    else:
-        focal_index = 0  # wrist
-    focal_x_pos = hand_list[focal_index][0]
-    focal_y_pos = hand_list[focal_index][1]
-    normalised_fingers_pos = []
-    for coordinate in finger_coord:
-        finger_pos = []
-        for finger_point in coordinate:
-            x_pos = hand_list[finger_point][0]
-            y_pos = hand_list[finger_point][1]
-            x_len = focal_x_pos - x_pos
-            y_len = focal_y_pos - y_pos
-            if abs(y_len) > abs(x_len):
-                finger_pos.append(abs(y_len))
-            else:
-                finger_pos.append(abs(x_len))
-        normalised_fingers_pos.append(finger_pos)
-    return normalised_fingers_pos
-
-
-def determine_thumb_position(hand_list, finger_list):
-    """
-    Determines the order of the list. When given the list the thumb is the
-    first item on the list. But, if the thumb is on the right side of the
-    hand (from user facing the screen), then the list needs to be reversed.
-
-    Parameter:
-        hand_list (list): tuple containing the joints coords
-        finger_list (list): list containing the x or y points of the joints
-
-    return (list): list of fingers points in order from left to right of the
-    screen
-    """
-    wrist = hand_list[0][0]
-    thumb_knuckle = hand_list[1][0]
-    if thumb_knuckle > wrist:
-        finger_list.reverse()
-    return finger_list
-
-
-def collect_finger_points(hand_list):
-    """
-    This creates the finger_list based on the data from hand_list and the
-    FINGER_COORD and THUMB_COORD. It creates the list so the thumb is in the
-    0th index and then goes from index to pinky. Finally, it checks the
-    position of the thumb and will reverse the list if the thumb is on the
-    right side.
-
-    Parameter:
-        hand_list (list): tuple containing the joints coords
-
-    return (list): contains list containing the x or y values relative to the
-                   focal point
-    """
-    returned_finger_list = []
-    for hand in hand_list:
-        finger_list = finger_position_relative_to_focal_point(
-            hand, THUMB_COORD, thumb=True)
-        finger_list += finger_position_relative_to_focal_point(
-            hand, FINGER_COORD, thumb=False)
-        returned_finger_list.append(determine_thumb_position(hand,
-                                                             finger_list))
-    return returned_finger_list
-
-
-def is_hand_sideways(hand_list):
-    """
-    The hand is counted as sideways or downwards if the thumb MCP or pinky
-    MCP joint is below the wrist. In terms of pixels if their y-position is
-    greater than the wrist it will be counted as sideways or downwards.
-
-    Parameter:
-        hand_list (list): tuple containing the joints coords
-
-    return (list): booleans relating to if the hand is sideways/downwards
-    """
-    hand_sideways = []
-    for hand in hand_list:
-        wrist_y = hand[0][1]
-        thumb_y = hand[2][1]
-        pinky_y = hand[17][1]
-        if pinky_y > wrist_y or thumb_y > wrist_y:
-            hand_sideways.append(True)
-        else:
-            hand_sideways.append(False)
-    return hand_sideways
-
-
-def find_num_of_sideways_hands(hand_index, hand_sideways, hand_tot):
-    """
-
-    Parameter
-        hand_index (int): number of the hand being processed
-        hand_sideways (list):  booleans relating to if the hand is
-                               sideways/downwards
-        hand_tot (int): total number of hands on the screen
-
-    return (int): number of hands sideways indexed after the current hand
-    """
-    if hand_index != hand_tot - 1:
-        num_of_hands_sideways = hand_sideways[hand_index + 1:].count(True)
-    else:
-        num_of_hands_sideways = hand_index
-    return num_of_hands_sideways
-
-
-def finger_counter(finger_list, hand_sideways):
-    """
-    Returns the number of fingers/thumbs that are up.
-    Additionally, it calculates the binary representation if each finger is a
-    binary digit.
-    The counter also starts from the leftmost hand to the right.
-    Leftmost finger on screen is 2**(5*tot_num_hands). Rightmost is 2**0
-
-    Parameter:
-        finger_list (list): list containing the x or y points of the joints
-        hand_sideways (list): booleans relating to if the hand is
-                              sideways/downwards
-
-    return (tuple): Number of fingers up, binary count
-    """
-    binary = 0
-    decimal = 0
-    hand_tot = len(finger_list)
-    for hand_index, hand in enumerate(finger_list):
-        num_of_hands_sideways = find_num_of_sideways_hands(hand_index,
-                                                           hand_sideways,
-                                                           hand_tot)
-        finger_tot = len(hand)  # In most circumstance it is 5
-        exponent = ((hand_tot - num_of_hands_sideways) * finger_tot) - 1
-        for finger_index, finger in enumerate(hand):
-            finger_tip = finger[0]
-            finger_joint = finger[1]
-            if finger_tip > finger_joint:
-                if not hand_sideways[hand_index]:
-                    binary += 2**(exponent - finger_index)
-                decimal += 1
-    return decimal, binary
+        for point in hand.tolist():
+            cv2.circle(image, tuple(point), 10, colour, cv2.FILLED)
 
 
 def calculate_hand_angle(hand):
@@ -337,6 +167,7 @@ def print_hand_number(image, hand_list, hand_sideways, count_decimal):
 
     return: None
     """
+    upright_after = upright_hands_after(hand_sideways)
     for index, hand in enumerate(hand_list):
         angle, hand_downwards, hand_leftwards = calculate_hand_angle(hand)
 
@@ -348,11 +179,8 @@ def print_hand_number(image, hand_list, hand_sideways, count_decimal):
         if count_decimal:
             text = str(len(hand_list) - index)
         else:
-            num_of_hands_sideways = find_num_of_sideways_hands(index,
-                                                               hand_sideways,
-                                                               len(hand_list))
             text = (None if hand_sideways[index] else
-                    str(len(hand_list) - num_of_hands_sideways))
+                    str(upright_after[index] + 1))
         text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_COMPLEX, 5, 5)
         text_place = (
             int(wrist[0] + (multiplier[0] * text_size[1])),  # x-pos
@@ -372,19 +200,41 @@ def keyboard_input(count_decimal, success):
 
     return (tuple): boolean values
     """
-    pressed_key = cv2.waitKey(1)
-    if pressed_key == ord('q'):
-        success = False
-    elif pressed_key == ord('b'):
-        count_decimal = False
-    elif pressed_key == ord('d'):
-        count_decimal = True
-    elif pressed_key == ord('t'):
-        count_decimal = not count_decimal
-    return count_decimal, success
+    return handle_key(cv2.waitKey(1), count_decimal, success)
 
 
-def display_text(image, num_vals, count_decimal, serial_com):
+def send_count(num_vals, count_decimal, serial_com, echo=False):
+    """
+    This sends the count over serial, and optionally prints it, when the
+    value or the counting type has changed since it was last sent. The type
+    and value go in one message, encoded in the display's format by the
+    serial writer.
+
+    Parameter:
+        num_vals (list): contains decimal, binary, last printed val and type
+        count_decimal (bool): determines if it is counting in decimal
+        serial_com (SerialWriter): sends the count to the display
+        echo (bool): determines if the count is also printed to stdout
+
+    return: None
+    """
+    if count_decimal:
+        count_str = "Decimal"
+        display_number = num_vals[0]
+    else:
+        count_str = "Binary"
+        display_number = num_vals[1]
+    if display_number == num_vals[2] and count_str == num_vals[3]:
+        return
+    if serial_com:
+        serial_com.write((count_str, display_number))
+    if echo:
+        print(f"{count_str}: {display_number}", flush=True)
+    num_vals[2] = display_number
+    num_vals[3] = count_str
+
+
+def display_text(image, num_vals, count_decimal):
     """
     This puts the text on the image for when it is shown.
 
@@ -392,7 +242,6 @@ def display_text(image, num_vals, count_decimal, serial_com):
         image (ndarray): array used to represent the image
         num_vals (list): contains decimal, binary, last printed val and type
         count_decimal (bool): determines if it is counting in decimal
-        serial_com (Serial): the serial connection to the specified port
 
     return: None
     """
@@ -406,61 +255,733 @@ def display_text(image, num_vals, count_decimal, serial_com):
                 cv2.FONT_HERSHEY_PLAIN, 12, (0, 255, 0), 12)
     cv2.putText(image, f"Counting in {count_str}", (150, 200),
                 cv2.FONT_HERSHEY_PLAIN, 3, (255, 255, 255), 2)
-    if serial_com and (display_number != num_vals[2] or
-                       count_str != num_vals[3]):
-        serial_com.write(f'{count_str}:\n'.encode('ascii'))
-        serial_com.write(f'{display_number}\n'.encode('ascii'))
-        num_vals[2] = display_number
-        num_vals[3] = count_str
 
 
-def main():
+def process_frame(image, frame_index=None, detector=None, mirror=False,
+                  pool=None):
     """
-    This is the main function of the program. It starts the camera and checks
-    there is a valid camera that can be used. It then processes the image to
-    find the landmarks. The landmarks and then used for the logic to see if
-    the fingers are up or down.
+    The inference stage. It flips the captured image, finds the hand
+    landmarks and counts the fingers that are up.
 
-    return:
+    When only the counts are needed the image doesn't have to be flipped at
+    all. In mirror mode the landmarks found in the captured image are
+    mirrored instead, which gives the same counts.
+
+    Parameter:
+        image (ndarray): the BGR image read from the camera
+        frame_index (int): number of the frame in its source
+        detector (HandDetector): finds the landmarks, runs HANDS on every
+                                 frame when None
+        mirror (bool): mirror the landmarks instead of flipping the image
+        pool (BufferPool): the flipped image is written into one of its
+                           buffers instead of a new array, and the captured
+                           image is released to it once flipped
+
+    return (FrameResult): the flipped image with its landmarks and counts
+    """
+    if not mirror:
+        flipped = None if pool is None else pool.acquire(image.shape)
+        captured, image = image, cv2.flip(image, flipCode=1, dst=flipped)
+        if pool is not None:
+            pool.release(captured)
+    landmarks = (detector or DETECTOR).detect(image, frame_index)
+    if landmarks is None:
+        return FrameResult(image, None, None, None, None, 0, 0)
+    if mirror:
+        landmarks = landmarks.copy()
+        landmarks[..., 0] = 1 - landmarks[..., 0]
+    hand_list = convert_coords_to_pixels(landmarks, image)
+    finger_list = collect_finger_points(hand_list)
+    hand_sideways = is_hand_sideways(hand_list)
+    decimal, binary = finger_counter(finger_list, hand_sideways)
+    return FrameResult(image, landmarks, hand_list, finger_list,
+                       hand_sideways, decimal, binary)
+
+
+def release_result(pool, frame):
+    """
+    Gives a processed frame's image back to the pool, once it has been
+    drawn and shown.
+
+    Parameter:
+        pool (BufferPool): the pool the image may have come from
+        frame (FrameResult): the output of process_frame
+
+    return: None
+    """
+    pool.release(frame.image)
+
+
+def identify_hands(identities, process, image, frame_index):
+    """
+    Processes a frame and gives its hands the IDs they had in the previous
+    frames.
+
+    Parameter:
+        identities (HandIdentities): tracks the hands between frames
+        process (callable): process_frame with its options
+        image (ndarray): the BGR image read from the camera
+        frame_index (int): number of the frame in its source
+
+    return (FrameResult): the processed frame with the hand IDs
+    """
+    frame = process(image, frame_index)
+    return frame._replace(hand_ids=identities.update(frame.hand_list,
+                                                     frame.image.shape))
+
+
+def smooth_frame(smoother, process, image, frame_index):
     """
-    success, image, cap = start_camera()
-    serial_com = start_serial()
+    Processes a frame and steadies its count.
+
+    Parameter:
+        smoother (CountSmoother): the smoothing stage
+        process (callable): process_frame with its options
+        image (ndarray): the BGR image read from the camera
+        frame_index (int): number of the frame in its source
+
+    return (FrameResult): the processed frame with the steadied count
+    """
+    return smoother.update(process(image, frame_index), finger_counter)
+
+
+def adapt_quality(controller, process, image, frame_index):
+    """
+    Processes a frame and gives the time it took to the quality controller.
+
+    Parameter:
+        controller (QualityController): chooses the quality level
+        process (callable): process_frame with its options
+        image (ndarray): the BGR image read from the camera
+        frame_index (int): number of the frame in its source
+
+    return (FrameResult): the processed frame
+    """
+    start = time.perf_counter()
+    frame = process(image, frame_index)
+    controller.observe(time.perf_counter() - start)
+    return frame
+
+
+def draw_connections(hand_list, image):
+    """
+    This draws the lines between the joints of each hand.
+
+    Parameter:
+        hand_list (ndarray): array containing the finger points in pixels
+        image (array): array containing content about the image
+
+    return: None
+    """
+    for hand in hand_list.tolist():
+        for start, end in HAND_CONNECTIONS:
+            cv2.line(image, tuple(hand[start]), tuple(hand[end]),
+                     (255, 255, 255), 2)
+
+
+def draw_hands(frame, count_decimal):
+    """
+    The render stage. This draws the landmarks, points and hand numbers onto
+    the frame's image.
+
+    Parameter:
+        frame (FrameResult): the output of process_frame
+        count_decimal (bool): determines if it is counting in decimal
+
+    return: None
+    """
+    if frame.hand_list is None:
+        return
+    hand_ids = frame.hand_ids
+    if hand_ids is None:
+        hand_ids = range(len(frame.hand_list))
+    draw_connections(frame.hand_list, frame.image)
+    draw_points(frame.hand_list, frame.image,
+                [HAND_COLOURS[hand_id % len(HAND_COLOURS)]
+                 for hand_id in hand_ids])
+    print_hand_number(frame.image, frame.hand_list, frame.hand_sideways,
+                      count_decimal)
+
+
+def record_count(count_writer, frame_index, frame, _count_decimal,
+                 fps=None):
+    """
+    Writes a frame's count to the output file.
+
+    Parameter:
+        count_writer (CountWriter): the output file
+        frame_index (int): number of the frame in its source
+        frame (FrameResult): the output of process_frame
+        _count_decimal (bool): the counting mode, which isn't written
+        fps (float): frame rate of a recorded source, used for the frame's
+                     timestamp. Live sources use the time it was processed.
+
+    return: None
+    """
+    num_hands = 0 if frame.hand_list is None else len(frame.hand_list)
+    timestamp = frame_index / fps if fps else None
+    count_writer.write(frame_index, num_hands, frame.decimal, frame.binary,
+                       timestamp)
+
+
+def record_event(events, frame_index, frame, count_decimal):
+    """
+    Adds a frame's count to the change event log.
+
+    Parameter:
+        events (CountEventLog): the log of count changes
+        frame_index (int): number of the frame in its source
+        frame (FrameResult): the output of process_frame
+        count_decimal (bool): Determines if counting in decimal or binary
+
+    return: None
+    """
+    events.update(frame_index, frame.decimal, frame.binary, count_decimal)
+
+
+def record_all(recorders, frame_index, frame, count_decimal):
+    """
+    Gives a frame's count to each of the recorders.
+
+    Parameter:
+        recorders (list): callables taking the frame number, frame and mode
+        frame_index (int): number of the frame in its source
+        frame (FrameResult): the output of process_frame
+        count_decimal (bool): Determines if counting in decimal or binary
+
+    return: None
+    """
+    for record in recorders:
+        record(frame_index, frame, count_decimal)
+
+
+def run_window(pipeline, serial_com, success, record=None, metrics=None):
+    """
+    Draws each processed frame and shows it in a window, reading the
+    keyboard through cv2.waitKey.
+
+    Parameter:
+        pipeline (FramePipeline): yields the processed frames
+        serial_com (Serial): the serial connection to the specified port
+        success (bool): Determines if program continues
+        record (callable): called with each frame number, frame and
+                           counting mode
+        metrics (StageMetrics): times the drawing, input, serial and display
+
+    return: None
+    """
+    metrics = metrics or StageMetrics()
     count_decimal = True
+    # Kept between frames, so send_count knows what the display was last
+    # sent and only writes to it when the count changes
+    num_vals = [0, 0, -1, ""]
+    for frame_index, frame in pipeline.indexed():
+        num_vals[0], num_vals[1] = frame.decimal, frame.binary
+        with metrics.stage("input"):
+            count_decimal, success = keyboard_input(count_decimal, success)
+        if record:
+            record(frame_index, frame, count_decimal)
+        with metrics.stage("draw"):
+            draw_hands(frame, count_decimal)
+            display_text(frame.image, num_vals, count_decimal)
+        with metrics.stage("serial"):
+            send_count(num_vals, count_decimal, serial_com)
+        if metrics.overlay:
+            draw_metrics(frame.image, metrics)
+        with metrics.stage("display"):
+            cv2.imshow("Counting number of fingers", frame.image)
+        metrics.frame_done()
+        if not success:
+            break
+
+
+def run_headless(pipeline, serial_com, success, record=None, metrics=None):
+    """
+    Sends each frame's count to serial and stdout without drawing anything.
+    The keys are read from stdin or signals instead of a window.
+
+    Parameter:
+        pipeline (FramePipeline): yields the processed frames
+        serial_com (Serial): the serial connection to the specified port
+        success (bool): Determines if program continues
+        record (callable): called with each frame number, frame and
+                           counting mode
+        metrics (StageMetrics): times the serial write
 
-    while success:
-        # Grab the image and convert to RGB. Following this, identifying if
-        # there are any hand landmarks.
-        success, image = cap.read()
-        image = cv2.flip(image, flipCode=1)
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = HANDS.process(rgb_image)
-        multi_land_marks = results.multi_hand_landmarks
-        num_vals = [0, 0, -1, ""]  # decimal, binary and previous printed val
-
-        if multi_land_marks:
-            for hand_num, _hand in enumerate(multi_land_marks):
-
-                if hand_num not in hand_dict:
-                    hand_dict[hand_num] = (randint(0, 255), randint(0, 255),
-                                           randint(0, 255))
-                MP_DRAW.draw_landmarks(image, multi_land_marks[hand_num],
-                                       MP_HANDS.HAND_CONNECTIONS)
-
-            hand_list = convert_coords_to_pixels(multi_land_marks, image)
-            hand_sideways = is_hand_sideways(hand_list)
-            draw_points(hand_list, image, hand_dict)
-            finger_list = collect_finger_points(hand_list)
-            num_vals[0], num_vals[1] = finger_counter(finger_list,
-                                                      hand_sideways)
-            print_hand_number(image, hand_list, hand_sideways, count_decimal)
-
-        count_decimal, success = keyboard_input(count_decimal, success)
-        display_text(image, num_vals, count_decimal, serial_com)
-        cv2.imshow("Counting number of fingers", image)
-
-    cap.release()
-    cv2.destroyAllWindows()
-    serial_com.close()
+    return: None
+    """
+    metrics = metrics or StageMetrics()
+    keys = start_headless_input()
+    count_decimal = True
+    num_vals = [0, 0, -1, ""]
+    for frame_index, frame in pipeline.indexed():
+        num_vals[0], num_vals[1] = frame.decimal, frame.binary
+        count_decimal, success = headless_input(keys, count_decimal, success)
+        if record:
+            record(frame_index, frame, count_decimal)
+        with metrics.stage("serial"):
+            send_count(num_vals, count_decimal, serial_com, echo=True)
+        metrics.frame_done()
+        if not success:
+            break
+
+
+async def run_async(pipeline, sinks, success, record=None, metrics=None):
+    """
+    Headless mode on an asyncio event loop. The frames are taken from the
+    pipeline on a worker thread and each frame's count is published to every
+    sink, which never waits for them to send it.
+
+    Parameter:
+        pipeline (FramePipeline): yields the processed frames
+        sinks (list): the Sinks the counts are published to
+        success (bool): Determines if program continues
+        record (callable): called with each frame number, frame and
+                           counting mode
+        metrics (StageMetrics): times the publishing
+
+    return: None
+    """
+    metrics = metrics or StageMetrics()
+    loop = asyncio.get_running_loop()
+    keys = start_headless_input()
+    count_decimal = True
+    frames = pipeline.indexed()
+    for sink in sinks:
+        await sink.start()
+    try:
+        while success:
+            item = await loop.run_in_executor(None, next, frames, None)
+            if item is None:
+                break
+            frame_index, frame = item
+            count_decimal, success = headless_input(keys, count_decimal,
+                                                    success)
+            if record:
+                record(frame_index, frame, count_decimal)
+            with metrics.stage("publish"):
+                message = count_message(frame_index, frame, count_decimal)
+                for sink in sinks:
+                    sink.publish(message)
+            metrics.frame_done()
+    finally:
+        for sink in sinks:
+            await sink.close()
+
+
+def parse_args(argv=None):
+    """
+    Reads the command line options.
+
+    Parameter:
+        argv (list): the arguments, sys.argv is used when None
+
+    return (Namespace): the parsed options
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--headless", action="store_true",
+                        help="don't open a window or draw on the frames, "
+                             "take keys from stdin and print the counts")
+    parser.add_argument("--source", default="0",
+                        help="camera number, video file or directory of "
+                             "images to read the frames from (default: 0)")
+    parser.add_argument("--realtime", action="store_true",
+                        help="play video files and images at their frame "
+                             "rate instead of as fast as possible")
+    parser.add_argument("--output",
+                        help="write each frame's count to this .csv or "
+                             ".jsonl file")
+    parser.add_argument("--events",
+                        help="write a JSON lines log of when the count "
+                             "changes to this file")
+    parser.add_argument("--cache",
+                        help="directory to cache the landmarks of video "
+                             "files and images in")
+    parser.add_argument("--cache-size", type=int, default=1024,
+                        help="size limit of the cache in MiB (default: "
+                             "1024)")
+    parser.add_argument("--cache-by-content", action="store_true",
+                        help="match cached videos by their content instead "
+                             "of their path")
+    parser.add_argument("--detect-every", type=int, default=1,
+                        help="run inference once every this many frames "
+                             "and track the hands in between (default: 1)")
+    parser.add_argument("--motion-threshold", type=float, default=0.02,
+                        help="run inference early when the tracked hands "
+                             "move this fraction of the image diagonal in "
+                             "one frame (default: 0.02)")
+    parser.add_argument("--inference-scale", type=float, default=1.0,
+                        help="resize the image by this factor before "
+                             "inference (default: 1.0)")
+    parser.add_argument("--roi", action="store_true",
+                        help="run inference on a crop around the hands "
+                             "found in the previous frame, with the model "
+                             "in static image mode")
+    parser.add_argument("--roi-padding", type=float, default=0.25,
+                        help="space around the hands in the crop, as a "
+                             "fraction of their size (default: 0.25)")
+    parser.add_argument("--gate", action="store_true",
+                        help="only run inference when the scene changes "
+                             "or hands are in view")
+    parser.add_argument("--skin-gate", action="store_true",
+                        help="like --gate, but the change must include "
+                             "skin colours")
+    parser.add_argument("--idle-after", type=float, default=0.0,
+                        help="read a live source at --idle-fps after this "
+                             "many seconds with no motion or hands, needs "
+                             "--gate or --skin-gate (default: never)")
+    parser.add_argument("--idle-fps", type=float, default=2.0,
+                        help="frame rate while idle (default: 2)")
+    budget = parser.add_mutually_exclusive_group()
+    budget.add_argument("--target-fps", type=float,
+                        help="adjust the inference resolution, model and "
+                             "how often inference runs to process frames "
+                             "at this rate")
+    budget.add_argument("--latency-budget", type=float, metavar="MS",
+                        help="like --target-fps, but for the milliseconds "
+                             "each frame may take")
+    parser.add_argument("--record",
+                        help="record the landmarks of every frame to this "
+                             "file")
+    parser.add_argument("--max-hands", type=int, default=2,
+                        help="most hands found and counted in a frame "
+                             "(default: 2)")
+    parser.add_argument("--streams", nargs="+", metavar="SOURCE",
+                        help="count the fingers in all of these sources at "
+                             "once on a pool of processes and print each "
+                             "frame's count as a JSON line")
+    parser.add_argument("--serve", metavar="HOST:PORT",
+                        help="count the fingers in JPEG and PNG images "
+                             "POSTed to this address")
+    parser.add_argument("--workers", type=int,
+                        help="processes counting the --streams or --serve "
+                             "images (default: one per core)")
+    parser.add_argument("--replay",
+                        help="count the fingers in a landmark recording "
+                             "instead of reading frames")
+    parser.add_argument("--replay-events",
+                        help="print the count changes in an --events log, "
+                             "at the pace they happened with --realtime")
+    parser.add_argument("--smooth-window", type=int, default=1,
+                        help="only change the count when more than half "
+                             "of this many recent frames agree (default: "
+                             "1)")
+    parser.add_argument("--hysteresis", type=float, default=0.0,
+                        help="distance a finger must move past its "
+                             "threshold to change state, as a fraction of "
+                             "the hand's size (default: 0)")
+    parser.add_argument("--hold-time", type=float, default=0.0,
+                        help="seconds to keep a new count before it can "
+                             "change again (default: 0)")
+    parser.add_argument("--sink", action="append", default=[],
+                        help="in headless mode, publish the counts to this "
+                             "output instead: serial, stdout, jsonl:PATH, "
+                             "udp:HOST:PORT, unix:PATH or ws:HOST:PORT. "
+                             "Can be given more than once")
+    parser.add_argument("--serial-protocol", default="auto",
+                        choices=["auto", "text", "binary"],
+                        help="format the count is sent to the display in, "
+                             "auto asks the display (default: auto)")
+    parser.add_argument("--metrics",
+                        help="export the latency of each stage to this "
+                             "Prometheus text file, or as JSON lines on "
+                             "stdout when -")
+    parser.add_argument("--metrics-interval", type=float, default=5.0,
+                        help="seconds between metrics exports (default: 5)")
+    parser.add_argument("--metrics-overlay", action="store_true",
+                        help="show the frame rate and stage latencies on "
+                             "the window")
+    args = parser.parse_args(argv)
+    if args.sink and not args.headless:
+        parser.error("--sink needs --headless")
+    if args.idle_after and not (args.gate or args.skin_gate):
+        parser.error("--idle-after needs --gate or --skin-gate")
+    for spec in args.sink:
+        try:
+            open_sink(spec)
+        except ValueError as error:
+            parser.error(str(error))
+    return args
+
+
+def replay_recording(path, output=None):
+    """
+    Counts the fingers in every frame of a landmark recording. No camera or
+    model is used, the frames are counted in chunks with count_fingers_batch.
+
+    Parameter:
+        path (str): the landmark recording
+        output (str): .csv or .jsonl file to write each frame's count to
+
+    return (tuple): int64 arrays of the decimal and binary count per frame.
+                    The binary count holds Python ints when the recording
+                    stores more than 12 hands a frame.
+    """
+    replayer = LandmarkReplayer(path)
+    decimal = np.zeros(len(replayer), dtype=np.int64)
+    # Same cut-off as count_fingers_batch, past which a count needs more
+    # bits than int64 has
+    fingers_per_hand = len(FINGER_COORD) + len(THUMB_COORD)
+    wide = replayer.max_hands * fingers_per_hand >= 63
+    binary = np.zeros(len(replayer), dtype=object if wide else np.int64)
+    for start in range(0, len(replayer), REPLAY_CHUNK):
+        hand_list, hands_per_frame = replayer.pixel_landmarks(
+            start, start + REPLAY_CHUNK)
+        decimal[start:start + len(hand_list)], \
+            binary[start:start + len(hand_list)] = count_fingers_batch(
+                hand_list, hands_per_frame)
+    if output:
+        timestamps = replayer.records["timestamp"]
+        with CountWriter(output) as count_writer:
+            for frame_index, num_hands in enumerate(replayer.records["hands"]):
+                count_writer.write(
+                    frame_index, num_hands, decimal[frame_index],
+                    binary[frame_index],
+                    timestamps[frame_index] - timestamps[0])
+    return decimal, binary
+
+
+def open_cache(args, stack):
+    """
+    Opens the landmark cache for the source given on the command line.
+
+    Parameter:
+        args (Namespace): the parsed options
+        stack (ExitStack): closes the cache when the program finishes
+
+    return (CachedLandmarks): the source's cached landmarks, or None when
+                              caching is off
+    """
+    if not args.cache:
+        return None
+    landmark_cache = LandmarkCache(args.cache, args.cache_size << 20,
+                                   args.max_hands)
+    stack.callback(landmark_cache.close)
+    return landmark_cache.open(LandmarkCache.source_key(
+        args.source, args.cache_by_content))
+
+
+def replay_events(path, realtime=False):
+    """
+    Prints each count in a change event log.
+
+    Parameter:
+        path (str): the log written with --events
+        realtime (bool): wait between the changes as long as they lasted
+
+    return: None
+    """
+    for run in CountEventLog.load(path).replay(realtime):
+        print(f"{run.time:.3f} frame {run.frame}: {run.mode} "
+              f"{run.decimal if run.mode == 'Decimal' else run.binary}"
+              f" for {run.frames} frames")
+
+
+def open_recorders(args, source, stack):
+    """
+    Opens the output file and change event log asked for on the command line.
+
+    Parameter:
+        args (Namespace): the command line options
+        source (FrameSource): the source of the frames
+        stack (ExitStack): closes the files when the program finishes
+
+    return (callable): records each frame's count, or None when there is
+                       nothing to record
+    """
+    fps = None if source.live else source.fps
+    recorders = []
+    if args.output:
+        recorders.append(partial(
+            record_count, stack.enter_context(CountWriter(args.output)),
+            fps=fps))
+    if args.events:
+        recorders.append(partial(
+            record_event,
+            stack.enter_context(CountEventLog(args.events, fps=fps))))
+    return partial(record_all, recorders) if recorders else None
+
+
+def model_builder(args):
+    """
+    Parameter:
+        args (Namespace): the parsed options
+
+    return (callable): builds the model for the options. The crop around
+                       the hands moves and changes size between frames, so
+                       with --roi the model treats each frame as a separate
+                       image rather than tracking the hands across crops.
+    """
+    return partial(make_hands, max_num_hands=args.max_hands,
+                   static_image_mode=args.roi)
+
+
+def open_detector(args, source, stack):
+    """
+    Sets up the detector with the options given on the command line.
+
+    Parameter:
+        args (Namespace): the parsed options
+        source (FrameSource): the source being read, live sources aren't
+                              cached
+        stack (ExitStack): closes the cache and recording when the program
+                           finishes
+
+    return (HandDetector): the detector
+    """
+    recorder = None
+    if args.record:
+        recorder = stack.enter_context(LandmarkRecorder(args.record,
+                                                        args.max_hands))
+    cache = None if source.live else open_cache(args, stack)
+    detector = HandDetector(HANDS, cache, recorder)
+    if args.detect_every > 1:
+        detector.tracker = LandmarkTracker(args.detect_every,
+                                           args.motion_threshold)
+    if args.roi or args.inference_scale != 1:
+        detector.roi = RegionOfInterest(args.inference_scale, args.roi,
+                                        args.roi_padding)
+    if args.gate or args.skin_gate:
+        detector.gate = PresenceGate(skin=args.skin_gate)
+    return detector
+
+
+def start_quality_control(args, detector, process):
+    """
+    Puts the quality controller around the frame processing when a frame
+    rate or latency is targeted.
+
+    Parameter:
+        args (Namespace): the parsed options
+        detector (HandDetector): the detector the controller adjusts
+        process (callable): process_frame with its options
+
+    return (callable): process, timed for the controller when there is one
+    """
+    if args.target_fps:
+        budget = 1 / args.target_fps
+    elif args.latency_budget:
+        budget = args.latency_budget / 1000
+    else:
+        return process
+    controller = QualityController(
+        budget, partial(apply_level, detector, HANDS.build,
+                        motion_threshold=args.motion_threshold),
+        relative_levels(args.inference_scale, args.detect_every),
+        log=partial(print, file=sys.stderr, flush=True))
+    return partial(adapt_quality, controller, process)
+
+
+def start_metrics(args, detector, stack):
+    """
+    Sets up the timing of the frame loop and its export.
+
+    Parameter:
+        args (Namespace): the parsed options
+        detector (HandDetector): its model calls are timed as a stage
+        stack (ExitStack): exports the final figures when the program
+                           finishes
+
+    return (StageMetrics): the metrics the frame loop records into
+    """
+    metrics = StageMetrics(overlay=args.metrics_overlay)
+    detector.run_model = metrics.timed("model", detector.run_model)
+    if detector.gate is not None:
+        metrics.listeners.append(partial(update_gate_gauges, metrics,
+                                         detector.gate))
+    if args.metrics:
+        exporter = MetricsExporter(metrics, args.metrics,
+                                   args.metrics_interval)
+        metrics.listeners.append(exporter.poll)
+        stack.callback(exporter.export)
+    return metrics
+
+
+def main(argv=None):
+    """
+    This is the main function of the program. It opens the camera, or the
+    video/images given on the command line, and checks they can be used.
+    Frames are then captured and processed to find the landmarks on their own
+    threads, while this thread draws and shows the results. The landmarks and
+    then used for the logic to see if the fingers are up or down.
+
+    Parameter:
+        argv (list): the command line arguments
+
+    return:
+    """
+    args = parse_args(argv)
+    if args.replay:
+        decimal, _binary = replay_recording(args.replay, args.output)
+        print(f"Replayed {len(decimal)} frames")
+        return
+    if args.replay_events:
+        replay_events(args.replay_events, args.realtime)
+        return
+    if args.streams:
+        count_streams(args.streams, args.workers, args.realtime,
+                      args.max_hands)
+        return
+    if args.serve:
+        serve(args.serve, args.workers, args.max_hands)
+        return
+    # The model is built while the camera opens
+    HANDS.build = model_builder(args)
+    HANDS.prewarm()
+    try:
+        source = open_source(args.source, args.realtime)
+    except OSError as error:
+        print(error)
+        sys.exit()
+
+    with ExitStack() as stack:
+        stack.callback(source.release)
+        # The display is opened and written to on its own thread, which
+        # reconnects if it is unplugged or wasn't plugged in at the start
+        serial_com = SerialWriter(
+            partial(start_serial, report=False),
+            negotiate=partial(negotiate, preferred=args.serial_protocol),
+            first_connect=start_serial).start()
+        stack.callback(serial_com.close)
+        record = open_recorders(args, source, stack)
+        detector = open_detector(args, source, stack)
+        metrics = start_metrics(args, detector, stack)
+        # Nothing is drawn in headless mode, so the frames aren't flipped.
+        # The cache and recording keep the flipped landmarks, so they stay
+        # interchangeable with runs that show a window.
+        pool = BufferPool()
+        process = partial(process_frame, detector=detector,
+                          mirror=args.headless and detector.cache is None
+                          and detector.recorder is None, pool=pool)
+        process = start_quality_control(args, detector, process)
+        process = partial(identify_hands, HandIdentities(
+            max_tracks=max(8, 2 * args.max_hands)), process)
+        if args.smooth_window > 1 or args.hysteresis or args.hold_time:
+            process = partial(smooth_frame, CountSmoother(
+                args.smooth_window, args.hysteresis, args.hold_time), process)
+        read = PooledReader(source, pool).read
+        if detector.gate is not None and args.idle_after and source.live:
+            detector.gate.throttle = IdleThrottle(read, args.idle_after,
+                                                  args.idle_fps)
+            read = detector.gate.throttle.read
+        pipeline = FramePipeline(
+            metrics.timed("capture", read),
+            metrics.timed("inference", process),
+            drop_frames=source.live, pass_frame_index=True,
+            release_frame=pool.release,
+            release_result=partial(release_result, pool)).start()
+        stack.callback(pipeline.stop)
+        metrics.listeners.insert(0, partial(update_pipeline_gauges, metrics,
+                                            pipeline))
+        if args.sink:
+            asyncio.run(run_async(
+                pipeline, [open_sink(spec, serial_com) for spec in args.sink],
+                True, record, metrics))
+        elif args.headless:
+            run_headless(pipeline, serial_com, True, record, metrics)
+        else:
+            stack.callback(cv2.destroyAllWindows)
+            run_window(pipeline, serial_com, True, record, metrics)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,312 @@
+"""
+Times each stage of the frame loop, so a slow frame can be put down to the
+capture, the model, drawing, showing the window or the serial write. Each
+stage keeps its most recent latencies, from which the p50/p95/p99 are found,
+and the frame rate is worked out from when the recent frames finished.
+
+The figures are exported every few seconds, either as a Prometheus text file
+that node_exporter's textfile collector can pick up, or as JSON lines.
+"""
+from pathlib import Path
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+WINDOW = 512  # Recent latencies kept for each stage
+QUANTILES = (50, 95, 99)
+PREFIX = "finger_counter"
+
+
+class LatencyWindow:
+    """
+    The most recent latencies of a stage, in a fixed size ring buffer so
+    recording one is cheap and the memory used doesn't grow.
+    """
+
+    def __init__(self, size=WINDOW):
+        """
+        Parameter:
+            size (int): number of recent latencies kept
+        """
+        self._samples = np.zeros(size)
+        self._next = 0
+        self.count = 0  # Every latency recorded since the start
+        self.total = 0.0  # Sum of every latency, in seconds
+
+    def add(self, seconds):
+        """
+        Records a latency, overwriting the oldest once the window is full.
+
+        Parameter:
+            seconds (float): the latency
+
+        return: None
+        """
+        self._samples[self._next] = seconds
+        self._next = (self._next + 1) % len(self._samples)
+        self.count += 1
+        self.total += seconds
+
+    def recent(self):
+        """
+        return (ndarray): the latencies still in the window, oldest first
+        """
+        if self.count < len(self._samples):
+            return self._samples[:self._next].copy()
+        return np.roll(self._samples, -self._next)
+
+    def quantiles(self):
+        """
+        return (dict): the p50, p95 and p99 of the recent latencies in
+                       seconds, empty before anything has been recorded
+        """
+        recent = self.recent()
+        if len(recent) == 0:
+            return {}
+        return dict(zip((f"p{quantile}" for quantile in QUANTILES),
+                        np.percentile(recent, QUANTILES).tolist()))
+
+
+class _StageTimer:
+    """Context manager that records the time spent inside it."""
+
+    def __init__(self, window):
+        self._window = window
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_exc_info):
+        self._window.add(time.perf_counter() - self._start)
+
+
+class StageMetrics:
+    """
+    The latencies of every stage of the frame loop and the frame rate.
+    Stages are created the first time they are timed. Each stage should only
+    be timed from one thread.
+    """
+
+    def __init__(self, window=WINDOW, overlay=False):
+        """
+        Parameter:
+            window (int): number of recent latencies and frames kept
+            overlay (bool): draw the figures onto the frames that are shown
+        """
+        self.window = window
+        self.overlay = overlay
+        self.stages = {}
+        self.gauges = {}  # Other figures exported as they are
+        self.listeners = []  # Called after each frame, e.g. to export
+        self._timers = {}
+        self._frame_times = LatencyWindow(window)
+
+    def stage(self, name):
+        """
+        Times the code inside a with block.
+
+        Parameter:
+            name (str): the stage's name
+
+        return (context manager): records the time spent inside it
+        """
+        timer = self._timers.get(name)
+        if timer is None:
+            self.stages[name] = LatencyWindow(self.window)
+            timer = self._timers[name] = _StageTimer(self.stages[name])
+        return timer
+
+    def timed(self, name, function):
+        """
+        Wraps a function so each call is timed as a stage.
+
+        Parameter:
+            name (str): the stage's name
+            function (callable): the function to time
+
+        return (callable): takes the same arguments as function
+        """
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+
+    def frame_done(self):
+        """
+        Records that a frame has gone through every stage, then calls the
+        listeners.
+
+        return: None
+        """
+        self._frame_times.add(time.monotonic())
+        for listener in self.listeners:
+            listener()
+
+    def fps(self):
+        """
+        return (float): the frame rate over the recent frames
+        """
+        times = self._frame_times.recent()
+        if len(times) < 2 or times[-1] == times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def summary(self):
+        """
+        return (dict): the fps, frame count, gauges and each stage's
+                       quantiles, count and mean in seconds
+        """
+        # Copied in one step first, since the capture and inference threads
+        # can add new stages while the summary is being made
+        stages = list(self.stages.items())
+        return {
+            "time": time.time(),
+            "fps": self.fps(),
+            "frames": self._frame_times.count,
+            "gauges": dict(self.gauges),
+            "stages": {name: dict(window.quantiles(), count=window.count,
+                                  mean=window.total / max(window.count, 1))
+                       for name, window in stages}}
+
+
+def update_pipeline_gauges(metrics, pipeline):
+    """
+    Copies the pipeline's queue depths and dropped frames into the metrics.
+
+    Parameter:
+        metrics (StageMetrics): the metrics to update
+        pipeline (FramePipeline): the running pipeline
+
+    return: None
+    """
+    for name, depth in pipeline.queue_depths().items():
+        metrics.gauges[f"{name}_queue_depth"] = depth
+    for name, dropped in pipeline.dropped_frames().items():
+        metrics.gauges[f"{name}_dropped_frames"] = dropped
+
+
+def update_gate_gauges(metrics, gate):
+    """
+    Copies the frames the presence gate skipped, and whether the capture is
+    idle, into the metrics.
+
+    Parameter:
+        metrics (StageMetrics): the metrics to update
+        gate (PresenceGate): the gate in front of the model
+
+    return: None
+    """
+    metrics.gauges["gate_skipped_frames"] = gate.skipped_frames
+    if gate.throttle is not None:
+        metrics.gauges["idle"] = int(gate.throttle.idle)
+
+
+def prometheus_text(summary):
+    """
+    Formats a summary in the Prometheus text exposition format.
+
+    Parameter:
+        summary (dict): the output of StageMetrics.summary
+
+    return (str): the metrics
+    """
+    lines = [f"# HELP {PREFIX}_stage_seconds Latency of each stage of the "
+             "frame loop",
+             f"# TYPE {PREFIX}_stage_seconds summary"]
+    for name, stage in summary["stages"].items():
+        for quantile in QUANTILES:
+            if f"p{quantile}" in stage:
+                lines.append(
+                    f'{PREFIX}_stage_seconds{{stage="{name}",'
+                    f'quantile="{quantile / 100}"}} {stage[f"p{quantile}"]}')
+        lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{name}"}} '
+                     f'{stage["mean"] * stage["count"]}')
+        lines.append(f'{PREFIX}_stage_seconds_count{{stage="{name}"}} '
+                     f'{stage["count"]}')
+    lines += [f"# HELP {PREFIX}_fps Frames per second over the recent frames",
+              f"# TYPE {PREFIX}_fps gauge",
+              f"{PREFIX}_fps {summary['fps']}",
+              f"# TYPE {PREFIX}_frames_total counter",
+              f"{PREFIX}_frames_total {summary['frames']}"]
+    for name, value in summary["gauges"].items():
+        lines += [f"# TYPE {PREFIX}_{name} gauge", f"{PREFIX}_{name} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+def draw_metrics(image, metrics):
+    """
+    Puts the frame rate and the latency of each stage in the bottom left
+    corner of the image.
+
+    Parameter:
+        image (ndarray): array used to represent the image
+        metrics (StageMetrics): the timings of the frame loop
+
+    return: None
+    """
+    summary = metrics.summary()
+    lines = [f"{summary['fps']:.1f} fps"]
+    for name, stage in summary["stages"].items():
+        if "p50" in stage:
+            lines.append(f"{name} p50 {stage['p50'] * 1000:.1f} "
+                         f"p95 {stage['p95'] * 1000:.1f} "
+                         f"p99 {stage['p99'] * 1000:.1f} ms")
+    bottom = image.shape[0] - 10
+    for line_num, line in enumerate(reversed(lines)):
+        cv2.putText(image, line, (10, bottom - line_num * 20),
+                    cv2.FONT_HERSHEY_PLAIN, 1.2, (0, 255, 255), 1)
+
+
+class MetricsExporter:
+    """
+    Exports the metrics at most once every interval seconds. It is called
+    from the frame loop, so it doesn't need a thread of its own.
+    """
+
+    def __init__(self, metrics, destination, interval=5.0):
+        """
+        Parameter:
+            metrics (StageMetrics): the metrics to export
+            destination (str): Prometheus text file to write, or "-" to
+                               print JSON lines to stdout
+            interval (float): seconds between exports
+        """
+        self.metrics = metrics
+        self.destination = destination
+        self.interval = interval
+        self._next_export = time.monotonic() + interval
+
+    def poll(self):
+        """
+        Exports the metrics if the interval has passed.
+
+        return (bool): True if they were exported
+        """
+        now = time.monotonic()
+        if now < self._next_export:
+            return False
+        self._next_export = now + self.interval
+        self.export()
+        return True
+
+    def export(self):
+        """
+        Exports the metrics now. The text file is replaced in one step, so a
+        collector never reads it half written.
+
+        return: None
+        """
+        summary = self.metrics.summary()
+        if self.destination == "-":
+            print(json.dumps(summary), file=sys.stdout, flush=True)
+            return
+        path = Path(self.destination)
+        temporary = path.with_name(path.name + ".tmp")
+        temporary.write_text(prometheus_text(summary), encoding="utf-8")
+        os.replace(temporary, path)
@@ -0,0 +1,243 @@
+"""
+Runs the capture, inference and render stages of the finger counter
+concurrently. The stages are joined by small bounded queues that drop their
+oldest frame when the next stage falls behind, so the frame being rendered
+is never older than the slowest stage rather than the sum of all of them.
+Frames that are dropped or finished with can be handed back, so their
+pooled buffers are reused.
+"""
+from collections import deque
+from queue import Empty
+import threading
+
+
+class QueueClosed(Exception):
+    """Raised when getting from a closed queue that has no items left."""
+
+
+class DropOldestQueue:  # pylint: disable=too-many-instance-attributes
+    """
+    A bounded queue whose put never blocks. When the queue is full the
+    oldest item is discarded to make room for the new one. For sources where
+    every frame matters, such as video files, dropping can be turned off so
+    that put waits for room instead.
+    """
+
+    def __init__(self, maxsize=1, drop_oldest=True, on_drop=None):
+        """
+        Parameter:
+            maxsize (int): number of items held before the oldest is dropped
+            drop_oldest (bool): drop the oldest item rather than waiting
+            on_drop (callable): called with each item that is dropped
+        """
+        self.maxsize = maxsize
+        self.drop_oldest = drop_oldest
+        self.on_drop = on_drop
+        self.dropped = 0
+        self._items = deque()
+        self._closed = False
+        self._not_empty = threading.Condition()
+        self._not_full = threading.Condition(self._not_empty)
+
+    def put(self, item):
+        """
+        Adds an item. If the queue is full, the oldest item is dropped or,
+        when dropping is turned off, this waits until there is room.
+
+        Parameter:
+            item (object): the item to add
+
+        return: None
+        """
+        with self._not_empty:
+            if not self.drop_oldest:
+                self._not_full.wait_for(
+                    lambda: len(self._items) < self.maxsize or self._closed)
+            if len(self._items) >= self.maxsize:
+                dropped = self._items.popleft()
+                self.dropped += 1
+                if self.on_drop is not None:
+                    self.on_drop(dropped)
+            self._items.append(item)
+            self._not_empty.notify()
+
+    def get(self, timeout=None):
+        """
+        Removes and returns the oldest item, waiting for one if needed.
+
+        Parameter:
+            timeout (float): seconds to wait, or None to wait forever
+
+        return (object): the oldest item in the queue
+        """
+        with self._not_empty:
+            if not self._not_empty.wait_for(
+                    lambda: self._items or self._closed, timeout):
+                raise Empty
+            if not self._items:
+                raise QueueClosed
+            self._not_full.notify()
+            return self._items.popleft()
+
+    def close(self):
+        """
+        Marks the queue as finished. Items already queued can still be read,
+        after which get raises QueueClosed.
+
+        return: None
+        """
+        with self._not_empty:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+    def qsize(self):
+        """
+        return (int): number of items currently waiting in the queue
+        """
+        with self._not_empty:
+            return len(self._items)
+
+
+class FramePipeline:  # pylint: disable=too-many-instance-attributes
+    """
+    Reads frames on a capture thread and processes them on an inference
+    thread. The caller is the render stage: iterating over the pipeline
+    yields the processed frames on the calling thread, which is where
+    cv2.imshow and cv2.waitKey have to run.
+    """
+
+    # pylint: disable-next=too-many-arguments
+    def __init__(self, read_frame, process_frame, queue_size=1,
+                 drop_frames=True, pass_frame_index=False,
+                 release_frame=None, release_result=None):
+        """
+        Parameter:
+            read_frame (callable): returns (success, frame), like cap.read
+            process_frame (callable): turns a captured frame into a result,
+                                      and owns the frame from then on
+            queue_size (int): number of items each queue holds
+            drop_frames (bool): drop stale frames, or process every frame
+            pass_frame_index (bool): also pass the frame's number to
+                                     process_frame
+            release_frame (callable): called with each captured frame that
+                                      is dropped before it is processed
+            release_result (callable): called with each result that is
+                                       dropped, or once the caller has
+                                       moved on to the next one
+        """
+        self.release_result = release_result
+        self.read_frame = read_frame
+        if pass_frame_index:
+            self.process_frame = process_frame
+        else:
+            self.process_frame = (
+                lambda frame, _frame_index: process_frame(frame))
+        self.frames = DropOldestQueue(
+            queue_size, drop_frames,
+            None if release_frame is None else
+            lambda item: release_frame(item[1]))
+        self.results = DropOldestQueue(
+            queue_size, drop_frames,
+            None if release_result is None else
+            lambda item: release_result(item[1]))
+        self._stop = threading.Event()
+        self._error = None
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="capture",
+                             daemon=True),
+            threading.Thread(target=self._inference_loop, name="inference",
+                             daemon=True),
+        ]
+
+    def start(self):
+        """
+        Starts the capture and inference threads.
+
+        return (FramePipeline): the pipeline itself
+        """
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        """
+        Asks both threads to finish and waits for them.
+
+        Parameter:
+            timeout (float): seconds to wait for each thread
+
+        return: None
+        """
+        self._stop.set()
+        self.frames.close()
+        self.results.close()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def queue_depths(self):
+        """
+        return (dict): number of items waiting in front of each stage
+        """
+        return {"inference": self.frames.qsize(),
+                "render": self.results.qsize()}
+
+    def dropped_frames(self):
+        """
+        return (dict): number of items each stage's queue has discarded
+        """
+        return {"inference": self.frames.dropped,
+                "render": self.results.dropped}
+
+    def __iter__(self):
+        for _frame_index, result in self.indexed():
+            yield result
+
+    def indexed(self):
+        """
+        Yields the processed frames along with the number of the captured
+        frame they came from, which skips ahead when frames are dropped.
+        Each result is released when the next one is asked for, so it
+        mustn't be kept after that.
+
+        return (generator): tuples of the frame number and the result
+        """
+        while True:
+            try:
+                item = self.results.get()
+            except QueueClosed:
+                break
+            yield item
+            if self.release_result is not None:
+                self.release_result(item[1])
+            del item
+        if self._error is not None:
+            raise self._error
+
+    def _capture_loop(self):
+        try:
+            frame_index = 0
+            while not self._stop.is_set():
+                success, frame = self.read_frame()
+                if not success:
+                    break
+                self.frames.put((frame_index, frame))
+                frame_index += 1
+        except Exception as error:  # pylint: disable=broad-except
+            self._error = error
+        finally:
+            self.frames.close()
+
+    def _inference_loop(self):
+        try:
+            while not self._stop.is_set():
+                try:
+                    frame_index, frame = self.frames.get()
+                except QueueClosed:
+                    break
+                self.results.put(
+                    (frame_index, self.process_frame(frame, frame_index)))
+        except Exception as error:  # pylint: disable=broad-except
+            self._error = error
+        finally:
+            self.results.close()
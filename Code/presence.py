@@ -0,0 +1,148 @@
+"""
+Avoids running the model on empty scenes. PresenceGate is a cheap first
+stage that compares a small greyscale copy of each frame with the last frame
+the model saw, and only runs the model when enough of it changed. It can
+also require some of the changed pixels to be skin coloured. While hands are
+in view the model always runs.
+
+IdleThrottle duty-cycles the capture: after some seconds with no hands and
+no motion it only reads a few frames a second, and goes back to the full
+rate as soon as the gate sees motion or the model finds hands.
+"""
+import threading
+import time
+
+import cv2
+import numpy as np
+
+GATE_SIZE = (64, 48)  # Width and height the frames are compared at
+# Skin colour in the YCrCb colour space, which separates it from the
+# brightness
+SKIN_LOWER = np.array([0, 133, 77], dtype=np.uint8)
+SKIN_UPPER = np.array([255, 173, 127], dtype=np.uint8)
+
+
+class PresenceGate:
+    """
+    Decides for each frame whether the model needs to run. Frames that are
+    skipped have no hands.
+    """
+
+    def __init__(self, threshold=12, min_changed=0.005, skin=False,
+                 throttle=None):
+        """
+        Parameter:
+            threshold (int): change in a pixel's grey level that counts as
+                             motion
+            min_changed (float): fraction of the pixels that must change,
+                                 or be changed skin with skin on, to run the
+                                 model
+            skin (bool): only run the model when the changed pixels include
+                         skin colours
+            throttle (IdleThrottle): woken by motion and hands
+        """
+        self.threshold = threshold
+        self.min_changed = min_changed
+        self.skin = skin
+        self.throttle = throttle
+        self.skipped_frames = 0
+        self._hands = False
+        self._reference = None  # Small grey copy of the last frame inferred
+
+    def changed(self, image):
+        """
+        Measures how much of a frame changed since the model last ran.
+
+        Parameter:
+            image (ndarray): the BGR image
+
+        return (tuple): the fraction of changed pixels, or of changed skin
+                        pixels with skin on, and the frame's small grey copy
+        """
+        small = cv2.resize(image, GATE_SIZE, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        if self._reference is None:
+            return 1.0, gray
+        moved = cv2.absdiff(gray, self._reference) > self.threshold
+        if self.skin:
+            moved &= cv2.inRange(cv2.cvtColor(small, cv2.COLOR_BGR2YCrCb),
+                                 SKIN_LOWER, SKIN_UPPER) > 0
+        return np.count_nonzero(moved) / moved.size, gray
+
+    def update(self, image, infer):
+        """
+        Runs the model on a frame unless nothing changed since the last
+        frame it found no hands in.
+
+        Parameter:
+            image (ndarray): the BGR image
+            infer (callable): runs the model and returns the
+                              (num_hands, 21, 3) normalised landmarks and
+                              the handedness of each hand
+
+        return (tuple): the landmarks and handedness, or None when the
+                        frame was skipped
+        """
+        fraction, gray = self.changed(image)
+        motion = fraction >= self.min_changed
+        if not (self._hands or motion):
+            self.skipped_frames += 1
+            return None
+        landmarks, handedness = infer()
+        self._hands = len(landmarks) > 0
+        self._reference = gray
+        if self.throttle is not None and (motion or self._hands):
+            self.throttle.wake()
+        return landmarks, handedness
+
+
+class IdleThrottle:
+    """
+    Reads frames at the full rate while there is something to count, and
+    at a low polling rate once the scene has been empty for a while.
+    """
+
+    def __init__(self, read, idle_after=10.0, idle_fps=2.0,
+                 clock=time.monotonic):
+        """
+        Parameter:
+            read (callable): reads the next frame
+            idle_after (float): seconds without motion or hands before the
+                                frame rate drops
+            idle_fps (float): frame rate while idle
+            clock (callable): returns the time in seconds
+        """
+        self._read = read
+        self.idle_after = idle_after
+        self.idle_fps = idle_fps
+        self.clock = clock
+        self._last_active = clock()
+        self._woken = threading.Event()
+
+    @property
+    def idle(self):
+        """
+        return (bool): True while reading at the low rate
+        """
+        return self.clock() - self._last_active > self.idle_after
+
+    def wake(self):
+        """
+        Goes back to the full frame rate, cutting short any wait for the
+        next idle frame.
+
+        return: None
+        """
+        self._last_active = self.clock()
+        self._woken.set()
+
+    def read(self):
+        """
+        Reads the next frame, first waiting for the next poll when idle.
+
+        return (tuple): whatever read returns
+        """
+        if self.idle:
+            self._woken.clear()
+            self._woken.wait(1 / self.idle_fps)
+        return self._read()
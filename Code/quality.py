@@ -0,0 +1,201 @@
+"""
+Adapts the cost of inference to the machine it runs on. QualityController
+watches how long each frame takes and moves between quality levels to hold
+a latency budget, which can come from a target frame rate. Each level sets
+the inference resolution, MediaPipe's model complexity and confidences, and
+how often inference runs with the hands tracked in between.
+
+The frames are judged by their mean latency over whole tracking cycles, as
+the cheap tracked frames between inferences would hide the inference frames
+from a median. The controller steps down to a cheaper level as soon as the
+frames are over budget, and only steps back up after a long spell well
+under it. An upgrade that is soon undone makes the next upgrade to that
+level wait twice as long, so a machine just short of a level doesn't keep
+switching to it.
+"""
+from collections import deque, namedtuple
+from functools import partial
+
+import numpy as np
+
+from roi import RegionOfInterest
+from tracking import LandmarkTracker
+
+QualityLevel = namedtuple("QualityLevel", [
+    "scale", "model_complexity", "min_detection_confidence",
+    "min_tracking_confidence", "detect_every"])
+
+# From the best quality to the cheapest. Lower tracking confidence lets
+# MediaPipe keep tracking instead of running its palm detector again, and
+# higher detection confidence keeps it from chasing doubtful palms.
+LEVELS = (
+    QualityLevel(1.0, 1, 0.5, 0.5, 1),
+    QualityLevel(1.0, 0, 0.5, 0.5, 1),
+    QualityLevel(0.75, 0, 0.5, 0.5, 1),
+    QualityLevel(0.75, 0, 0.5, 0.5, 2),
+    QualityLevel(0.5, 0, 0.6, 0.4, 3),
+    QualityLevel(0.5, 0, 0.6, 0.3, 5),
+)
+MODEL_FIELDS = ("model_complexity", "min_detection_confidence",
+                "min_tracking_confidence")
+
+
+class QualityController:  # pylint: disable=too-many-instance-attributes
+    """
+    Chooses the quality level from the latency of the recent frames. Each
+    decision is logged and kept in decisions.
+    """
+
+    window = 15  # Fewest frames measured before each decision
+    up_after = 90  # Frames well under budget before stepping up
+    headroom = 0.7  # Fraction of the budget that counts as well under it
+
+    def __init__(self, budget, apply, levels=LEVELS, log=None):
+        """
+        Parameter:
+            budget (float): most seconds a frame should take
+            apply (callable): called with the previous and new QualityLevel
+                              when the level changes
+            levels (tuple): the QualityLevels from best to cheapest
+            log (callable): called with a line describing each decision
+        """
+        self.budget = budget
+        self.apply = apply
+        self.levels = levels
+        self.log = log
+        self.level = 0
+        self.decisions = []
+        self._latencies = deque(maxlen=self._window_size())
+        self._under_budget = 0
+        # Frames to wait before stepping up to each level, and the frame
+        # count when the level was last stepped up to
+        self._up_after = [self.up_after] * len(levels)
+        self._frames = 0
+        self._last_up = None
+
+    @property
+    def current(self):
+        """
+        return (QualityLevel): the level in use
+        """
+        return self.levels[self.level]
+
+    def observe(self, latency):
+        """
+        Adds a frame's latency, changing the level when it is needed.
+
+        Parameter:
+            latency (float): seconds the frame took
+
+        return (QualityLevel): the new level when it changed, otherwise None
+        """
+        self._frames += 1
+        self._latencies.append(latency)
+        if len(self._latencies) < self._latencies.maxlen:
+            return None
+        estimate = float(np.mean(self._latencies))
+        if estimate > self.budget and self.level < len(self.levels) - 1:
+            if self._last_up is not None and \
+                    self._frames - self._last_up <= 2 * self._latencies.maxlen:
+                # The upgrade didn't fit, so wait longer before trying again
+                self._up_after[self.level] *= 2
+            return self._change(self.level + 1, estimate)
+        if estimate < self.headroom * self.budget and self.level > 0:
+            self._under_budget += 1
+            if self._under_budget >= self._up_after[self.level - 1]:
+                self._last_up = self._frames
+                return self._change(self.level - 1, estimate)
+        else:
+            self._under_budget = 0
+        return None
+
+    def _window_size(self):
+        """
+        return (int): frames measured at the current level, rounded up to a
+                      whole number of the level's tracking cycles so each
+                      window holds the same share of inference frames
+        """
+        cycle = max(int(self.current.detect_every), 1)
+        return -(-self.window // cycle) * cycle
+
+    def _change(self, level, estimate):
+        previous = self.current
+        decision = {"frame": self._frames, "from": self.level, "to": level,
+                    "latency": estimate, "budget": self.budget}
+        self.level = level
+        self.decisions.append(decision)
+        self._latencies = deque(maxlen=self._window_size())
+        self._under_budget = 0
+        if self.log is not None:
+            self.log(f"Quality level {decision['from']} -> {level}: "
+                     f"{estimate * 1000:.1f} ms per frame for a "
+                     f"{self.budget * 1000:.1f} ms budget, now "
+                     f"{self.current}")
+        self.apply(previous, self.current)
+        return self.current
+
+
+def relative_levels(scale=1.0, detect_every=1, levels=LEVELS):
+    """
+    Makes the levels relative to the settings on the command line, so the
+    best level is what was asked for and each level below it is cheaper.
+
+    Parameter:
+        scale (float): the inference scale asked for
+        detect_every (int): the inference interval asked for
+        levels (tuple): the QualityLevels from best to cheapest
+
+    return (tuple): the levels with their scales and intervals multiplied
+                    by the settings
+    """
+    return tuple(level._replace(scale=level.scale * scale,
+                                detect_every=level.detect_every *
+                                detect_every)
+                 for level in levels)
+
+
+def level_builder(build, level):
+    """
+    Parameter:
+        build (callable): builds the model, taking MediaPipe's options
+        level (QualityLevel): the level the model is for
+
+    return (callable): builds the model for the level
+    """
+    return partial(build, **{name: getattr(level, name)
+                             for name in MODEL_FIELDS})
+
+
+def apply_level(detector, build, previous, level, motion_threshold=0.02):
+    """
+    Sets a HandDetector up for a quality level. The crop and tracking
+    threshold asked for are kept. A new model is only built when its
+    options change, in the background, and the old model is used until it
+    is ready. The landmarks found below the best level aren't cached.
+
+    Parameter:
+        detector (HandDetector): the detector, whose hands are LazyHands
+        build (callable): builds the model, taking MediaPipe's options
+        previous (QualityLevel): the level the detector was set up for
+        level (QualityLevel): the new level
+        motion_threshold (float): the tracker's motion threshold, when the
+                                  tracker has to be made
+
+    return (Thread): the thread building the new model, or None
+    """
+    if detector.roi is None:
+        detector.roi = RegionOfInterest(level.scale, crop=False)
+    detector.roi.scale = level.scale
+    if detector.tracker is None:
+        detector.tracker = LandmarkTracker(level.detect_every,
+                                           motion_threshold)
+    detector.tracker.interval = level.detect_every
+    # The model options don't depend on the settings asked for, so the
+    # best level's are those of the model built at the start
+    detector.reduced_model = any(
+        getattr(level, name) != getattr(LEVELS[0], name)
+        for name in MODEL_FIELDS)
+    if any(getattr(previous, name) != getattr(level, name)
+           for name in MODEL_FIELDS):
+        return detector.hands.rebuild(level_builder(build, level))
+    return None
@@ -0,0 +1,174 @@
+"""
+Records the landmarks found by HANDS.process to a binary file and replays
+them without a camera or the model, so the counting logic can be tested
+against hours of recorded sessions at disk speed.
+
+The file starts with a small header followed by one fixed size record per
+frame. A record holds the frame's timestamp, the size of the image, the
+number of hands, each hand's handedness and the normalised x, y and z of its
+landmarks as float32. The replayer memory-maps the records, so the frames it
+yields are views into the file rather than copies.
+"""
+from collections import namedtuple
+import struct
+import time
+import numpy as np
+
+NUM_LANDMARKS = 21
+MAGIC = b"FCLR"
+VERSION = 1
+HEADER = struct.Struct("<4sHH")  # magic, version, max hands
+HANDEDNESS = {"Left": 0, "Right": 1}
+UNKNOWN_HANDEDNESS = 255
+
+ReplayFrame = namedtuple("ReplayFrame", [
+    "timestamp", "image_shape", "landmarks", "handedness"])
+
+
+def record_dtype(max_hands):
+    """
+    Parameter:
+        max_hands (int): the most hands stored for a frame
+
+    return (dtype): the layout of one frame's record
+    """
+    return np.dtype([
+        ("timestamp", "<f8"),
+        ("height", "<u2"),
+        ("width", "<u2"),
+        ("hands", "u1"),
+        ("handedness", "u1", (max_hands,)),
+        ("landmarks", "<f4", (max_hands, NUM_LANDMARKS, 3)),
+    ])
+
+
+class LandmarkRecorder:
+    """
+    Appends each frame's landmarks to a recording file.
+    """
+
+    def __init__(self, path, max_hands=2):
+        """
+        Parameter:
+            path (str): the file to write
+            max_hands (int): the most hands stored for a frame
+        """
+        self.max_hands = max_hands
+        self.frames = 0
+        self._record = np.zeros(1, dtype=record_dtype(max_hands))
+        # pylint: disable-next=consider-using-with
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, max_hands))
+
+    def record(self, landmarks, image_shape, handedness=None,
+               timestamp=None):
+        """
+        Writes one frame. Hands past max_hands are not stored.
+
+        Parameter:
+            landmarks (ndarray): (num_hands, 21, 3) normalised landmarks
+            image_shape (tuple): shape of the image the hands were found in
+            handedness (list): "Left" or "Right" for each hand, if known
+            timestamp (float): time of the frame, the current time if None
+
+        return: None
+        """
+        landmarks = np.asarray(landmarks)[:self.max_hands]
+        num_hands = len(landmarks)
+        record = self._record
+        record.fill(0)
+        record["timestamp"] = time.time() if timestamp is None else timestamp
+        record["height"], record["width"] = image_shape[:2]
+        record["hands"] = num_hands
+        record["handedness"] = UNKNOWN_HANDEDNESS
+        if handedness:
+            record["handedness"][0, :num_hands] = [
+                HANDEDNESS.get(label, UNKNOWN_HANDEDNESS)
+                for label in handedness[:num_hands]]
+        record["landmarks"][0, :num_hands] = landmarks
+        self._file.write(record.tobytes())
+        self.frames += 1
+
+    def close(self):
+        """
+        Closes the file.
+
+        return: None
+        """
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc_info):
+        self.close()
+
+
+class LandmarkReplayer:
+    """
+    Reads a recording through a memory map. A partly written last record,
+    from a recording that was cut off, is ignored.
+    """
+
+    def __init__(self, path):
+        """
+        Parameter:
+            path (str): the recording to read
+        """
+        with open(path, "rb") as file:
+            header = file.read(HEADER.size)
+            file_size = file.seek(0, 2)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{path} is not a landmark recording")
+        magic, version, max_hands = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a landmark recording")
+        dtype = record_dtype(max_hands)
+        self.max_hands = max_hands
+        num_frames = (file_size - HEADER.size) // dtype.itemsize
+        if num_frames:
+            self.records = np.memmap(path, dtype=dtype, mode="r",
+                                     offset=HEADER.size, shape=(num_frames,))
+        else:
+            self.records = np.zeros(0, dtype=dtype)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, frame_index):
+        """
+        Parameter:
+            frame_index (int): number of the frame in the recording
+
+        return (ReplayFrame): the frame's timestamp, image shape, landmarks
+                              and handedness
+        """
+        num_hands = int(self.records["hands"][frame_index])
+        return ReplayFrame(
+            float(self.records["timestamp"][frame_index]),
+            (int(self.records["height"][frame_index]),
+             int(self.records["width"][frame_index])),
+            self.records["landmarks"][frame_index, :num_hands],
+            self.records["handedness"][frame_index, :num_hands])
+
+    def __iter__(self):
+        for frame_index in range(len(self.records)):
+            yield self[frame_index]
+
+    def pixel_landmarks(self, start=0, stop=None):
+        """
+        Converts a range of frames to pixel positions in one go, padded to
+        max_hands, for use with count_fingers_batch.
+
+        Parameter:
+            start (int): first frame
+            stop (int): frame after the last one, the end if None
+
+        return (tuple): int32 (frames, max_hands, 21, 2) array and the
+                        number of hands in each frame
+        """
+        records = self.records[start:stop]
+        size = np.stack([records["width"], records["height"]], axis=-1)
+        pixels = (records["landmarks"][..., :2] *
+                  size[:, np.newaxis, np.newaxis].astype(np.float64))
+        return pixels.astype(np.int32), records["hands"].astype(np.int64)
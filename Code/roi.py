@@ -0,0 +1,125 @@
+"""
+Shrinks the image that is sent to HANDS.process. The frame can be downscaled
+before inference, and once hands have been found the frame is cropped to a
+padded box around them. The landmarks found in the crop are mapped back to
+the full frame, so the rest of the program never sees the crop.
+
+The crop moves and changes size from frame to frame, so a model given crops
+should be built with static_image_mode. In video mode MediaPipe would seed
+each frame with the hands it tracked in the previous crop, which is in a
+different place.
+"""
+import cv2
+import numpy as np
+
+
+class RegionOfInterest:
+    """
+    Keeps the box around the hands found in the previous frame. The whole
+    frame is searched when there is no box, when the crop loses the hands
+    and every full_frame_every frames, so new hands coming into view are
+    still found.
+    """
+
+    def __init__(self, scale=1.0, crop=True, padding=0.25,
+                 full_frame_every=30):
+        """
+        Parameter:
+            scale (float): factor the image is resized by before inference
+            crop (bool): crop to the hands found in the previous frame,
+                         which needs a model in static_image_mode
+            padding (float): space added around the hands on each side, as
+                             a fraction of the box's larger side
+            full_frame_every (int): search the whole frame at least once
+                                    every this many frames
+        """
+        self.scale = scale
+        self.crop = crop
+        self.padding = padding
+        self.full_frame_every = full_frame_every
+        self.box = None  # (x0, y0, x1, y1) in pixels
+        self._since_full_frame = 0
+
+    @property
+    def reduced(self):
+        """
+        return (bool): True when inference doesn't see the whole frame at
+                       its full size, so its landmarks mustn't be cached as
+                       those of the frame
+        """
+        return self.crop or self.scale != 1
+
+    def prepare(self, image):
+        """
+        Cuts out and resizes the part of the image to run inference on.
+
+        Parameter:
+            image (ndarray): the full frame
+
+        return (tuple): the image to run inference on and the box it was
+                        cut from, None when it is the full frame
+        """
+        box = self.box
+        if self._since_full_frame >= self.full_frame_every:
+            box = None
+        if box is None:
+            self._since_full_frame = 0
+            return self.resize(image), None
+        self._since_full_frame += 1
+        x_0, y_0, x_1, y_1 = box
+        return self.resize(image[y_0:y_1, x_0:x_1]), box
+
+    def resize(self, image):
+        """
+        Parameter:
+            image (ndarray): the image to resize
+
+        return (ndarray): the image resized by scale
+        """
+        if self.scale == 1:
+            return image
+        return cv2.resize(image, None, fx=self.scale, fy=self.scale,
+                          interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def to_full_frame(landmarks, box, image_shape):
+        """
+        Maps normalised landmarks found in a crop to the full frame.
+
+        Parameter:
+            landmarks (ndarray): (num_hands, 21, 3) landmarks in the crop
+            box (tuple): the crop's (x0, y0, x1, y1), None for the full frame
+            image_shape (tuple): shape of the full frame
+
+        return (ndarray): the landmarks normalised to the full frame
+        """
+        if box is None or len(landmarks) == 0:
+            return landmarks
+        height, width = image_shape[:2]
+        x_0, y_0, x_1, y_1 = box
+        landmarks = landmarks.copy()
+        landmarks[..., 0] = (x_0 + landmarks[..., 0] * (x_1 - x_0)) / width
+        landmarks[..., 1] = (y_0 + landmarks[..., 1] * (y_1 - y_0)) / height
+        return landmarks
+
+    def update(self, landmarks, image_shape):
+        """
+        Sets the box for the next frame from this frame's hands.
+
+        Parameter:
+            landmarks (ndarray): (num_hands, 21, 3) full frame landmarks
+            image_shape (tuple): shape of the full frame
+
+        return: None
+        """
+        if not self.crop or landmarks is None or len(landmarks) == 0:
+            self.box = None
+            return
+        height, width = image_shape[:2]
+        points = landmarks[..., :2].reshape(-1, 2) * (width, height)
+        low, high = points.min(axis=0), points.max(axis=0)
+        pad = self.padding * (high - low).max()
+        x_0, y_0 = np.maximum(np.floor(low - pad), 0).astype(int).tolist()
+        x_1, y_1 = np.minimum(np.ceil(high + pad),
+                              (width, height)).astype(int).tolist()
+        self.box = None if x_1 <= x_0 or y_1 <= y_0 else (x_0, y_0, x_1, y_1)
@@ -0,0 +1,249 @@
+"""
+The formats the count is sent to the display in. The legacy text format
+sends the counting type and the number as two lines every time. The binary
+format sends small frames holding only the fields that changed:
+
+    0xA5, length, flags, [mode], [value], crc
+
+flags has bit 0 set when the mode byte (0 decimal, 1 binary) follows and
+bit 1 set when the value follows, as an unsigned LEB128 varint. length
+counts the bytes from flags up to the crc, and the crc is CRC-8 (polynomial
+0x07) over length and those bytes.
+
+Which format is used is negotiated when the port is opened. The host sends
+the two lines "Protocol:" and "binary1". A display that knows the binary
+format answers "BIN1", while the legacy sketch echoes the lines back, and
+anything else is treated as legacy too. Many boards reset when the port is
+opened and miss what is sent while their bootloader runs, so the request is
+sent again until the display answers or the time runs out.
+"""
+import time
+
+SYNC = 0xA5
+FLAG_MODE = 0x01
+FLAG_VALUE = 0x02
+MODES = ("Decimal", "Binary")
+HELLO = b"Protocol:\nbinary1\n"
+HELLO_EVERY = 0.5  # Seconds between sending the request again
+BINARY_REPLY = b"BIN1"
+MAX_LENGTH = 16  # Longest flags, mode and value, the same as display.ino
+MAX_VALUE = (1 << 64) - 1  # Largest value the display can hold
+
+
+def crc8(data):
+    """
+    Parameter:
+        data (bytes): the bytes to check
+
+    return (int): CRC-8 of the bytes with the polynomial 0x07
+    """
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07 if crc & 0x80 else crc << 1) & 0xFF
+    return crc
+
+
+def encode_varint(value):
+    """
+    Parameter:
+        value (int): a non-negative number
+
+    return (bytes): the number in unsigned LEB128, 7 bits per byte with the
+                    lowest bits first
+    """
+    if value < 0:
+        raise ValueError("Only non-negative values can be sent")
+    data = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            data.append(byte | 0x80)
+        else:
+            data.append(byte)
+            return bytes(data)
+
+
+def decode_varint(data, start=0):
+    """
+    Parameter:
+        data (bytes): bytes holding a varint
+        start (int): index the varint starts at
+
+    return (tuple): the number and the index just after it
+    """
+    value = 0
+    for index in range(start, len(data)):
+        value |= (data[index] & 0x7F) << (7 * (index - start))
+        if not data[index] & 0x80:
+            return value, index + 1
+    raise ValueError("Varint is cut off")
+
+
+def encode_frame(mode=None, value=None):
+    """
+    Builds a binary frame holding the fields that are given.
+
+    Parameter:
+        mode (str): "Decimal" or "Binary", None when it hasn't changed
+        value (int): the count, None when it hasn't changed
+
+    return (bytes): the frame
+    """
+    flags = 0
+    payload = bytearray()
+    if mode is not None:
+        flags |= FLAG_MODE
+        payload.append(MODES.index(mode))
+    if value is not None:
+        if value > MAX_VALUE:
+            raise ValueError(f"{value} is too large to send")
+        flags |= FLAG_VALUE
+        payload += encode_varint(value)
+    body = bytes([len(payload) + 1, flags]) + payload
+    return bytes([SYNC]) + body + bytes([crc8(body)])
+
+
+class FrameDecoder:  # pylint: disable=too-few-public-methods
+    """
+    Reads binary frames out of a stream of bytes, keeping the display's
+    state. Bytes that don't form a valid frame are skipped, so the decoder
+    finds the next frame after noise or a cut off write.
+    """
+
+    def __init__(self):
+        self.mode = None
+        self.value = None
+        self.errors = 0
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        """
+        Adds received bytes and applies every complete frame.
+
+        Parameter:
+            data (bytes): the bytes received
+
+        return (list): (mode, value) after each frame that was applied
+        """
+        self._buffer += data
+        updates = []
+        while True:
+            start = self._buffer.find(SYNC)
+            if start < 0:
+                self._buffer.clear()
+                return updates
+            del self._buffer[:start]
+            if len(self._buffer) < 2:
+                return updates
+            length = self._buffer[1]
+            if 1 <= length <= MAX_LENGTH and len(self._buffer) < length + 3:
+                return updates
+            frame = bytes(self._buffer[:length + 3])
+            if 1 <= length <= MAX_LENGTH and self._apply(frame):
+                del self._buffer[:len(frame)]
+                updates.append((self.mode, self.value))
+            else:
+                self.errors += 1
+                del self._buffer[:1]
+
+    def _apply(self, frame):
+        body, crc = frame[1:-1], frame[-1]
+        if crc8(body) != crc:
+            return False
+        flags, index = body[1], 2
+        try:
+            mode = self.mode
+            if flags & FLAG_MODE:
+                mode = MODES[body[index]]
+                index += 1
+            value = self.value
+            if flags & FLAG_VALUE:
+                value, index = decode_varint(body, index)
+        except (IndexError, ValueError):
+            return False
+        if index != len(body) or (value or 0) > MAX_VALUE:
+            return False
+        self.mode, self.value = mode, value
+        return True
+
+
+class TextProtocol:  # pylint: disable=too-few-public-methods
+    """The legacy format: the counting type and number as two lines."""
+
+    name = "text"
+
+    def encode(self, message):
+        """
+        Parameter:
+            message (tuple): the counting type and the number
+
+        return (bytes): the two lines
+        """
+        mode, value = message
+        return f"{mode}:\n{value}\n".encode("ascii")
+
+
+class BinaryProtocol:  # pylint: disable=too-few-public-methods
+    """
+    The binary format. It remembers what the display was last sent, so
+    each frame only holds the fields that changed. A new one is made for
+    each connection, so the first frame holds every field.
+    """
+
+    name = "binary"
+
+    def __init__(self):
+        self._sent = (None, None)
+
+    def encode(self, message):
+        """
+        Parameter:
+            message (tuple): the counting type and the number
+
+        return (bytes): a frame with the changed fields, or nothing when
+                        neither has changed
+        """
+        mode, value = message
+        last_mode, last_value = self._sent
+        if (mode, value) == self._sent:
+            return b""
+        frame = encode_frame(None if mode == last_mode else mode,
+                             None if value == last_value else value)
+        self._sent = (mode, value)
+        return frame
+
+
+def negotiate(port, preferred="auto", timeout=3.0, hello_every=HELLO_EVERY):
+    """
+    Picks the format for a newly opened port. In auto mode the display is
+    asked if it understands the binary format, again every hello_every
+    seconds while it hasn't answered, in case it was still starting up.
+
+    Parameter:
+        port (Serial): the open port, with a read timeout
+        preferred (str): "auto", "text" or "binary"
+        timeout (float): seconds to wait for the display's answer
+        hello_every (float): seconds between sending the request
+
+    return (TextProtocol/BinaryProtocol): the format to send in
+    """
+    if preferred == "binary":
+        return BinaryProtocol()
+    if preferred == "text":
+        return TextProtocol()
+    port.reset_input_buffer()
+    end = time.monotonic() + timeout
+    next_hello = 0.0
+    while time.monotonic() < end:
+        if time.monotonic() >= next_hello:
+            port.write(HELLO)
+            next_hello = time.monotonic() + hello_every
+        line = port.readline().strip()
+        if line == BINARY_REPLY:
+            return BinaryProtocol()
+        if line and line in HELLO.split():
+            break  # The legacy sketch echoes every line back
+    return TextProtocol()
@@ -0,0 +1,154 @@
+"""
+Writes to the serial port on a background thread, so a slow, stalled or
+unplugged display never holds up the frame loop. Only the latest message
+waits to be sent: when the port can't keep up, older counts are dropped
+because the display only needs to show the newest one. Messages are encoded
+when they are sent, so a format that only sends changes is never thrown off
+by a dropped message.
+"""
+from queue import Empty
+import threading
+import time
+
+import serial
+
+from pipeline import DropOldestQueue, QueueClosed
+from serial_protocol import TextProtocol
+
+
+class SerialWriter:  # pylint: disable=too-many-instance-attributes
+    """
+    Sends the counting type and number to the display. write only queues
+    the message. When the port fails or disappears it is closed and connect
+    is called again, at most once every reconnect_delay seconds, until the
+    device is back. Without an open port to start with, the first
+    connection is also made on the writer thread, so opening the port never
+    holds up the program. The format is picked again for each connection.
+    """
+
+    # pylint: disable-next=too-many-arguments
+    def __init__(self, connect, port=None, reconnect_delay=1.0,
+                 negotiate=None, first_connect=None):
+        """
+        Parameter:
+            connect (callable): opens the port, returning None when the
+                                device isn't there
+            port (Serial): an already open port, if there is one
+            reconnect_delay (float): seconds between attempts to reconnect
+            negotiate (callable): picks the format for an open port, the
+                                  legacy text format is used when None
+            first_connect (callable): opens the port the first time, such
+                                      as connect with the ports reported,
+                                      connect is used when None
+        """
+        self.connect = connect
+        self.first_connect = first_connect or connect
+        self.port = port
+        self.reconnect_delay = reconnect_delay
+        self.negotiate = negotiate or (lambda _port: TextProtocol())
+        self.protocol = None  # Picked when the first message is sent
+        self.sent = 0
+        # Messages the format can't hold, such as counts too big for the
+        # display, which are skipped
+        self.unsendable = 0
+        self._messages = DropOldestQueue(maxsize=1)
+        self._next_connect = 0.0
+        self._thread = threading.Thread(target=self._run, name="serial",
+                                        daemon=True)
+
+    def start(self):
+        """
+        Starts the writer thread.
+
+        return (SerialWriter): the writer itself
+        """
+        self._thread.start()
+        return self
+
+    def write(self, message):
+        """
+        Queues a message, replacing any message that hasn't been sent yet.
+        This never blocks.
+
+        Parameter:
+            message (tuple): the counting type and the number
+
+        return: None
+        """
+        self._messages.put(message)
+
+    @property
+    def dropped(self):
+        """
+        return (int): number of messages replaced before they were sent
+        """
+        return self._messages.dropped
+
+    def close(self, timeout=1.0):
+        """
+        Sends the message that is waiting, if the port is there, then stops
+        the thread and closes the port.
+
+        Parameter:
+            timeout (float): seconds to wait for the thread
+
+        return: None
+        """
+        self._messages.close()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        if self.port is not None:
+            self.port.close()
+
+    def _run(self):
+        if self.port is None:
+            self._connect(self.first_connect)
+        message = None
+        while True:
+            try:
+                # A message that couldn't be sent is retried after the
+                # delay, unless a newer one replaces it first
+                message = self._messages.get(
+                    None if message is None else self.reconnect_delay)
+            except Empty:
+                pass
+            except QueueClosed:
+                break
+            if self._send(message):
+                message = None
+
+    def _connect(self, connect):
+        self._next_connect = time.monotonic() + self.reconnect_delay
+        try:
+            self.port = connect()
+        except (serial.SerialException, OSError):
+            # The port is listed but busy, not permitted or still
+            # appearing, so it is tried again after the delay
+            self.port = None
+
+    def _send(self, message):
+        if self.port is None:
+            if time.monotonic() < self._next_connect:
+                return False
+            self._connect(self.connect)
+            if self.port is None:
+                return False
+        try:
+            if self.protocol is None:
+                self.protocol = self.negotiate(self.port)
+            data = self.protocol.encode(message)
+            if data:
+                self.port.write(data)
+        except ValueError:
+            self.unsendable += 1
+            return True
+        except (serial.SerialException, OSError):
+            try:
+                self.port.close()
+            except (serial.SerialException, OSError):
+                pass
+            self.port = None
+            self.protocol = None
+            return False
+        self.sent += 1
+        return True
@@ -0,0 +1,310 @@
+"""
+Serves the finger counter over HTTP on this machine, so uploaded images can
+be scored centrally. POST a JPEG or PNG image as the request body, or
+several as a multipart/form-data upload, to any path:
+
+    curl --data-binary @hand.jpg http://127.0.0.1:8080/count
+    curl -F one=@hand.jpg -F two=@hands.png http://127.0.0.1:8080/count
+
+The reply has, for each image, the decimal and binary counts, the landmarks
+of each hand from left to right and whether each hand is sideways. Add
+?mirror=0 to count the image as it is instead of as the mirrored window
+shows it.
+
+Images from concurrent requests are collected into batches and sent to a
+fixed pool of worker processes, each with a warm model. The images waiting
+for a worker are held in a bounded queue, and a request that doesn't fit
+gets 503 Service Unavailable straight away instead of piling up.
+"""
+from concurrent.futures import Future, TimeoutError as ReplyTimeout
+from email.parser import BytesParser
+from email.policy import HTTP
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Empty, Full, Queue
+from urllib.parse import parse_qs, urlsplit
+import json
+import threading
+import time
+
+import numpy as np
+
+from counting import (WRIST, collect_finger_points, convert_coords_to_pixels,
+                      finger_counter, is_hand_sideways)
+from streams import StreamPool, make_frame_hands
+
+BATCH_SIZE = 8  # Most images sent to a worker at once
+BATCH_WAIT = 0.005  # Seconds a batch waits to fill up
+QUEUE_SIZE = 64  # Images waiting for a worker before requests are refused
+REPLY_TIMEOUT = 30.0  # Seconds a request waits for its counts
+MAX_BODY = 32 << 20  # Largest upload in bytes
+
+
+def score_image(landmarks, image_shape, mirror=True):
+    """
+    Counts the fingers in an image's landmarks.
+
+    Parameter:
+        landmarks (ndarray): (num_hands, 21, 3) normalised landmarks
+        image_shape (tuple): shape of the image
+        mirror (bool): count the mirrored image, like the window does
+
+    return (dict): the number of hands, the decimal and binary counts, and
+                   the landmarks and sideways flag of each hand from left to
+                   right
+    """
+    if mirror:
+        landmarks = landmarks.copy()
+        landmarks[..., 0] = 1 - landmarks[..., 0]
+    landmarks = landmarks[np.argsort(landmarks[:, WRIST, 0], kind="stable")]
+    hand_list = convert_coords_to_pixels(landmarks, image_shape)
+    hand_sideways = is_hand_sideways(hand_list)
+    decimal, binary = finger_counter(collect_finger_points(hand_list),
+                                     hand_sideways)
+    return {"hands": len(landmarks), "decimal": int(decimal),
+            "binary": int(binary), "landmarks": landmarks.round(5).tolist(),
+            "sideways": hand_sideways.tolist()}
+
+
+def read_images(content_type, body):
+    """
+    Takes the images out of a request body.
+
+    Parameter:
+        content_type (str): the request's Content-Type header
+        body (bytes): the request body
+
+    return (list): the name and bytes of each image
+    """
+    if not content_type.startswith("multipart/"):
+        return [("image", body)]
+    message = BytesParser(policy=HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" +
+        body)
+    return [(part.get_filename() or
+             part.get_param("name", "", header="content-disposition"),
+             part.get_payload(decode=True))
+            for part in message.iter_parts()]
+
+
+class CountService:  # pylint: disable=too-many-instance-attributes
+    """
+    Collects the queued images into batches for the worker pool. Only one
+    batch is given to each worker at a time, and the rest of the images wait
+    in the bounded queue.
+    """
+
+    def __init__(self, pool, batch_size=BATCH_SIZE, batch_wait=BATCH_WAIT,
+                 queue_size=QUEUE_SIZE):
+        """
+        Parameter:
+            pool (StreamPool): the workers with their models
+            batch_size (int): most images in a batch
+            batch_wait (float): seconds a batch waits to fill up
+            queue_size (int): images waiting before requests are refused
+        """
+        self.pool = pool
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.batches = 0
+        self._queue = Queue(queue_size)
+        self._queue_lock = threading.Lock()
+        self._free_workers = threading.Semaphore(pool.workers)
+        self._thread = threading.Thread(target=self._run, name="batcher",
+                                        daemon=True)
+
+    def start(self):
+        """
+        Starts the batching thread.
+
+        return (CountService): the service itself
+        """
+        self._thread.start()
+        return self
+
+    def submit(self, images):
+        """
+        Queues the images of a request, all of them or none.
+
+        Parameter:
+            images (list): the encoded bytes of each image
+
+        return (list): a Future for each image, which resolves to its
+                       landmarks and shape, or None when it couldn't be
+                       decoded. Raises Full when they don't all fit.
+        """
+        futures = [Future() for _ in images]
+        with self._queue_lock:
+            if self._queue.maxsize - self._queue.qsize() < len(images):
+                raise Full
+            for data, future in zip(images, futures):
+                self._queue.put_nowait((data, future))
+        return futures
+
+    def close(self):
+        """
+        Stops the batching thread once the queued images are sent.
+
+        return: None
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        running = True
+        while running:
+            # A batch is only taken off the queue once a worker is free, so
+            # the images that are waiting stay counted in the queue
+            # pylint: disable-next=consider-using-with
+            self._free_workers.acquire()
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_wait
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(
+                        timeout=max(0.0, deadline - time.monotonic())))
+                except Empty:
+                    break
+            if batch[-1] is None:
+                running = False
+                batch.pop()
+            if not batch:
+                self._free_workers.release()
+                continue
+            self.batches += 1
+            self.pool.detect_encoded([data for data, _ in batch]) \
+                .add_done_callback(partial(
+                    self._resolve, [future for _, future in batch]))
+
+    def _resolve(self, futures, batch_future):
+        self._free_workers.release()
+        error = batch_future.exception()
+        for index, future in enumerate(futures):
+            if error is None:
+                future.set_result(batch_future.result()[index])
+            else:
+                future.set_exception(error)
+
+
+class CountHandler(BaseHTTPRequestHandler):
+    """Answers each POST with the counts of its images."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """
+        Counts the fingers in the uploaded images.
+
+        return: None
+        """
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            self._reply(400, {"error": "the Content-Length isn't a size"})
+            return
+        if not 0 < length <= MAX_BODY:
+            # The body isn't read, so the connection can't be reused
+            self.close_connection = True
+            self._reply(413 if length else 411,
+                        {"error": "send an image of up to "
+                                  f"{MAX_BODY >> 20} MiB"})
+            return
+        images = read_images(self.headers.get("Content-Type", ""),
+                             self.rfile.read(length))
+        if not images:
+            self._reply(400, {"error": "the upload has no images"})
+            return
+        try:
+            futures = self.server.service.submit(
+                [data for _name, data in images])
+        except Full:
+            self._reply(503, {"error": "too many images queued"},
+                        {"Retry-After": "1"})
+            return
+        mirror = parse_qs(urlsplit(self.path).query).get("mirror") != ["0"]
+        try:
+            results = self._results(images, futures, mirror)
+        except ReplyTimeout:
+            self._reply(504, {"error": "the images took too long to count"})
+            return
+        except Exception as error:  # pylint: disable=broad-except
+            # Such as a worker process that died
+            self._reply(500, {"error": f"counting failed: {error!r}"})
+            return
+        self._reply(200, {"images": results})
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Requests aren't logged, only errors are."""
+
+    @staticmethod
+    def _results(images, futures, mirror):
+        results = []
+        deadline = time.monotonic() + REPLY_TIMEOUT
+        for (name, _data), future in zip(images, futures):
+            result = future.result(max(0.0, deadline - time.monotonic()))
+            if result is None:
+                results.append({"name": name,
+                                "error": "not a JPEG or PNG image"})
+            else:
+                results.append({"name": name,
+                                **score_image(*result, mirror=mirror)})
+        return results
+
+    def _reply(self, status, content, headers=None):
+        body = json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(address, service):
+    """
+    Builds the HTTP server, which answers each request on its own thread.
+
+    Parameter:
+        address (tuple): host and port to listen on, port 0 picks a free one
+        service (CountService): counts the uploaded images
+
+    return (ThreadingHTTPServer): the server, not yet serving
+    """
+    server = ThreadingHTTPServer(address, CountHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def serve(address, workers=None, max_hands=2):
+    """
+    Runs the count service until it is interrupted.
+
+    Parameter:
+        address (str): HOST:PORT to listen on
+        workers (int): number of model processes, one per core when None
+        max_hands (int): most hands found in an image
+
+    return: None
+    """
+    host, _, port = address.rpartition(":")
+    # The images are unrelated, so the model mustn't track hands from one
+    # to the next
+    with StreamPool(partial(make_frame_hands, max_num_hands=max_hands),
+                    workers) as pool:
+        pool.warm_up()
+        service = CountService(pool).start()
+        server = make_server((host or "127.0.0.1", int(port)), service)
+        print(f"Counting fingers on http://{host or '127.0.0.1'}:"
+              f"{server.server_port} with {pool.workers} workers")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            service.close()
@@ -0,0 +1,142 @@
+"""
+Hands frames to worker processes without copying them through a pipe. A
+FrameRing is a block of shared memory split into equal slots. The process
+reading the frames writes each one into a free slot, usually by reading it
+straight into the slot, and only the slot's index and the frame's shape are
+sent to a worker, which looks at the frame in place.
+
+Each slot belongs to one frame until its landmarks come back, so the ring
+needs one slot per frame in flight.
+"""
+from collections import deque
+from multiprocessing import shared_memory
+
+import numpy as np
+
+_ATTACHED = {}  # The rings a worker has opened, by name
+
+
+class FrameRing:
+    """
+    The slots of frames shared between processes. The process that creates
+    the ring owns it, hands out the free slots and removes it at the end.
+    """
+
+    def __init__(self, slots, slot_size):
+        """
+        Parameter:
+            slots (int): number of frames held at once
+            slot_size (int): bytes in each slot, the size of the largest
+                             frame
+        """
+        self.slots = slots
+        self.slot_size = slot_size
+        self.memory = shared_memory.SharedMemory(create=True,
+                                                 size=slots * slot_size)
+        self._free = deque(range(slots))
+
+    @property
+    def name(self):
+        """
+        return (str): the name other processes open the memory by
+        """
+        return self.memory.name
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._free)
+
+    def acquire(self):
+        """
+        Takes a free slot.
+
+        return (int): the slot's index, or None when every slot is in use
+        """
+        return self._free.popleft() if self._free else None
+
+    def release(self, index):
+        """
+        Gives a slot back once its frame is done with.
+
+        Parameter:
+            index (int): the slot's index
+
+        return: None
+        """
+        self._free.append(index)
+
+    def fits(self, shape):
+        """
+        Parameter:
+            shape (tuple): shape of a uint8 frame
+
+        return (bool): True when the frame fits in a slot
+        """
+        return int(np.prod(shape)) <= self.slot_size
+
+    def frame(self, index, shape):
+        """
+        Parameter:
+            index (int): the slot's index
+            shape (tuple): shape of the uint8 frame in the slot
+
+        return (ndarray): the frame, a view of the shared memory
+        """
+        return slot_view(self.memory, self.slot_size, index, shape)
+
+    def close(self):
+        """
+        Removes the shared memory. Workers that still have it open keep it
+        until they close it.
+
+        return: None
+        """
+        self.memory.unlink()
+        try:
+            self.memory.close()
+        except BufferError:
+            # A frame still looks at the memory, which is unmapped once
+            # the last view of it is gone
+            pass
+
+
+def slot_view(memory, slot_size, index, shape):
+    """
+    Parameter:
+        memory (SharedMemory): the ring's memory
+        slot_size (int): bytes in each slot
+        index (int): the slot's index
+        shape (tuple): shape of the uint8 frame in the slot
+
+    return (ndarray): the frame, a view of the shared memory
+    """
+    return np.ndarray(shape, np.uint8, buffer=memory.buf,
+                      offset=index * slot_size)
+
+
+def attached_frame(name, slot_size, index, shape):
+    """
+    Looks at a frame in a ring made by another process, opening the ring
+    the first time it is used.
+
+    Parameter:
+        name (str): the ring's name
+        slot_size (int): bytes in each slot
+        index (int): the slot's index
+        shape (tuple): shape of the uint8 frame in the slot
+
+    return (ndarray): the frame, a view of the shared memory
+    """
+    memory = _ATTACHED.get(name)
+    if memory is None:
+        # Rings from earlier runs are finished with
+        for old in _ATTACHED.values():
+            old.close()
+        _ATTACHED.clear()
+        memory = _ATTACHED[name] = shared_memory.SharedMemory(name)
+    return slot_view(memory, slot_size, index, shape)
@@ -0,0 +1,523 @@
+"""
+Sends each frame's count to any number of outputs from an asyncio event
+loop. Every sink has its own queue with its own backpressure policy, and
+publishing to a sink never waits, so a slow or stalled consumer only loses
+its own messages and never holds up the frames or the other sinks:
+
+    latest: only the newest message waits, for outputs that show the
+            current count, such as the display and WebSocket clients
+    drop_oldest: the oldest message is dropped when the queue is full
+    drop_newest: new messages are dropped when the queue is full, so the
+                 consumer catches up on an unbroken run of counts
+
+The sinks are opened from specs given on the command line:
+
+    serial            the display on the serial port
+    stdout            JSON lines on stdout
+    jsonl:PATH        JSON lines appended to a file
+    udp:HOST:PORT     a JSON datagram per count
+    unix:PATH         a JSON datagram per count on a Unix socket
+    ws:HOST:PORT      a WebSocket server sending each client the counts
+"""
+from collections import deque
+import abc
+import asyncio
+import base64
+import hashlib
+import json
+import socket
+import struct
+import sys
+import time
+
+from pipeline import QueueClosed
+
+LATEST = "latest"
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+POLICIES = (LATEST, DROP_OLDEST, DROP_NEWEST)
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+TEXT = 0x1
+CLOSE = 0x8
+PING = 0x9
+PONG = 0xA
+MAX_REQUEST = 8192  # Longest WebSocket handshake request read
+
+
+def count_message(frame_index, frame, count_decimal):
+    """
+    Builds the message published for a frame.
+
+    Parameter:
+        frame_index (int): number of the frame in its source
+        frame (FrameResult): the output of process_frame
+        count_decimal (bool): Determines if counting in decimal or binary
+
+    return (dict): the frame number, time, number of hands, both counts and
+                   the counting mode
+    """
+    return {
+        "frame": frame_index, "time": time.time(),
+        "hands": 0 if frame.hand_list is None else len(frame.hand_list),
+        "decimal": int(frame.decimal), "binary": int(frame.binary),
+        "mode": "Decimal" if count_decimal else "Binary"}
+
+
+class SinkQueue:
+    """
+    A bounded queue for the event loop whose put never waits. What happens
+    when it is full depends on its policy.
+    """
+
+    def __init__(self, maxsize=1, policy=LATEST):
+        """
+        Parameter:
+            maxsize (int): number of messages held, always 1 for latest
+            policy (str): one of POLICIES
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy {policy!r}")
+        self.maxsize = 1 if policy == LATEST else maxsize
+        self.policy = policy
+        self.dropped = 0
+        self._items = deque()
+        self._closed = False
+        self._ready = asyncio.Event()
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item):
+        """
+        Adds an item, dropping one if the queue is full.
+
+        Parameter:
+            item (object): the item
+
+        return: None
+        """
+        if len(self._items) >= self.maxsize:
+            self.dropped += 1
+            if self.policy == DROP_NEWEST:
+                return
+            self._items.popleft()
+        self._items.append(item)
+        self._ready.set()
+
+    async def get(self):
+        """
+        Waits for the next item.
+
+        return (object): the oldest item, raises QueueClosed once the queue
+                         is closed and empty
+        """
+        while not self._items:
+            if self._closed:
+                raise QueueClosed
+            self._ready.clear()
+            await self._ready.wait()
+        return self._items.popleft()
+
+    def close(self):
+        """
+        Lets get finish once the remaining items are taken.
+
+        return: None
+        """
+        self._closed = True
+        self._ready.set()
+
+
+class Sink(abc.ABC):
+    """
+    The base class of every sink. publish queues a message and a task sends
+    the queued messages one at a time. Subclasses implement send, and open
+    and shutdown when they hold a connection.
+    """
+
+    policy = DROP_OLDEST
+    maxsize = 64
+
+    def __init__(self, policy=None, maxsize=None):
+        """
+        Parameter:
+            policy (str): backpressure policy, the sink's default when None
+            maxsize (int): messages queued, the sink's default when None
+        """
+        self.policy = policy or self.policy
+        self.maxsize = maxsize or self.maxsize
+        self.sent = 0
+        self.errors = 0
+        self._queue = None
+        self._task = None
+
+    async def start(self):
+        """
+        Opens the sink and starts sending.
+
+        return (Sink): the sink itself
+        """
+        self._queue = SinkQueue(self.maxsize, self.policy)
+        await self.open()
+        self._task = asyncio.ensure_future(self._run())
+        return self
+
+    def publish(self, message):
+        """
+        Queues a message. This never waits.
+
+        Parameter:
+            message (dict): the count message
+
+        return: None
+        """
+        self._queue.put(message)
+
+    @property
+    def dropped(self):
+        """
+        return (int): number of messages dropped by the policy
+        """
+        return 0 if self._queue is None else self._queue.dropped
+
+    async def close(self, timeout=1.0):
+        """
+        Sends what is queued, waiting at most timeout seconds, then closes
+        the sink.
+
+        Parameter:
+            timeout (float): seconds to wait for the queued messages
+
+        return: None
+        """
+        self._queue.close()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            pass
+        await self.shutdown()
+
+    async def open(self):
+        """
+        Opens the connection, if the sink has one.
+
+        return: None
+        """
+
+    @abc.abstractmethod
+    async def send(self, message):
+        """
+        Sends one message.
+
+        Parameter:
+            message (dict): the count message
+
+        return: None
+        """
+
+    async def shutdown(self):
+        """
+        Closes the connection, if the sink has one.
+
+        return: None
+        """
+
+    async def _run(self):
+        while True:
+            try:
+                message = await self._queue.get()
+            except QueueClosed:
+                return
+            try:
+                await self.send(message)
+                self.sent += 1
+            except OSError:
+                self.errors += 1
+
+
+class SerialSink(Sink):
+    """
+    Sends the count to the display. The SerialWriter already sends on its
+    own thread, so only changes are passed on to it.
+    """
+
+    policy = LATEST
+
+    def __init__(self, serial_com, policy=None, maxsize=None):
+        """
+        Parameter:
+            serial_com (SerialWriter): the display's writer
+            policy (str): backpressure policy, latest when None
+            maxsize (int): messages queued
+        """
+        super().__init__(policy, maxsize)
+        self.serial_com = serial_com
+        self._last = None
+
+    async def send(self, message):
+        mode = message["mode"]
+        value = message["decimal" if mode == "Decimal" else "binary"]
+        if (mode, value) != self._last:
+            self.serial_com.write((mode, value))
+            self._last = (mode, value)
+
+
+class StreamSink(Sink):
+    """
+    Writes JSON lines to stdout or a file. The writes run on the event
+    loop's thread pool, so a blocked pipe doesn't stall the loop.
+    """
+
+    maxsize = 1024
+
+    def __init__(self, stream=sys.stdout, policy=None, maxsize=None):
+        """
+        Parameter:
+            stream (object): a text stream, or the path of a file to append
+                             to
+            policy (str): backpressure policy, drop_oldest when None
+            maxsize (int): messages queued, 1024 when None
+        """
+        super().__init__(policy, maxsize)
+        self.stream = stream
+        self._file = None
+
+    async def open(self):
+        if isinstance(self.stream, str):
+            # pylint: disable-next=consider-using-with
+            self._file = open(self.stream, "a", encoding="utf-8")
+
+    async def send(self, message):
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._write, json.dumps(message) + "\n")
+
+    async def shutdown(self):
+        if self._file is not None:
+            self._file.close()
+
+    def _write(self, line):
+        stream = self._file or self.stream
+        stream.write(line)
+        stream.flush()
+
+
+class DatagramSink(Sink):
+    """
+    Publishes each count as a JSON datagram, to a UDP address or a Unix
+    socket. Sending never blocks: a datagram that can't be sent, such as
+    when nothing is listening, is counted as an error.
+    """
+
+    policy = DROP_OLDEST
+    maxsize = 16
+
+    def __init__(self, address, policy=None, maxsize=None):
+        """
+        Parameter:
+            address (object): (host, port) for UDP, or a Unix socket path
+            policy (str): backpressure policy, drop_oldest when None
+            maxsize (int): messages queued, 16 when None
+        """
+        super().__init__(policy, maxsize)
+        self.address = address
+        self._socket = None
+
+    async def open(self):
+        family = (socket.AF_UNIX if isinstance(self.address, str) else
+                  socket.AF_INET)
+        self._socket = socket.socket(family, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    async def send(self, message):
+        self._socket.sendto(json.dumps(message).encode(), self.address)
+
+    async def shutdown(self):
+        self._socket.close()
+
+
+def websocket_frame(payload, opcode=TEXT, mask=None):
+    """
+    Builds a single, final WebSocket frame.
+
+    Parameter:
+        payload (bytes): the frame's data
+        opcode (int): the frame type
+        mask (bytes): four byte mask, which clients must use
+
+    return (bytes): the frame
+    """
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, mask_bit | length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, mask_bit | 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, mask_bit | 127, length)
+    if mask:
+        payload = bytes(byte ^ mask[index % 4]
+                        for index, byte in enumerate(payload))
+        header += mask
+    return header + payload
+
+
+async def read_websocket_frame(reader):
+    """
+    Reads one WebSocket frame, unmasking its payload.
+
+    Parameter:
+        reader (StreamReader): the connection
+
+    return (tuple): the opcode and payload
+    """
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = bytes(byte ^ mask[index % 4]
+                        for index, byte in enumerate(payload))
+    return first & 0x0F, payload
+
+
+def websocket_accept(key):
+    """
+    Parameter:
+        key (str): the client's Sec-WebSocket-Key
+
+    return (str): the Sec-WebSocket-Accept the server answers with
+    """
+    digest = hashlib.sha1(key.encode() + WEBSOCKET_GUID).digest()
+    return base64.b64encode(digest).decode()
+
+
+class WebSocketSink(Sink):
+    """
+    A WebSocket server that sends every connected client each count as a
+    JSON text message. Each client has its own queue, so a slow client only
+    misses counts itself while the others keep up.
+    """
+
+    policy = LATEST
+
+    def __init__(self, host="127.0.0.1", port=8765, policy=None,
+                 maxsize=None):
+        """
+        Parameter:
+            host (str): address to listen on
+            port (int): port to listen on, 0 picks a free one
+            policy (str): backpressure policy of each client, latest when
+                          None
+            maxsize (int): messages queued for each client
+        """
+        super().__init__(policy, maxsize)
+        self.host = host
+        self.port = port
+        self.clients = {}  # Client's queue: its connection
+        self._server = None
+
+    async def open(self):
+        self._server = await asyncio.start_server(
+            self._serve, self.host, self.port, limit=MAX_REQUEST)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def send(self, message):
+        # Handing the message to the clients never waits, so the sink's own
+        # queue doesn't back up
+        data = websocket_frame(json.dumps(message).encode())
+        for client in self.clients:
+            client.put(data)
+
+    @property
+    def dropped(self):
+        return super().dropped + sum(client.dropped
+                                     for client in self.clients)
+
+    async def shutdown(self):
+        self._server.close()
+        for writer in list(self.clients.values()):
+            writer.close()
+        await self._server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            writer.close()
+            return
+        headers = {}
+        for line in request.decode("latin-1").split("\r\n")[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        key = headers.get("sec-websocket-key")
+        if key is None:
+            writer.write(b"HTTP/1.1 400 Bad Request\r\n\r\n")
+            writer.close()
+            return
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\n"
+                     b"Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Accept: " +
+                     websocket_accept(key).encode() + b"\r\n\r\n")
+        client = SinkQueue(self.maxsize, self.policy)
+        self.clients[client] = writer
+        sender = asyncio.ensure_future(self._send_to(client, writer))
+        try:
+            await self._receive(reader, writer)
+        except (asyncio.IncompleteReadError, OSError):
+            pass
+        finally:
+            self.clients.pop(client, None)
+            client.close()
+            sender.cancel()
+            writer.close()
+
+    @staticmethod
+    async def _send_to(client, writer):
+        while True:
+            try:
+                data = await client.get()
+            except QueueClosed:
+                return
+            writer.write(data)
+            await writer.drain()
+
+    @staticmethod
+    async def _receive(reader, writer):
+        while True:
+            opcode, payload = await read_websocket_frame(reader)
+            if opcode == CLOSE:
+                writer.write(websocket_frame(payload[:2], CLOSE))
+                return
+            if opcode == PING:
+                writer.write(websocket_frame(payload, PONG))
+
+
+def open_sink(spec, serial_com=None):
+    """
+    Builds a sink from its spec, see the module's docstring.
+
+    Parameter:
+        spec (str): the sink's spec
+        serial_com (SerialWriter): the display's writer, for serial
+
+    return (Sink): the sink, not yet started
+    """
+    kind, _, target = spec.partition(":")
+    if kind == "serial" and not target:
+        return SerialSink(serial_com)
+    if kind == "stdout":
+        return StreamSink(sys.stdout)
+    if kind == "jsonl" and target:
+        return StreamSink(target)
+    if kind == "unix" and target:
+        return DatagramSink(target)
+    host, _, port = target.rpartition(":")
+    if kind in ("udp", "ws") and host and port.isdigit():
+        if kind == "udp":
+            return DatagramSink((host, int(port)))
+        return WebSocketSink(host, int(port))
+    raise ValueError(f"Unknown sink {spec!r}")
@@ -0,0 +1,195 @@
+"""
+Steadies the count before it is shown and sent. A finger held near the point
+where it counts as up flips between up and down from frame to frame, which
+makes the LCD flicker and floods the serial port with changes. Three stages
+can be combined:
+
+    hysteresis: a finger has to move past its threshold by a margin before
+                its state changes
+    majority vote: the count only changes to a value that more than half of
+                   the recent frames agree on
+    minimum hold: once the count changes it stays for at least hold_time
+
+Each stage does a constant amount of work per frame.
+"""
+from collections import Counter, deque
+import time
+
+import numpy as np
+
+WRIST = 0
+MIDDLE_MCP = 9
+
+
+class FingerHysteresis:
+    """
+    Keeps the state of every finger of every hand. A finger that is down
+    only goes up once its tip is past the joint by the margin, and the
+    other way around, so small movements around the threshold are ignored.
+    The hands are matched to the previous frame's by their IDs. Without IDs
+    they are matched by their order, and the states start again when the
+    number of hands changes.
+    """
+
+    def __init__(self, margin=0.0):
+        """
+        Parameter:
+            margin (float): the distance past the threshold, as a fraction
+                            of the distance from the wrist to the middle
+                            finger's knuckle
+        """
+        self.margin = margin
+        self._states = {}  # Hand ID: the finger states of the hand
+
+    def update(self, hand_list, finger_list, hand_ids=None):
+        """
+        Parameter:
+            hand_list (ndarray): (num_hands, 21, 2) points in pixels
+            finger_list (ndarray): (num_hands, 5, 2) tip and joint positions
+                                   from collect_finger_points
+            hand_ids (ndarray): ID of each hand, or None to match the hands
+                                by their order
+
+        return (ndarray): (num_hands, 5) booleans, True for fingers that
+                          are up
+        """
+        finger_list = np.asarray(finger_list, dtype=np.float64)
+        past_joint = finger_list[..., 0] - finger_list[..., 1]
+        states = past_joint > 0
+        if hand_ids is None:
+            hand_ids = range(len(states))
+            if len(self._states) != len(states):
+                self._states = {}
+        hand_ids = [int(hand_id) for hand_id in hand_ids]
+        if self.margin > 0:
+            hand_list = np.asarray(hand_list, dtype=np.float64)
+            hand_size = np.linalg.norm(
+                hand_list[:, MIDDLE_MCP] - hand_list[:, WRIST], axis=-1)
+            margin = self.margin * hand_size[:, None]
+            for hand, hand_id in enumerate(hand_ids):
+                if hand_id in self._states:
+                    states[hand] = np.where(self._states[hand_id],
+                                            past_joint[hand] > -margin[hand],
+                                            past_joint[hand] > margin[hand])
+        # Only the hands in this frame are kept
+        self._states = dict(zip(hand_ids, states))
+        return states
+
+    def reset(self):
+        """
+        Forgets the finger states, for when no hands are in view.
+
+        return: None
+        """
+        self._states = {}
+
+
+class MajorityVote:  # pylint: disable=too-few-public-methods
+    """
+    Votes over the values of the last window frames. The ring buffer and the
+    tally of each value are updated as a frame comes in and the oldest one
+    leaves, so no frame is looked at twice.
+    """
+
+    def __init__(self, window=1):
+        """
+        Parameter:
+            window (int): number of recent frames that vote
+        """
+        self._recent = deque(maxlen=window)
+        self._tally = Counter()
+        self.value = None
+
+    def update(self, value):
+        """
+        Parameter:
+            value (object): this frame's value
+
+        return (object): the value more than half of the window agrees on,
+                         or the last such value while there isn't one
+        """
+        if len(self._recent) == self._recent.maxlen:
+            oldest = self._recent[0]
+            self._tally[oldest] -= 1
+            if not self._tally[oldest]:
+                del self._tally[oldest]
+        self._recent.append(value)
+        self._tally[value] += 1
+        if self.value is None or 2 * self._tally[value] > len(self._recent):
+            self.value = value
+        return self.value
+
+
+class MinimumHold:  # pylint: disable=too-few-public-methods
+    """Keeps a value for at least hold_time seconds after it changes."""
+
+    def __init__(self, hold_time=0.0, clock=time.monotonic):
+        """
+        Parameter:
+            hold_time (float): seconds a new value is kept for
+            clock (callable): returns the time in seconds
+        """
+        self.hold_time = hold_time
+        self.clock = clock
+        self.value = None
+        self._changed_at = None
+
+    def update(self, value):
+        """
+        Parameter:
+            value (object): this frame's value
+
+        return (object): the value, or the previous one if it hasn't been
+                         held for long enough
+        """
+        now = self.clock()
+        if self.value is None or (value != self.value and
+                                  now - self._changed_at >= self.hold_time):
+            self.value = value
+            self._changed_at = now
+        return self.value
+
+
+class CountSmoother:  # pylint: disable=too-few-public-methods
+    """
+    Runs the processed frames through the hysteresis, the majority vote and
+    the minimum hold, replacing their counts with the steadied count.
+    """
+
+    def __init__(self, window=1, margin=0.0, hold_time=0.0,
+                 clock=time.monotonic):
+        """
+        Parameter:
+            window (int): number of recent frames in the majority vote
+            margin (float): finger hysteresis, as a fraction of hand size
+            hold_time (float): seconds a new count is kept for
+            clock (callable): returns the time in seconds
+        """
+        self.hysteresis = FingerHysteresis(margin)
+        self.vote = MajorityVote(window)
+        self.hold = MinimumHold(hold_time, clock)
+
+    def update(self, frame, count_fingers):
+        """
+        Parameter:
+            frame (FrameResult): the output of process_frame
+            count_fingers (callable): turns the finger states, as tip and
+                                      joint pairs, and the sideways flags
+                                      into the decimal and binary count
+
+        return (FrameResult): the frame with the steadied count
+        """
+        count = (0, 0)
+        if frame.hand_list is None:
+            self.hysteresis.reset()
+        else:
+            states = self.hysteresis.update(frame.hand_list,
+                                            frame.finger_list,
+                                            frame.hand_ids)
+            # A finger is up when its tip is past its joint, so (1, 0)
+            # counts as up and (0, 0) as down
+            pairs = np.stack([states, np.zeros_like(states)], axis=-1)
+            count = count_fingers(pairs.astype(np.int64),
+                                  frame.hand_sideways)
+        decimal, binary = self.hold.update(self.vote.update(count))
+        return frame._replace(decimal=decimal, binary=binary)
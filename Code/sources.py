@@ -0,0 +1,199 @@
+"""
+Sources of frames for the finger counter. Each source has the same read and
+release methods as cv2.VideoCapture, so the rest of the program doesn't need
+to know if the frames come from a webcam, a video file, a directory of
+images or arrays already in memory.
+
+Live sources run in real time. The others can either be paced to their frame
+rate or, by default, read as fast as the frames can be processed.
+"""
+from pathlib import Path
+import abc
+import time
+import cv2
+
+IMAGE_EXTENSIONS = {".bmp", ".jpeg", ".jpg", ".png", ".tif", ".tiff"}
+DEFAULT_FPS = 30.0
+
+
+class FrameSource(abc.ABC):
+    """
+    The base class of every source. Subclasses implement _next_frame, which
+    returns the next frame or None once there are no frames left.
+    """
+
+    live = False
+
+    def __init__(self, realtime=False, fps=DEFAULT_FPS):
+        """
+        Parameter:
+            realtime (bool): pace the frames to fps instead of reading them
+                             as fast as possible
+            fps (float): frame rate used when pacing the frames
+        """
+        self.realtime = realtime
+        self.fps = fps or DEFAULT_FPS
+        self._next_due = None
+
+    def read(self, image=None):
+        """
+        Returns the next frame, waiting for it to be due in real time mode.
+
+        Parameter:
+            image (ndarray): buffer to read the frame into, if the source
+                             supports it and the frame's size matches
+
+        return (tuple): success bool and the frame array
+        """
+        frame = self._next_frame(image)
+        if frame is None:
+            return False, None
+        if self.realtime and not self.live:
+            self._wait_for_frame()
+        return True, frame
+
+    def release(self):
+        """
+        Frees anything held by the source.
+
+        return: None
+        """
+
+    def __iter__(self):
+        while True:
+            success, frame = self.read()
+            if not success:
+                return
+            yield frame
+
+    @abc.abstractmethod
+    def _next_frame(self, image=None):
+        """
+        Reads the next frame.
+
+        Parameter:
+            image (ndarray): buffer to read the frame into, if the source
+                             supports it and the frame's size matches
+
+        return (ndarray): the frame, or None once there are no frames left
+        """
+
+    def _wait_for_frame(self):
+        now = time.monotonic()
+        if self._next_due is None:
+            self._next_due = now
+        elif self._next_due > now:
+            time.sleep(self._next_due - now)
+        self._next_due += 1 / self.fps
+
+
+class CaptureSource(FrameSource):
+    """
+    Frames read through cv2.VideoCapture from a camera or a video file.
+    """
+
+    def __init__(self, device, realtime=False, fps=None):
+        """
+        Parameter:
+            device (int/str): camera number or path to the video file
+            realtime (bool): pace a video file to its frame rate
+            fps (float): frame rate, read from the file when None
+        """
+        self.cap = cv2.VideoCapture(device)
+        if not self.cap.isOpened():
+            raise OSError(f"Cannot open {device}")
+        super().__init__(realtime,
+                         fps or self.cap.get(cv2.CAP_PROP_FPS))
+
+    def release(self):
+        self.cap.release()
+
+    def _next_frame(self, image=None):
+        success, frame = self.cap.read(image)
+        return frame if success else None
+
+
+class CameraSource(CaptureSource):
+    """
+    A webcam. Its frames always arrive in real time.
+    """
+
+    live = True
+
+    def __init__(self, index=0):
+        """
+        Parameter:
+            index (int): the camera's number
+        """
+        super().__init__(index, realtime=True)
+
+
+class VideoFileSource(CaptureSource):
+    """
+    The frames of a video file.
+    """
+
+
+class ImageDirectorySource(FrameSource):
+    """
+    The images in a directory, read in file name order.
+    """
+
+    def __init__(self, directory, realtime=False, fps=DEFAULT_FPS):
+        """
+        Parameter:
+            directory (str): path to the directory of images
+            realtime (bool): pace the images to fps
+            fps (float): frame rate used when pacing the images
+        """
+        super().__init__(realtime, fps)
+        self.paths = sorted(path for path in Path(directory).iterdir()
+                            if path.suffix.lower() in IMAGE_EXTENSIONS)
+        self._paths = iter(self.paths)
+
+    def _next_frame(self, image=None):
+        for path in self._paths:
+            frame = cv2.imread(str(path))
+            if frame is not None:
+                return frame
+            print(f"Skipping unreadable image {path}")
+        return None
+
+
+class ArraySource(FrameSource):
+    """
+    Frames that are already in memory, from a list of arrays or a generator.
+    """
+
+    def __init__(self, frames, realtime=False, fps=DEFAULT_FPS):
+        """
+        Parameter:
+            frames (iterable): BGR image arrays
+            realtime (bool): pace the frames to fps
+            fps (float): frame rate used when pacing the frames
+        """
+        super().__init__(realtime, fps)
+        self._frames = iter(frames)
+
+    def _next_frame(self, image=None):
+        return next(self._frames, None)
+
+
+def open_source(source, realtime=False):
+    """
+    Opens a source from its command line description. A number is a camera,
+    a directory is read as images and anything else as a video file.
+
+    Parameter:
+        source (str): camera number or path to the video/directory
+        realtime (bool): pace file sources to their frame rate
+
+    return (FrameSource): the opened source
+    """
+    if str(source).isdigit():
+        return CameraSource(int(source))
+    if Path(source).is_dir():
+        return ImageDirectorySource(source, realtime)
+    if not Path(source).is_file():
+        raise OSError(f"Cannot open {source}")
+    return VideoFileSource(source, realtime)
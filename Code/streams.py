@@ -0,0 +1,311 @@
+"""
+Counts the fingers in several streams at once, on one pool of processes
+instead of one copy of the program per camera. Each stream is pinned to
+one worker process, which keeps a warm model for each of its streams and
+sees that stream's frames in order, so the model can track the hands from
+one frame to the next rather than looking for palms in every frame. The
+streams are read in turn in the main process and a few frames per worker
+are kept in flight, so the workers stay busy while the counts come back in
+order for each stream. The frames are passed to the workers in shared
+memory rather than pickled.
+"""
+from collections import deque, namedtuple
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, wait
+import json
+import multiprocessing
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from counting import count_landmarks
+from detector import HandDetector, make_hands
+from shared_frames import FrameRing, attached_frame
+from sources import open_source
+
+StreamCount = namedtuple("StreamCount", [
+    "stream_id", "frame_index", "landmarks", "image_shape"])
+
+_BUILD_HANDS = None  # Builds the worker's models
+_DETECTORS = {}  # The worker's models, by stream ID
+
+
+def make_frame_hands(max_num_hands=2):
+    """
+    Builds a model for unrelated images, such as uploads, which treats every
+    image as a separate one instead of tracking the hands of the image
+    before.
+
+    Parameter:
+        max_num_hands (int): most hands found in a frame
+
+    return (Hands): the model
+    """
+    return make_hands(max_num_hands, static_image_mode=True)
+
+
+def _start_worker(build_hands):
+    global _BUILD_HANDS  # pylint: disable=global-statement
+    _BUILD_HANDS = build_hands
+
+
+def _detector(stream_id):
+    # Each stream has its own model, so tracking never crosses streams
+    detector = _DETECTORS.get(stream_id)
+    if detector is None:
+        detector = _DETECTORS[stream_id] = HandDetector(_BUILD_HANDS())
+    return detector
+
+
+def _warm_up(stream_ids):
+    for stream_id in stream_ids:
+        _detector(stream_id)
+
+
+def _detect(image, stream_id=None):
+    landmarks, _handedness = _detector(stream_id).run_model(image)
+    return landmarks
+
+
+def _detect_shared(name, slot_size, index, shape, stream_id):
+    return _detect(attached_frame(name, slot_size, index, shape), stream_id)
+
+
+def _decode(data):
+    # imdecode raises on empty data rather than returning None
+    if not data:
+        return None
+    try:
+        return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    except cv2.error:
+        return None
+
+
+def _detect_encoded(batch):
+    results = []
+    for data in batch:
+        image = _decode(data)
+        results.append(None if image is None else
+                       (_detect(image), image.shape))
+    return results
+
+
+class StreamPool:
+    """
+    A pool of worker processes with warm models. Each worker is an executor
+    of its own, so a stream's frames can always be sent to the same one.
+    The workers are started fresh rather than forked, so they don't inherit
+    the model or threads of the main process.
+    """
+
+    def __init__(self, build_hands=make_hands, workers=None,
+                 frames_per_worker=2):
+        """
+        Parameter:
+            build_hands (callable): builds a model in a worker, it must be
+                                    picklable. Encoded images are unrelated,
+                                    so a pool for them should build models
+                                    with make_frame_hands.
+            workers (int): number of processes, one per core when None
+            frames_per_worker (int): frames waiting for or in each worker
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = self.workers * frames_per_worker
+        context = multiprocessing.get_context("spawn")
+        self._executors = [
+            ProcessPoolExecutor(1, mp_context=context,
+                                initializer=_start_worker,
+                                initargs=(build_hands,))
+            for _ in range(self.workers)]
+        # Tasks given to each worker that haven't finished
+        self._busy = [0] * self.workers
+        self._busy_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Stops the workers once their frames are done.
+
+        return: None
+        """
+        for executor in self._executors:
+            executor.shutdown()
+
+    def warm_up(self, num_streams=None):
+        """
+        Starts the workers and waits for their models to be built, so the
+        first frames don't wait for them.
+
+        Parameter:
+            num_streams (int): build a model for each of this many streams
+                               on the worker it is pinned to, or one model
+                               per worker for encoded images when None
+
+        return: None
+        """
+        if num_streams is None:
+            stream_ids = [[None]] * self.workers
+        else:
+            stream_ids = [range(worker, num_streams, self.workers)
+                          for worker in range(self.workers)]
+        wait([executor.submit(_warm_up, list(ids))
+              for executor, ids in zip(self._executors, stream_ids)])
+
+    def detect_encoded(self, batch):
+        """
+        Sends a batch of encoded images to a worker, which decodes them and
+        finds their landmarks. The images are sent encoded because they are
+        much smaller than the decoded frames, and to the worker with the
+        fewest unfinished batches.
+
+        Parameter:
+            batch (list): the JPEG or PNG bytes of each image
+
+        return (Future): resolves to a list with the (num_hands, 21, 3)
+                         normalised landmarks and the shape of each image,
+                         or None for each image that couldn't be decoded
+        """
+        with self._busy_lock:
+            worker = self._busy.index(min(self._busy))
+            self._busy[worker] += 1
+        future = self._executors[worker].submit(_detect_encoded, batch)
+        future.add_done_callback(partial(self._finished, worker))
+        return future
+
+    def _finished(self, worker, _future):
+        with self._busy_lock:
+            self._busy[worker] -= 1
+
+    def count(self, sources, mirror=True):
+        """
+        Finds the landmarks in every frame of every source. A source that
+        runs out of frames is dropped and the others carry on. The frames of
+        stream i all go to worker i % workers, in order, so a single stream
+        only uses one worker. Each stream's model is built before the first
+        frames are read. The frames
+        reach the workers through a FrameRing, sized for the largest first
+        frame, so only slot indices and landmarks go through the pipes.
+        A later frame too big for a slot is sent pickled instead.
+
+        Parameter:
+            sources (list): the FrameSources, their position in the list is
+                            their stream ID
+            mirror (bool): mirror the landmarks, to match the counts of the
+                           flipped image shown in the window
+
+        return (generator): a StreamCount for each frame, in order within
+                            each stream
+        """
+        self.warm_up(len(sources))
+        # The first frames size the ring, then go through it like the rest
+        ready = [source.read()[1] for source in sources]
+        sizes = [image.nbytes for image in ready if image is not None]
+        if not sizes:
+            return
+        readers = deque((stream_id, source) for stream_id, source
+                        in enumerate(sources) if ready[stream_id] is not None)
+        frame_indices = [0] * len(sources)
+        pending = deque()
+        with FrameRing(self.max_pending, max(sizes)) as ring:
+            while readers or pending:
+                self._send_frames(ring, readers, ready, pending)
+                if not pending:
+                    break
+                stream_id, slot, image_shape, future = pending.popleft()
+                landmarks = future.result()
+                ring.release(slot)
+                if mirror:
+                    landmarks[..., 0] = 1 - landmarks[..., 0]
+                yield StreamCount(stream_id, frame_indices[stream_id],
+                                  landmarks, image_shape)
+                frame_indices[stream_id] += 1
+
+    def _send_frames(self, ring, readers, ready, pending):
+        # Reads the streams in turn until enough frames are in flight
+        while readers and len(pending) < self.max_pending:
+            stream_id, source = readers.popleft()
+            slot = ring.acquire()
+            image = _read_into(ring, slot, source, ready[stream_id])
+            if image is None:
+                ring.release(slot)
+                continue
+            # Only the shape is kept, to read the next frame into
+            ready[stream_id] = image.shape
+            readers.append((stream_id, source))
+            pending.append((stream_id, slot, image.shape,
+                            self._submit(ring, slot, image, stream_id)))
+
+    def _submit(self, ring, slot, image, stream_id):
+        executor = self._executors[stream_id % self.workers]
+        if ring.fits(image.shape):
+            return executor.submit(_detect_shared, ring.name, ring.slot_size,
+                                   slot, image.shape, stream_id)
+        return executor.submit(_detect, image, stream_id)
+
+
+def _read_into(ring, slot, source, previous):
+    """
+    Puts a source's next frame in a slot of the ring. It is read straight
+    into the slot when it has the same shape as the previous frame, and
+    copied there otherwise.
+
+    Parameter:
+        ring (FrameRing): the ring the frame goes in
+        slot (int): index of the slot
+        source (FrameSource): the source to read from
+        previous (tuple/ndarray): shape of the stream's previous frame, or
+                                  its first frame when it hasn't been sent
+
+    return (ndarray): the frame, or None when the source has run out
+    """
+    if isinstance(previous, np.ndarray):
+        image, buffer = previous, None
+    else:
+        buffer = ring.frame(slot, previous) if ring.fits(previous) else None
+        success, image = source.read(buffer)
+        if not success:
+            return None
+    if image is not buffer and ring.fits(image.shape):
+        ring.frame(slot, image.shape)[...] = image
+    return image
+
+
+def count_streams(names, workers=None, realtime=False, max_hands=2):
+    """
+    Counts the fingers in every stream, printing the stream ID, source and
+    count of each frame as a JSON line.
+
+    Parameter:
+        names (list): camera numbers, video files or image directories
+        workers (int): number of processes, one per core when None
+        realtime (bool): play videos and images at their frame rate
+        max_hands (int): most hands found in a frame
+
+    return: None
+    """
+    sources = []
+    try:
+        for name in names:
+            sources.append(open_source(name, realtime))
+        with StreamPool(partial(make_hands, max_num_hands=max_hands),
+                        workers) as pool:
+            for result in pool.count(sources):
+                decimal, binary = count_landmarks(result.landmarks,
+                                                  result.image_shape)
+                print(json.dumps({
+                    "stream": result.stream_id,
+                    "source": names[result.stream_id],
+                    "frame": result.frame_index,
+                    "hands": len(result.landmarks),
+                    "decimal": int(decimal), "binary": int(binary)}),
+                    flush=True)
+    finally:
+        for source in sources:
+            source.release()
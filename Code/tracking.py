@@ -0,0 +1,123 @@
+"""
+Carries the hand landmarks forward between inference frames. Full inference
+only runs every few frames, or sooner when the hands move quickly or the
+tracked points are lost. In between, the 21 points of each hand are followed
+with pyramidal Lucas-Kanade optical flow, which costs a fraction of running
+the model.
+"""
+import cv2
+import numpy as np
+
+LK_PARAMS = {
+    "winSize": (21, 21),
+    "maxLevel": 3,
+    "criteria": (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03),
+}
+
+
+class LandmarkTracker:
+    """
+    Decides for each frame whether to run inference or track the landmarks
+    from the previous frame. When the last inference found no hands, there is
+    nothing to track and the frames until the next inference have no hands.
+    """
+
+    def __init__(self, interval=5, motion_threshold=0.02, max_lost=0.2):
+        """
+        Parameter:
+            interval (int): run inference at least once every interval
+                            frames
+            motion_threshold (float): median movement of the points between
+                                      two frames, as a fraction of the image
+                                      diagonal, that triggers inference
+            max_lost (float): fraction of points the flow can lose before
+                              inference is run
+        """
+        self.interval = interval
+        self.motion_threshold = motion_threshold
+        self.max_lost = max_lost
+        self.inferred_frames = 0
+        self.tracked_frames = 0
+        self._since_inference = interval
+        self._previous = (None, None)  # Greyscale image and landmarks
+        # The greyscale images take turns between two buffers, one of them
+        # holding the previous frame
+        self._grays = [np.empty((0, 0), dtype=np.uint8)] * 2
+        self._gray_index = 0
+
+    def reset(self):
+        """
+        Forgets the tracked hands so inference runs on the next frame.
+
+        return: None
+        """
+        self._since_inference = self.interval
+        self._previous = (None, None)
+
+    def update(self, image, detect):
+        """
+        Finds the landmarks for the next frame.
+
+        Parameter:
+            image (ndarray): the BGR image
+            detect (callable): runs inference on the image and returns its
+                               (num_hands, 21, 3) normalised landmarks, or
+                               None when there are no hands
+
+        return (ndarray): the frame's normalised landmarks, or None
+        """
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY,
+                            dst=self._next_gray(image.shape[:2]))
+        landmarks = None
+        run_inference = self._since_inference >= self.interval
+        if not run_inference and self._previous[1] is not None:
+            landmarks = self._track(gray)
+            run_inference = landmarks is None
+        if run_inference:
+            landmarks = detect()
+            self._since_inference = 0
+            self.inferred_frames += 1
+        else:
+            self.tracked_frames += 1
+        self._since_inference += 1
+        self._previous = (gray, landmarks)
+        return landmarks
+
+    def _next_gray(self, shape):
+        """
+        Parameter:
+            shape (tuple): height and width of the frame
+
+        return (ndarray): the buffer not holding the previous frame,
+                          reallocated only when the frame size changes
+        """
+        self._gray_index = 1 - self._gray_index
+        if self._grays[self._gray_index].shape != shape:
+            self._grays[self._gray_index] = np.empty(shape, dtype=np.uint8)
+        return self._grays[self._gray_index]
+
+    def _track(self, gray):
+        """
+        Follows the previous landmarks into this frame.
+
+        Parameter:
+            gray (ndarray): the greyscale image
+
+        return (ndarray): the tracked landmarks, or None if the hands moved
+                          too far or too many points were lost
+        """
+        previous_gray, previous_landmarks = self._previous
+        height, width = gray.shape
+        scale = np.array([width, height], dtype=np.float32)
+        previous = (previous_landmarks[..., :2] * scale).reshape(-1, 1, 2)
+        points, status, _error = cv2.calcOpticalFlowPyrLK(
+            previous_gray, gray, previous.astype(np.float32), None,
+            **LK_PARAMS)
+        if points is None or 1 - status.mean() > self.max_lost:
+            return None
+        motion = np.median(np.linalg.norm(points - previous, axis=-1))
+        if motion > self.motion_threshold * np.hypot(width, height):
+            return None
+        landmarks = previous_landmarks.copy()
+        landmarks[..., :2] = points.reshape(-1, landmarks.shape[1], 2) / scale
+        return landmarks
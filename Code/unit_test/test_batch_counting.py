@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from counting import (collect_finger_points, count_fingers_batch,
+                      finger_counter, is_hand_sideways, order_hands)
+
+
+def count_each_frame(frames):
+    """
+    Counts the frames one at a time with finger_counter.
+
+    return (tuple): lists of the decimal and binary count for each frame
+    """
+    decimals, binaries = [], []
+    for hand_list in frames:
+        if not hand_list:
+            decimals.append(0)
+            binaries.append(0)
+            continue
+        hand_list = order_hands(hand_list)
+        decimal, binary = finger_counter(collect_finger_points(hand_list),
+                                         is_hand_sideways(hand_list))
+        decimals.append(decimal)
+        binaries.append(binary)
+    return decimals, binaries
+
+
+@pytest.fixture
+def random_frames():
+    rng = np.random.default_rng(7)
+    return [[rng.integers(0, 1000, (21, 2)) for _ in range(num_hands)]
+            for num_hands in rng.integers(0, 3, 500)]
+
+
+def test_batch_matches_finger_counter_packed(random_frames):
+    """
+    The packed layout returns the same counts as counting each frame.
+
+    return: None
+    """
+    hands_per_frame = [len(frame) for frame in random_frames]
+    hand_list = np.array([hand for frame in random_frames for hand in frame])
+    decimal, binary = count_fingers_batch(hand_list, hands_per_frame)
+    assert (decimal.tolist(), binary.tolist()) == \
+        count_each_frame(random_frames)
+
+
+def test_batch_matches_finger_counter_padded(random_frames):
+    """
+    The padded layout ignores the unused hand slots.
+
+    return: None
+    """
+    padded = np.full((len(random_frames), 2, 21, 2), -1)
+    for index, frame in enumerate(random_frames):
+        if frame:
+            padded[index, :len(frame)] = frame
+    hands_per_frame = [len(frame) for frame in random_frames]
+    decimal, binary = count_fingers_batch(padded, hands_per_frame)
+    assert (decimal.tolist(), binary.tolist()) == \
+        count_each_frame(random_frames)
+
+
+def test_batch_with_no_hands():
+    """
+    Frames without hands count as zero.
+
+    return: None
+    """
+    decimal, binary = count_fingers_batch(np.zeros((0, 21, 2)), [0, 0, 0])
+    assert decimal.tolist() == [0, 0, 0]
+    assert binary.tolist() == [0, 0, 0]
+
+
+def test_many_hands_beyond_int64():
+    """
+    With up to 16 hands, past the 12 that fit in int64, both ways of
+    counting agree, and each upright hand takes the five digits after the
+    upright hands to its right.
+
+    return: None
+    """
+    rng = np.random.default_rng(3)
+    frames = [[rng.integers(0, 1000, (21, 2)) for _ in range(num_hands)]
+              for num_hands in rng.integers(0, 17, 200)]
+    hands_per_frame = [len(frame) for frame in frames]
+    hand_list = np.array([hand for frame in frames for hand in frame])
+    decimal, binary = count_fingers_batch(hand_list, hands_per_frame)
+    assert (decimal.tolist(), binary.tolist()) == count_each_frame(frames)
+
+    open_hands = np.tile([[1, 0]] * 5, (15, 1, 1))
+    sideways = np.zeros(15, dtype=bool)
+    assert finger_counter(open_hands, sideways) == (75, 2 ** 75 - 1)
+    sideways[7] = True
+    assert finger_counter(open_hands, sideways) == (75, 2 ** 70 - 1)
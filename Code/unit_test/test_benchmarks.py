@@ -0,0 +1,48 @@
+from benchmarks.stubs import generate_landmarks
+from benchmarks.suite import compare, counting_steps, run_end_to_end
+
+
+def test_counting_steps_run_for_many_hands():
+    """
+    Every microbenchmark runs on generated hands, which come out ordered
+    left to right.
+
+    return: None
+    """
+    landmarks = generate_landmarks(4)
+    assert landmarks.shape == (4, 21, 3)
+    assert (landmarks[:-1, :, 0].max(axis=1) <=
+            landmarks[1:, :, 0].min(axis=1)).all()
+    for step in counting_steps(4).values():
+        step()
+
+
+def test_end_to_end_counts_every_frame():
+    """
+    Without dropping frames, every synthetic frame reaches the consumer.
+
+    return: None
+    """
+    run = run_end_to_end(num_frames=12, num_hands=2, draw=True)
+    assert run["frames"] == 12
+    assert run["fps"] > 0
+
+
+def test_compare_finds_regressions():
+    """
+    Only benchmarks that got slower by more than the tolerance are reported.
+
+    return: None
+    """
+    run = {"source": "synthetic", "hands": 1, "draw": False}
+    baseline = {"micro": {"finger_counter": {"1": {"best_us": 2.0},
+                                             "2": {"best_us": 4.0}}},
+                "end_to_end": [dict(run, fps=1000.0)]}
+    results = {"micro": {"finger_counter": {"1": {"best_us": 2.2},
+                                            "2": {"best_us": 6.0},
+                                            "3": {"best_us": 9.0}}},
+               "end_to_end": [dict(run, fps=700.0)]}
+    regressions = compare(baseline, results, tolerance=0.25)
+    assert len(regressions) == 2
+    assert "2 hands" in regressions[0]
+    assert "fps" in regressions[1]
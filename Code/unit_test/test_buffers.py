@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+from buffers import BufferPool, PooledReader
+from detector import HandDetector
+from main import process_frame
+from sources import VideoFileSource
+
+
+def test_pool_reuses_released_buffers():
+    """
+    A buffer is handed out again only once it has been released, and
+    arrays from elsewhere are ignored.
+
+    return: None
+    """
+    pool = BufferPool()
+    first = pool.acquire((4, 4, 3))
+    second = pool.acquire((4, 4, 3))
+    assert second is not first
+    assert pool.acquire((4, 4, 3)) is not first
+    pool.release(first)
+    pool.release(np.empty((4, 4, 3), dtype=np.uint8))
+    assert pool.acquire((4, 4, 3)) is first
+    assert pool.acquire((2, 2)).shape == (2, 2)
+    assert len(pool) == 4
+
+
+def test_check_finds_buffers_released_too_early():
+    """
+    When checking, a released buffer that something still refers to, such
+    as a crop, isn't handed out silently.
+
+    return: None
+    """
+    pool = BufferPool(check=True)
+    buffer = pool.acquire((4, 4, 3))
+    crop = buffer[1:3]
+    pool.release(buffer)
+    del buffer
+    with pytest.raises(AssertionError):
+        pool.acquire((4, 4, 3))
+    del crop
+    pool = BufferPool(check=True)
+    pool.release(pool.acquire((4, 4, 3)))
+    pool.acquire((4, 4, 3))
+
+
+def test_pooled_reader_reads_into_the_same_buffer(tmp_path):
+    """
+    Once the previous frame is released, the next one is read into its
+    buffer.
+
+    return: None
+    """
+    path = str(tmp_path / "video.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25,
+                             (32, 24))
+    for index in range(4):
+        writer.write(np.full((24, 32, 3), index * 50, dtype=np.uint8))
+    writer.release()
+    reader = PooledReader(VideoFileSource(path))
+    brightness = []
+    while True:
+        success, frame = reader.read()
+        if not success:
+            break
+        brightness.append(int(frame.mean()))
+        reader.pool.release(frame)
+    reader.release()
+    # The first frame is read before the size is known, then every other
+    # frame goes into the same buffer
+    assert len(reader.pool) == 1
+    assert brightness == sorted(brightness) and brightness[-1] > 100
+
+
+class OneHand:
+    """Finds the same hand in every image."""
+
+    def process(self, _image):
+        points = zip(np.linspace(0.2, 0.3, 21), np.linspace(0.9, 0.1, 21))
+        return SimpleNamespace(
+            multi_hand_landmarks=[SimpleNamespace(landmark=[
+                SimpleNamespace(x=x, y=y, z=0.0) for x, y in points])],
+            multi_handedness=None)
+
+
+def test_mirror_matches_flipped_image():
+    """
+    Mirroring the landmarks puts them where they would be in the flipped
+    image, so the counts are the same without flipping the frame.
+
+    return: None
+    """
+    image = np.zeros((60, 80, 3), dtype=np.uint8)
+    flipped = process_frame(image, detector=HandDetector(OneHand()),
+                            pool=BufferPool())
+    mirrored = process_frame(image, detector=HandDetector(OneHand()),
+                             mirror=True)
+    assert mirrored.image is image
+    assert np.allclose(mirrored.landmarks[..., 0],
+                       1 - flipped.landmarks[..., 0])
+    assert (mirrored.decimal, mirrored.binary) == \
+        (flipped.decimal, flipped.binary)
@@ -1,8 +1,8 @@
 import pytest
 
-from main import (THUMB_COORD, FINGER_COORD,
-                  finger_position_relative_to_focal_point, finger_counter,
-                  determine_thumb_position)
+from counting import (THUMB_COORD, FINGER_COORD,
+                      finger_position_relative_to_focal_point,
+                      finger_counter, determine_thumb_position)
 
 HAND_NUM = 0  # This is one hand, but its index is 0
 TOT_NUM_HANDS = 1
@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from events import CountEventLog
+from main import run_window
+
+COUNTS = [(1, 1)] * 4 + [(2, 3)] * 5 + [(0, 0)]
+MODES = [True] * 7 + [False] * 3
+
+
+def write_log(path=None):
+    """
+    Feeds COUNTS and MODES through a log at 10 frames a second.
+
+    return (tuple): the log and the runs it started
+    """
+    log = CountEventLog(path, fps=10)
+    started = [log.update(index, decimal, binary, mode) for index,
+               ((decimal, binary), mode) in enumerate(zip(COUNTS, MODES))]
+    log.close()
+    return log, started
+
+
+def test_only_changes_make_events(tmp_path):
+    """
+    An event is only written when the count or mode changes, and the runs
+    between them cover every frame.
+
+    return: None
+    """
+    path = tmp_path / "events.jsonl"
+    log, started = write_log(str(path))
+    assert [index for index, run in enumerate(started) if run] == [0, 4, 7, 9]
+    assert [(run.mode, run.decimal, run.frames) for run in log.runs] == [
+        ("Decimal", 1, 4), ("Decimal", 2, 3), ("Binary", 2, 2),
+        ("Binary", 0, 1)]
+    assert len(path.read_text().splitlines()) == 5
+    decimal, binary = log.per_frame()
+    assert decimal.tolist() == [count[0] for count in COUNTS]
+    assert binary.tolist() == [count[1] for count in COUNTS]
+
+
+def test_load_and_query(tmp_path):
+    """
+    A loaded log has the same runs, which can be looked up by frame or time
+    and replayed at the pace they were recorded at.
+
+    return: None
+    """
+    path = tmp_path / "events.jsonl"
+    log, _started = write_log(str(path))
+    loaded = CountEventLog.load(str(path))
+    assert loaded.runs == log.runs
+    assert loaded.at_frame(5).decimal == 2
+    assert loaded.at_frame(-1) is None
+    assert loaded.at_time(0.75).mode == "Binary"
+    assert [run.frame for run in loaded.between(0.35, 0.75)] == [0, 4, 7]
+    waits = []
+    assert len(list(loaded.replay(True, waits.append))) == 4
+    assert np.allclose(waits, [0.4, 0.3, 0.2, 0.1])
+
+
+class FakeSerial:
+    """Keeps every message written to the display."""
+
+    def __init__(self):
+        self.sent = []
+
+    def write(self, message):
+        self.sent.append(message)
+
+
+def test_window_only_sends_changes(monkeypatch):
+    """
+    The window loop keeps what it last sent, so a count that doesn't change
+    isn't sent to the display again.
+
+    return: None
+    """
+    for name in ["draw_hands", "display_text", "cv2.imshow"]:
+        monkeypatch.setattr("main." + name, lambda *args: None)
+    monkeypatch.setattr("main.keyboard_input",
+                        lambda count_decimal, success: (count_decimal,
+                                                        success))
+    frames = [SimpleNamespace(decimal=decimal, binary=binary, image=None)
+              for decimal, binary in COUNTS]
+    serial_com = FakeSerial()
+    run_window(SimpleNamespace(indexed=lambda: enumerate(frames)),
+               serial_com, True)
+    assert serial_com.sent == [("Decimal", 1), ("Decimal", 2),
+                               ("Decimal", 0)]
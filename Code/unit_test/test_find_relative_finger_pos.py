@@ -1,7 +1,7 @@
 import pytest
 
-from main import (finger_position_relative_to_focal_point, THUMB_COORD,
-                  FINGER_COORD)
+from counting import (finger_position_relative_to_focal_point, THUMB_COORD,
+                      FINGER_COORD)
 
 
 hand_up_all_fingers_up_thumb_left = [
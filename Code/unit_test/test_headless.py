@@ -0,0 +1,55 @@
+from queue import SimpleQueue
+
+import pytest
+
+from controls import headless_input
+from main import send_count
+
+
+class FakeSerial:
+    """Records what would have been written to the serial port."""
+
+    def __init__(self):
+        self.written = []
+
+    def write(self, data):
+        self.written.append(data)
+
+
+@pytest.mark.parametrize("keys,expected",
+                         [
+                             ("", (True, True)),
+                             ("b", (False, True)),
+                             ("bd", (True, True)),
+                             ("tt t", (False, True)),
+                             ("q", (True, False))
+                         ]
+                         )
+def test_headless_input_applies_queued_keys(keys, expected):
+    """
+    Every key that arrived since the last frame is applied in order.
+
+    return: None
+    """
+    key_queue = SimpleQueue()
+    for key in keys:
+        key_queue.put(ord(key))
+    assert headless_input(key_queue, True, True) == expected
+    assert key_queue.empty()
+
+
+def test_send_count_only_sends_changes(capsys):
+    """
+    The count is written to serial and stdout once per change in the value
+    or in the counting type.
+
+    return: None
+    """
+    serial_com = FakeSerial()
+    num_vals = [3, 7, -1, ""]
+    send_count(num_vals, True, serial_com, echo=True)
+    send_count(num_vals, True, serial_com, echo=True)
+    send_count(num_vals, False, serial_com, echo=True)
+    assert serial_com.written == [("Decimal", 3), ("Binary", 7)]
+    assert capsys.readouterr().out == "Decimal: 3\nBinary: 7\n"
+    assert num_vals == [3, 7, 7, "Binary"]
@@ -0,0 +1,81 @@
+import numpy as np
+
+from identity import HandIdentities
+from smoothing import FingerHysteresis
+
+SHAPE = (300, 400, 3)
+
+
+def hands_at(*positions):
+    """
+    Builds hands whose 21 points all sit at the given positions.
+
+    return (ndarray): (num_hands, 21, 2) points in pixels
+    """
+    return np.repeat(np.array(positions, dtype=np.int32)[:, None], 21, axis=1)
+
+
+def test_ids_follow_hands_when_their_order_changes():
+    """
+    Two hands that swap places in the list keep their IDs, and a new hand
+    gets a new one.
+
+    return: None
+    """
+    identities = HandIdentities()
+    first = identities.update(hands_at((100, 100), (300, 100)), SHAPE)
+    swapped = identities.update(hands_at((310, 105), (95, 100)), SHAPE)
+    assert list(swapped) == [first[1], first[0]]
+    added = identities.update(hands_at((95, 100), (200, 250), (310, 105)),
+                              SHAPE)
+    assert added[0] == first[0] and added[2] == first[1]
+    assert added[1] not in first
+
+
+def test_far_hand_gets_a_new_id():
+    """
+    A hand that jumps further than max_distance isn't matched.
+
+    return: None
+    """
+    identities = HandIdentities(max_distance=0.1)
+    first = identities.update(hands_at((50, 50)), SHAPE)
+    assert identities.update(hands_at((350, 250)), SHAPE)[0] != first[0]
+
+
+def test_stale_tracks_are_evicted():
+    """
+    A hand that is gone for longer than max_missed frames loses its track,
+    and no more than max_tracks tracks are kept.
+
+    return: None
+    """
+    identities = HandIdentities(max_missed=2, max_tracks=3)
+    first = identities.update(hands_at((100, 100)), SHAPE)
+    identities.update(None, SHAPE)
+    identities.update(None, SHAPE)
+    assert identities.update(hands_at((100, 100)), SHAPE)[0] == first[0]
+    for _ in range(3):
+        identities.update(None, SHAPE)
+    assert not identities.tracks
+    identities.update(hands_at(*[(x, 100) for x in range(0, 400, 80)]),
+                      SHAPE)
+    assert len(identities.tracks) == 3
+
+
+def test_hysteresis_follows_hand_ids():
+    """
+    The finger states stay with a hand when the hands swap places.
+
+    return: None
+    """
+    hysteresis = FingerHysteresis(margin=0.5)
+    hands = np.zeros((2, 21, 2))
+    hands[:, 9, 1] = 10
+    up = np.array([[1.0, 0.0]] * 5)
+    down = np.array([[-1.0, 0.0]] * 5)
+    hysteresis.update(hands, np.stack([up, down]), [7, 3])
+    # Both hands are within the margin, so they keep their own states
+    near = np.array([[1.0, 2.0]] * 5)
+    states = hysteresis.update(hands, np.stack([near, near]), [3, 7])
+    assert not states[0].any() and states[1].all()
@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from counting import (collect_finger_points, convert_coords_to_pixels,
+                      is_hand_sideways, order_hands)
+
+
+hand_up_thumb_left = [
+    (502, 503), (420, 460), (359, 402), (322, 347), (283, 312), (428, 309),
+    (396, 208), (381, 149), (374, 104), (485, 300), (481, 182), (482, 114),
+    (489, 68), (539, 309), (530, 198), (529, 133), (530, 83), (590, 331),
+    (591, 251), (591, 205), (590, 167)
+]
+
+hand_down_thumb_right = [
+    (688, 324), (753, 294), (818, 301), (860, 328), (914, 350), (808, 424),
+    (838, 487), (847, 530), (848, 574), (746, 458), (762, 538), (762, 588),
+    (756, 634), (682, 465), (680, 545), (669, 594), (658, 638), (619, 452),
+    (579, 518), (546, 558), (518, 596)
+]
+
+
+def make_landmarks(points):
+    """
+    Builds an object shaped like MediaPipe's multi_hand_landmarks from
+    normalised (x, y) points.
+
+    return (list): hands with a landmark attribute
+    """
+    return [SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y, z=0.0)
+                                      for x, y in hand])
+            for hand in points]
+
+
+def test_convert_coords_to_pixels_shape_and_order():
+    """
+    The landmarks should be scaled to the image size, truncated to ints and
+    ordered from the leftmost wrist to the rightmost.
+
+    return: None
+    """
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+    right_hand = [(0.75, 0.5)] * 21
+    left_hand = [(0.25, 0.999)] * 21
+    hand_list = convert_coords_to_pixels(
+        make_landmarks([right_hand, left_hand]), image)
+    assert hand_list.shape == (2, 21, 2)
+    assert hand_list.dtype == np.int32
+    assert hand_list[0, 0].tolist() == [160, 479]
+    assert hand_list[1, 0].tolist() == [480, 240]
+
+
+def test_order_hands_keeps_equal_wrists_stable():
+    """
+    Hands with the same wrist x-position keep their detection order.
+
+    return: None
+    """
+    hands = np.zeros((3, 21, 2), dtype=np.int32)
+    hands[:, 1, 1] = [1, 2, 3]
+    hands[2, 0, 0] = -1
+    assert order_hands(hands)[:, 1, 1].tolist() == [3, 1, 2]
+
+
+@pytest.mark.parametrize("hand_list,expected",
+                         [
+                             ([hand_up_thumb_left], [False]),
+                             ([hand_down_thumb_right], [True]),
+                             ([hand_up_thumb_left, hand_down_thumb_right],
+                              [False, True])
+                         ]
+                         )
+def test_is_hand_sideways(hand_list, expected):
+    """
+    Every hand is checked in the one call.
+
+    return: None
+    """
+    assert is_hand_sideways(hand_list).tolist() == expected
+
+
+def test_collect_finger_points_reverses_thumb_right():
+    """
+    The thumb is first in the list unless it is on the right side of the
+    hand, in which case the fingers are reversed.
+
+    return: None
+    """
+    finger_list = collect_finger_points([hand_up_thumb_left,
+                                         hand_down_thumb_right])
+    assert finger_list.shape == (2, 5, 2)
+    assert finger_list[0, 0].tolist() == [307, 162]  # thumb
+    assert finger_list[1, -1].tolist() == [295, 189]  # thumb
@@ -0,0 +1,139 @@
+import os
+
+import numpy as np
+import pytest
+
+from landmark_cache import LandmarkCache, record_dtype
+
+
+@pytest.fixture
+def landmarks():
+    rng = np.random.default_rng(3)
+    return rng.random((2, 21, 3)).astype(np.float32)
+
+
+def test_put_and_get(tmp_path, landmarks):
+    """
+    Cached frames come back as they were stored, frames with no hands are
+    told apart from frames that were never cached.
+
+    return: None
+    """
+    cache = LandmarkCache(tmp_path)
+    cached = cache.open("video")
+    cached.put(0, landmarks)
+    cached.put(5000, landmarks[:0])
+    assert np.array_equal(cached.get(0), landmarks)
+    assert cached.get(5000).shape == (0, 21, 3)
+    assert cached.get(1) is None
+    assert cached.get(10 ** 6) is None
+    assert (cached.hits, cached.misses) == (2, 2)
+
+
+def test_reopened_cache_is_memory_mapped(tmp_path, landmarks):
+    """
+    After closing, the landmarks are read back from the file without
+    copying them into memory.
+
+    return: None
+    """
+    cache = LandmarkCache(tmp_path)
+    cache.open("video").put(3, landmarks)
+    cache.close()
+
+    cached = LandmarkCache(tmp_path).open("video")
+    stored = cached.get(3)
+    assert np.array_equal(stored, landmarks)
+    assert isinstance(stored, np.memmap)
+
+
+def test_extra_hands_are_not_stored(tmp_path, landmarks):
+    """
+    Only max_hands hands fit in a record.
+
+    return: None
+    """
+    cached = LandmarkCache(tmp_path, max_hands=1).open("video")
+    cached.put(0, landmarks)
+    assert np.array_equal(cached.get(0), landmarks[:1])
+
+
+def test_least_recently_used_files_are_evicted(tmp_path, landmarks):
+    """
+    Once the cache is over its size limit the oldest unopened files are
+    deleted first.
+
+    return: None
+    """
+    file_size = 1024 * record_dtype(2).itemsize
+    cache = LandmarkCache(tmp_path, max_bytes=2 * file_size)
+    for age, key in enumerate(["old", "middle", "new"]):
+        cache.open(key).put(0, landmarks)
+        cache.close()
+        os.utime(tmp_path / f"{key}.lmk", (age, age))
+    cache.open("middle")  # Used again, so "old" is now the oldest
+    cache.evict()
+    assert sorted(path.stem for path in tmp_path.iterdir()) == \
+        ["middle", "new"]
+
+
+def test_source_key(tmp_path):
+    """
+    Keying by content matches a copy of the video, keying by path doesn't.
+
+    return: None
+    """
+    original = tmp_path / "a.avi"
+    copy = tmp_path / "b.avi"
+    original.write_bytes(b"video data")
+    copy.write_bytes(b"video data")
+    assert LandmarkCache.source_key(original, by_content=True) == \
+        LandmarkCache.source_key(copy, by_content=True)
+    assert LandmarkCache.source_key(original) != \
+        LandmarkCache.source_key(copy)
+
+
+def test_cached_frames_skip_the_model(tmp_path, landmarks):
+    """
+    process_frame counts cached frames without running HANDS.process.
+
+    return: None
+    """
+    from detector import HandDetector
+    from main import process_frame
+
+    class NoModel:
+        def process(self, _image):
+            raise AssertionError("the model should not run")
+
+    cached = LandmarkCache(tmp_path).open("video")
+    cached.put(0, landmarks)
+    cached.put(1, landmarks[:0])
+    detector = HandDetector(NoModel(), cache=cached)
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+    frame = process_frame(image, 0, detector)
+    assert frame.hand_list.shape == (2, 21, 2)
+    assert process_frame(image, 1, detector).hand_list is None
+
+
+def test_reduced_inference_is_not_cached(tmp_path):
+    """
+    Landmarks found on a downscaled or cropped frame aren't cached, so a
+    later full quality run doesn't replay them.
+
+    return: None
+    """
+    from benchmarks.stubs import StubHands
+    from detector import HandDetector
+    from roi import RegionOfInterest
+
+    cached = LandmarkCache(tmp_path).open("video")
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+    for frame_index, roi in enumerate([RegionOfInterest(0.25, crop=False),
+                                       RegionOfInterest(crop=True)]):
+        HandDetector(StubHands(), cache=cached, roi=roi).detect(
+            image, frame_index)
+        assert cached.get(frame_index) is None
+    HandDetector(StubHands(), cache=cached,
+                 roi=RegionOfInterest(crop=False)).detect(image, 2)
+    assert len(cached.get(2)) == 1
@@ -0,0 +1,81 @@
+import subprocess
+import sys
+import threading
+
+from benchmarks.stubs import StubHands
+from detector import LazyHands
+
+
+def test_counting_imports_without_heavy_modules():
+    """
+    The counting functions load without OpenCV, MediaPipe or the serial
+    port, and importing main doesn't build the model.
+
+    return: None
+    """
+    code = ("import sys, counting; "
+            "assert not {'cv2', 'mediapipe', 'serial'} & set(sys.modules); "
+            "import main; "
+            "assert 'mediapipe' not in sys.modules and not main.HANDS.built")
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_model_is_built_once_on_first_use():
+    """
+    The model is built by the prewarm thread or the first frame, whichever
+    comes first, and only once.
+
+    return: None
+    """
+    release = threading.Event()
+    built = []
+
+    def build():
+        release.wait(2)
+        built.append(StubHands())
+        return built[-1]
+
+    hands = LazyHands(build)
+    assert not hands.built
+    thread = hands.prewarm()
+    release.set()
+    results = hands.process(None)
+    thread.join(2)
+    assert len(built) == 1 and hands.built
+    assert len(results.multi_hand_landmarks) == 1
+
+
+class ClosingHands(StubHands):
+    """Remembers whether it has been closed."""
+
+    def __init__(self):
+        super().__init__()
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_rebuild_closes_the_old_model():
+    """
+    Once the new model is in place the one it replaced is closed, and a
+    model replaced before it was swapped in is closed too.
+
+    return: None
+    """
+    built = []
+
+    def build():
+        built.append(ClosingHands())
+        return built[-1]
+
+    hands = LazyHands(build)
+    hands.get()
+    hands.rebuild(build).join(2)
+    assert built[0].closed and not built[1].closed
+    assert hands.get() is built[1]
+    first = hands.rebuild(build)
+    hands.rebuild(build).join(2)
+    first.join(2)
+    assert hands.get() is built[-1] and not built[-1].closed
+    assert all(model.closed for model in built[:-1])
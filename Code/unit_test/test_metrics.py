@@ -0,0 +1,129 @@
+import json
+import threading
+import time
+
+import numpy as np
+
+from metrics import (LatencyWindow, MetricsExporter, StageMetrics,
+                     draw_metrics, prometheus_text)
+
+
+def test_latency_window_keeps_recent_samples():
+    """
+    Once the window is full the oldest latencies are overwritten, while the
+    count and total cover every latency.
+
+    return: None
+    """
+    window = LatencyWindow(size=4)
+    assert window.quantiles() == {}
+    for seconds in range(1, 7):
+        window.add(float(seconds))
+    assert window.recent().tolist() == [3.0, 4.0, 5.0, 6.0]
+    assert window.count == 6 and window.total == 21.0
+    quantiles = window.quantiles()
+    assert quantiles["p50"] == 4.5
+    assert 5.9 < quantiles["p99"] <= 6.0
+
+
+def test_stages_and_fps():
+    """
+    Timed blocks and functions are recorded under their stage, and the fps
+    comes from when the frames finished.
+
+    return: None
+    """
+    metrics = StageMetrics()
+    calls = []
+    metrics.listeners.append(lambda: calls.append(True))
+    slow_read = metrics.timed("capture", lambda: time.sleep(0.01) or 5)
+    for _ in range(3):
+        assert slow_read() == 5
+        with metrics.stage("draw"):
+            pass
+        metrics.frame_done()
+    summary = metrics.summary()
+    assert summary["frames"] == 3 and len(calls) == 3
+    assert summary["stages"]["capture"]["count"] == 3
+    assert summary["stages"]["capture"]["p50"] >= 0.01
+    assert summary["stages"]["draw"]["p99"] < 0.01
+    assert 0 < summary["fps"] < 100
+
+
+def test_prometheus_text():
+    """
+    The summary is written as Prometheus metrics.
+
+    return: None
+    """
+    metrics = StageMetrics()
+    with metrics.stage("model"):
+        pass
+    metrics.gauges["inference_dropped_frames"] = 2
+    text = prometheus_text(metrics.summary())
+    assert 'finger_counter_stage_seconds{stage="model",quantile="0.95"}' \
+        in text
+    assert 'finger_counter_stage_seconds_count{stage="model"} 1\n' in text
+    assert "finger_counter_inference_dropped_frames 2\n" in text
+    assert text.endswith("\n")
+
+
+def test_exporter_writes_file_and_json_lines(tmp_path, capsys):
+    """
+    The exporter waits for the interval, then replaces the text file or
+    prints a JSON line.
+
+    return: None
+    """
+    metrics = StageMetrics()
+    path = tmp_path / "counter.prom"
+    exporter = MetricsExporter(metrics, str(path), interval=60)
+    assert not exporter.poll()
+    assert not path.exists()
+    exporter.interval = 0
+    exporter.export()
+    assert "finger_counter_fps" in path.read_text()
+    assert list(tmp_path.iterdir()) == [path]
+    MetricsExporter(metrics, "-").export()
+    assert json.loads(capsys.readouterr().out)["frames"] == 0
+
+
+def test_overlay_draws_on_the_image():
+    """
+    The overlay writes the figures onto the frame.
+
+    return: None
+    """
+    metrics = StageMetrics(overlay=True)
+    with metrics.stage("capture"):
+        pass
+    image = np.zeros((240, 320, 3), dtype=np.uint8)
+    draw_metrics(image, metrics)
+    assert image[200:].any()
+
+
+def test_summary_while_stages_are_added():
+    """
+    Summaries can be made while another thread times new stages.
+
+    return: None
+    """
+    metrics = StageMetrics()
+    added = threading.Event()
+
+    def add_stages():
+        for index in range(2000):
+            with metrics.stage(f"stage{index}"):
+                pass
+            if index == 100:
+                added.set()
+
+    thread = threading.Thread(target=add_stages)
+    thread.start()
+    added.wait(5)
+    try:
+        while thread.is_alive():
+            metrics.summary()
+    finally:
+        thread.join()
+    assert len(metrics.summary()["stages"]) == 2000
@@ -0,0 +1,134 @@
+from queue import Empty
+import threading
+
+import pytest
+
+from pipeline import DropOldestQueue, FramePipeline, QueueClosed
+
+
+def test_queue_drops_oldest_when_full():
+    """
+    Putting into a full queue discards the oldest item instead of blocking.
+
+    return: None
+    """
+    frames = DropOldestQueue(maxsize=2)
+    for frame in range(5):
+        frames.put(frame)
+    assert frames.qsize() == 2
+    assert frames.dropped == 3
+    assert frames.get() == 3
+    assert frames.get() == 4
+
+
+def test_queue_get_after_close():
+    """
+    A closed queue still hands out what it holds, then raises QueueClosed.
+
+    return: None
+    """
+    frames = DropOldestQueue()
+    with pytest.raises(Empty):
+        frames.get(timeout=0.01)
+    frames.put("frame")
+    frames.close()
+    assert frames.get() == "frame"
+    with pytest.raises(QueueClosed):
+        frames.get()
+
+
+def make_reader(num_frames):
+    """
+    Builds a read function that behaves like cap.read for a short video.
+
+    return (callable): returns (success, frame number)
+    """
+    frames = iter(range(num_frames))
+
+    def read_frame():
+        frame = next(frames, None)
+        return frame is not None, frame
+    return read_frame
+
+
+def test_pipeline_yields_processed_frames_in_order():
+    """
+    With a queue big enough for every frame nothing is dropped, and frames
+    come out in capture order.
+
+    return: None
+    """
+    pipeline = FramePipeline(make_reader(20), lambda frame: frame * 2,
+                             queue_size=20).start()
+    assert list(pipeline) == [frame * 2 for frame in range(20)]
+    pipeline.stop()
+    assert pipeline.queue_depths() == {"inference": 0, "render": 0}
+
+
+def test_pipeline_drops_frames_for_a_slow_stage():
+    """
+    The render stage only sees the newest frames when inference is slow,
+    and the drops are counted.
+
+    return: None
+    """
+    release = threading.Event()
+
+    def slow_process(frame):
+        release.wait()
+        return frame
+
+    pipeline = FramePipeline(make_reader(50), slow_process).start()
+    while pipeline.frames.dropped < 10:
+        pass
+    release.set()
+    results = list(pipeline)
+    pipeline.stop()
+    assert results[-1] == 49
+    assert len(results) < 50
+    assert pipeline.dropped_frames()["inference"] >= 10
+
+
+def test_pipeline_reraises_stage_errors():
+    """
+    An exception in the inference stage is raised in the render stage.
+
+    return: None
+    """
+    def broken_process(_frame):
+        raise ValueError("bad frame")
+
+    pipeline = FramePipeline(make_reader(3), broken_process).start()
+    with pytest.raises(ValueError):
+        list(pipeline)
+    pipeline.stop()
+
+
+def test_pipeline_releases_dropped_and_finished_frames():
+    """
+    Every captured frame is either processed or released when dropped, and
+    every result is released once, after the caller has moved past it.
+
+    return: None
+    """
+    release = threading.Event()
+    processed = []
+    released_frames = []
+    released_results = []
+
+    def slow_process(frame):
+        release.wait()
+        processed.append(frame)
+        return frame
+
+    pipeline = FramePipeline(make_reader(50), slow_process,
+                             release_frame=released_frames.append,
+                             release_result=released_results.append).start()
+    while pipeline.frames.dropped < 10:
+        pass
+    release.set()
+    for result in pipeline:
+        assert result not in released_results
+    pipeline.stop()
+    assert sorted(released_frames + processed) == list(range(50))
+    assert sorted(released_results) == sorted(processed)
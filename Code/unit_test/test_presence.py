@@ -0,0 +1,139 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from detector import HandDetector
+from landmark_cache import LandmarkCache
+from presence import IdleThrottle, PresenceGate
+
+HAND = np.zeros((1, 21, 3), dtype=np.float32)
+EMPTY = np.zeros((0, 21, 3), dtype=np.float32)
+
+
+class CountingModel:
+    """Stands in for inference, returning hands for the chosen frames."""
+
+    def __init__(self, hand_frames=()):
+        self.hand_frames = set(hand_frames)
+        self.calls = 0
+
+    def __call__(self, frame_index):
+        self.calls += 1
+        return (HAND if frame_index in self.hand_frames else EMPTY), []
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def scene(value=60, patch=None):
+    """
+    Builds a flat grey frame, with an optional square of another colour.
+
+    return (ndarray): the BGR image
+    """
+    image = np.full((120, 160, 3), value, dtype=np.uint8)
+    if patch is not None:
+        image[30:70, 40:80] = patch
+    return image
+
+
+def run(gate, model, frames):
+    """
+    Runs each frame through the gate.
+
+    return (list): the number of hands found in each frame
+    """
+    results = [gate.update(image, lambda index=index: model(index))
+               for index, image in enumerate(frames)]
+    return [0 if result is None else len(result[0]) for result in results]
+
+
+def test_still_scene_skips_inference():
+    """
+    The model only runs on the first frame of a still, empty scene and
+    again when something moves into it.
+
+    return: None
+    """
+    model = CountingModel()
+    gate = PresenceGate()
+    run(gate, model, [scene()] * 5 + [scene(patch=200)] + [scene(patch=200)])
+    assert model.calls == 2
+    assert gate.skipped_frames == 5
+
+
+def test_hands_in_view_always_run_inference():
+    """
+    While the model finds hands it runs on every frame, even a still one.
+
+    return: None
+    """
+    model = CountingModel(hand_frames=range(1, 4))
+    gate = PresenceGate()
+    frames = [scene()] + [scene(patch=200)] * 6
+    assert run(gate, model, frames) == [0, 1, 1, 1, 0, 0, 0]
+    assert model.calls == 5
+
+
+def test_skin_gate_ignores_other_colours():
+    """
+    With the skin mask on, a grey object moving in doesn't run the model
+    but a skin coloured one does.
+
+    return: None
+    """
+    model = CountingModel()
+    gate = PresenceGate(skin=True)
+    skin = (120, 150, 200)  # BGR of a light skin tone
+    run(gate, model, [scene(), scene(patch=200), scene(patch=skin)])
+    assert model.calls == 2
+
+
+def test_throttle_idles_and_wakes_on_motion():
+    """
+    The capture drops to the idle rate after a still, empty spell and goes
+    back to the full rate when the gate sees motion.
+
+    return: None
+    """
+    clock = FakeClock()
+    reads = []
+    throttle = IdleThrottle(lambda: reads.append(clock()), idle_after=5,
+                            idle_fps=1000, clock=clock)
+    gate = PresenceGate(throttle=throttle)
+    model = CountingModel()
+    run(gate, model, [scene()])
+    clock.now = 4.0
+    assert not throttle.idle
+    clock.now = 6.0
+    assert throttle.idle
+    throttle.read()
+    run(gate, model, [scene(patch=200)])
+    assert not throttle.idle
+    assert len(reads) == 1
+
+
+def test_skipped_frames_are_not_cached(tmp_path):
+    """
+    Only the frames the model ran on are cached, so a later run without the
+    gate still runs the model on the frames it skipped.
+
+    return: None
+    """
+    cached = LandmarkCache(tmp_path).open("video")
+    detector = HandDetector(
+        SimpleNamespace(process=lambda _image: SimpleNamespace(
+            multi_hand_landmarks=None, multi_handedness=None)),
+        cache=cached)
+    detector.gate = PresenceGate()
+    for frame_index in range(3):
+        assert detector.detect(scene(), frame_index) is None
+    assert cached.get(0) is not None
+    assert cached.get(1) is None and cached.get(2) is None
@@ -0,0 +1,195 @@
+import numpy as np
+
+from benchmarks.stubs import StubHands
+from detector import HandDetector, LazyHands
+from landmark_cache import LandmarkCache
+from quality import (LEVELS, QualityController, apply_level,
+                     relative_levels)
+from roi import RegionOfInterest
+from tracking import LandmarkTracker
+
+# Relative cost of a frame at each level
+COSTS = np.array([1.0, 0.6, 0.4, 0.25, 0.12, 0.08])
+BUDGET = 1 / 30
+
+
+def drive(controller, base_costs, seed=0):
+    """
+    Feeds the controller a synthetic trace, where each frame's latency is
+    the machine's cost at the current level with some noise.
+
+    Parameter:
+        controller (QualityController): the controller under test
+        base_costs (list): seconds a frame takes at the best level, for each
+                           frame of the trace
+
+    return (list): the level used for each frame
+    """
+    rng = np.random.default_rng(seed)
+    levels = []
+    for base_cost in base_costs:
+        levels.append(controller.level)
+        controller.observe(base_cost * COSTS[controller.level] *
+                           rng.uniform(0.9, 1.1))
+    return levels
+
+
+def drive_tracked(controller, inference_cost, tracked_cost, frames):
+    """
+    Feeds the controller a trace where only every detect_every-th frame runs
+    inference, and the frames in between cost the same at every level.
+
+    Parameter:
+        controller (QualityController): the controller under test
+        inference_cost (float): seconds inference takes at the best level
+        tracked_cost (float): seconds a tracked frame takes
+        frames (int): length of the trace
+
+    return (tuple): the level used and the latency of each frame
+    """
+    levels = []
+    latencies = []
+    since_change = 0
+    for _ in range(frames):
+        level = controller.level
+        if since_change % controller.current.detect_every == 0:
+            latency = inference_cost * COSTS[level]
+        else:
+            latency = tracked_cost
+        levels.append(level)
+        latencies.append(latency)
+        since_change = 0 if controller.observe(latency) else since_change + 1
+    return levels, latencies
+
+
+def test_settles_on_the_best_level_that_fits():
+    """
+    A machine that takes twice the budget at the best level settles on the
+    best level under budget, and stops trying the one above.
+
+    return: None
+    """
+    applied = []
+    lines = []
+    controller = QualityController(
+        BUDGET, lambda previous, level: applied.append(level),
+        log=lines.append)
+    levels = drive(controller, [2 * BUDGET] * 3000)
+    assert levels[-1] == 2
+    # Trying level 1 again is tried less and less often
+    late_changes = np.count_nonzero(np.diff(levels[1500:]))
+    assert late_changes <= 2
+    assert applied == [LEVELS[decision["to"]]
+                       for decision in controller.decisions]
+    assert len(lines) == len(controller.decisions)
+    assert "Quality level 0 -> 1" in lines[0]
+
+
+def test_fast_machine_keeps_full_quality():
+    """
+    A machine well under budget never leaves the best level.
+
+    return: None
+    """
+    controller = QualityController(BUDGET, lambda previous, level: None)
+    assert set(drive(controller, [0.3 * BUDGET] * 500)) == {0}
+    assert not controller.decisions
+
+
+def test_recovers_after_a_load_spike():
+    """
+    A burst of load steps the quality down quickly, and it comes back up
+    once the load is gone.
+
+    return: None
+    """
+    controller = QualityController(BUDGET, lambda previous, level: None)
+    trace = [0.5 * BUDGET] * 100 + [3 * BUDGET] * 100 + [0.5 * BUDGET] * 800
+    levels = drive(controller, trace)
+    assert max(levels[100:200]) >= 3
+    assert levels[-1] == 0
+
+
+def test_apply_level_sets_up_the_detector():
+    """
+    A level sets the inference scale and the tracking interval, and a new
+    model is built with the level's options.
+
+    return: None
+    """
+    built = []
+
+    def build(**options):
+        built.append(options)
+        return StubHands()
+
+    hands = LazyHands(build)
+    hands.get()
+    detector = HandDetector(hands)
+    apply_level(detector, build, LEVELS[0], LEVELS[4]).join(2)
+    assert detector.roi.scale == 0.5 and not detector.roi.crop
+    assert detector.tracker.interval == 3
+    assert built[1:] == [{"model_complexity": 0,
+                          "min_detection_confidence": 0.6,
+                          "min_tracking_confidence": 0.4}]
+    assert apply_level(detector, build, LEVELS[4],
+                       LEVELS[4]._replace(scale=1.0)) is None
+    assert detector.roi.scale == 1.0
+
+
+def test_levels_keep_the_settings_asked_for():
+    """
+    With a smaller inference scale, a crop and a tracking interval asked
+    for, the best level is those settings, each step down is cheaper and
+    the crop and tracking threshold are kept.
+
+    return: None
+    """
+    levels = relative_levels(scale=0.5, detect_every=2)
+    assert levels[0].scale == 0.5 and levels[0].detect_every == 2
+    assert all(cheaper.scale <= better.scale and
+               cheaper.detect_every >= better.detect_every
+               for better, cheaper in zip(levels, levels[1:]))
+    detector = HandDetector(LazyHands(StubHands),
+                            roi=RegionOfInterest(0.5, crop=True),
+                            tracker=LandmarkTracker(2, 0.05))
+    apply_level(detector, lambda **options: StubHands(), levels[0],
+                levels[2])
+    assert detector.roi.scale == 0.375 and detector.roi.crop
+    assert detector.tracker.interval == 2
+    assert detector.tracker.motion_threshold == 0.05
+
+
+def test_judges_inference_and_tracked_frames_together():
+    """
+    When most frames are cheap tracked ones, the controller still steps down
+    until the mean latency, inference frames included, fits the budget.
+
+    return: None
+    """
+    controller = QualityController(BUDGET, lambda previous, level: None)
+    levels, latencies = drive_tracked(controller, 1.5, 0.002, 3000)
+    assert levels[-1] == len(LEVELS) - 1
+    assert np.mean(latencies[-1000:]) <= BUDGET
+
+
+def test_lower_levels_are_not_cached(tmp_path):
+    """
+    Below the best level the landmarks aren't cached, and a tracker made
+    for a level keeps the motion threshold asked for.
+
+    return: None
+    """
+    def build(**_options):
+        return StubHands()
+
+    cached = LandmarkCache(tmp_path).open("video")
+    detector = HandDetector(LazyHands(StubHands), cache=cached)
+    image = np.zeros((120, 160, 3), dtype=np.uint8)
+    apply_level(detector, build, LEVELS[0], LEVELS[1], motion_threshold=0.1)
+    assert detector.tracker.motion_threshold == 0.1
+    detector.detect(image, 0)
+    assert cached.get(0) is None
+    apply_level(detector, build, LEVELS[1], LEVELS[0])
+    detector.detect(image, 1)
+    assert len(cached.get(1)) == 1
@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+
+from benchmarks.stubs import StubHands
+from counting import (collect_finger_points, convert_coords_to_pixels,
+                      finger_counter, is_hand_sideways)
+from detector import HandDetector
+from main import replay_recording
+from recording import LandmarkRecorder, LandmarkReplayer
+from tracking import LandmarkTracker
+
+IMAGE_SHAPE = (480, 640, 3)
+
+
+@pytest.fixture
+def recorded_frames():
+    rng = np.random.default_rng(11)
+    return [rng.random((num_hands, 21, 3)).astype(np.float32)
+            for num_hands in rng.integers(0, 3, 200)]
+
+
+@pytest.fixture
+def recording(tmp_path, recorded_frames):
+    path = tmp_path / "session.lmr"
+    with LandmarkRecorder(path) as recorder:
+        for index, landmarks in enumerate(recorded_frames):
+            recorder.record(landmarks, IMAGE_SHAPE,
+                            ["Left", "Right"][:len(landmarks)],
+                            timestamp=index / 30)
+    return path
+
+
+def test_replay_matches_recording(recording, recorded_frames):
+    """
+    The replayed landmarks are the recorded ones, read through the memory
+    map rather than copied.
+
+    return: None
+    """
+    replayer = LandmarkReplayer(recording)
+    assert len(replayer) == len(recorded_frames)
+    for index, frame in enumerate(replayer):
+        assert np.array_equal(frame.landmarks, recorded_frames[index])
+        assert frame.image_shape == IMAGE_SHAPE[:2]
+        assert frame.timestamp == pytest.approx(index / 30)
+        assert frame.handedness.tolist() == [0, 1][:len(frame.landmarks)]
+        assert np.shares_memory(frame.landmarks, replayer.records) or \
+            len(frame.landmarks) == 0
+
+
+def test_replay_counts_match_frame_by_frame(recording):
+    """
+    The batched replay counts the same as feeding each replayed frame into
+    convert_coords_to_pixels and finger_counter.
+
+    return: None
+    """
+    expected = []
+    for frame in LandmarkReplayer(recording):
+        if len(frame.landmarks) == 0:
+            expected.append((0, 0))
+            continue
+        hand_list = convert_coords_to_pixels(frame.landmarks,
+                                             frame.image_shape)
+        expected.append(finger_counter(collect_finger_points(hand_list),
+                                       is_hand_sideways(hand_list)))
+    decimal, binary = replay_recording(recording)
+    assert list(zip(decimal.tolist(), binary.tolist())) == expected
+
+
+def test_replay_counts_many_hands(tmp_path):
+    """
+    Recordings with more than 12 hands a frame replay to the same counts as
+    finger_counter, even though the binary count no longer fits in int64.
+
+    return: None
+    """
+    rng = np.random.default_rng(12)
+    frames = [rng.random((14, 21, 3)).astype(np.float32) for _ in range(20)]
+    path = tmp_path / "crowd.lmr"
+    with LandmarkRecorder(path, max_hands=14) as recorder:
+        for index, landmarks in enumerate(frames):
+            recorder.record(landmarks, IMAGE_SHAPE, timestamp=index / 30)
+    expected = []
+    for frame in LandmarkReplayer(path):
+        hand_list = convert_coords_to_pixels(frame.landmarks,
+                                             frame.image_shape)
+        expected.append(finger_counter(collect_finger_points(hand_list),
+                                       is_hand_sideways(hand_list)))
+    decimal, binary = replay_recording(path)
+    assert list(zip(decimal.tolist(), binary.tolist())) == expected
+
+
+def test_cut_off_recording(recording, recorded_frames):
+    """
+    A partly written last record is ignored.
+
+    return: None
+    """
+    with open(recording, "ab") as file:
+        file.write(b"\0" * 10)
+    assert len(LandmarkReplayer(recording)) == len(recorded_frames)
+
+
+def test_not_a_recording(tmp_path):
+    """
+    Files without the recording header are rejected.
+
+    return: None
+    """
+    path = tmp_path / "video.avi"
+    path.write_bytes(b"RIFF0000AVI LIST")
+    with pytest.raises(ValueError):
+        LandmarkReplayer(path)
+
+
+def test_tracked_frames_are_recorded(tmp_path):
+    """
+    With inference only every few frames, the tracked frames are recorded
+    too, so the recording has a frame for every frame of the source.
+
+    return: None
+    """
+    path = tmp_path / "tracked.lmr"
+    image = np.zeros(IMAGE_SHAPE, dtype=np.uint8)
+    with LandmarkRecorder(path) as recorder:
+        detector = HandDetector(StubHands(), recorder=recorder,
+                                tracker=LandmarkTracker(interval=3))
+        for frame_index in range(7):
+            detector.detect(image, frame_index)
+    replayer = LandmarkReplayer(path)
+    assert len(replayer) == 7
+    assert replayer.records["hands"].tolist() == [1] * 7
@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from detector import HandDetector
+from main import model_builder, parse_args
+from roi import RegionOfInterest
+
+IMAGE_SHAPE = (400, 600, 3)
+
+
+def make_hand(x_range, y_range):
+    """
+    Builds one hand whose landmarks span the given normalised ranges.
+
+    return (ndarray): (1, 21, 3) landmarks
+    """
+    landmarks = np.zeros((1, 21, 3))
+    landmarks[0, :, 0] = np.linspace(*x_range, 21)
+    landmarks[0, :, 1] = np.linspace(*y_range, 21)
+    return landmarks
+
+
+def test_box_is_padded_and_clamped():
+    """
+    The box covers the hands plus padding and stays inside the frame.
+
+    return: None
+    """
+    roi = RegionOfInterest(padding=0.5)
+    roi.update(make_hand((0.5, 0.6), (0.0, 0.1)), IMAGE_SHAPE)
+    assert roi.box == (270, 0, 390, 70)
+    roi.update(None, IMAGE_SHAPE)
+    assert roi.box is None
+
+
+def test_crop_landmarks_map_back_to_full_frame():
+    """
+    A point found in the crop is in the same place in the full frame.
+
+    return: None
+    """
+    roi = RegionOfInterest(padding=0)
+    roi.update(make_hand((0.25, 0.75), (0.5, 1.0)), IMAGE_SHAPE)
+    image = np.zeros(IMAGE_SHAPE, dtype=np.uint8)
+    crop, box = roi.prepare(image)
+    assert crop.shape == (200, 300, 3)
+    centre = np.array([[[0.5, 0.5, 0.0]]])
+    assert roi.to_full_frame(centre, box, IMAGE_SHAPE)[0, 0, :2].tolist() \
+        == [0.5, 0.75]
+
+
+def test_scale_and_full_frame_refresh():
+    """
+    The inference image is scaled, and the whole frame is searched again
+    after full_frame_every crops.
+
+    return: None
+    """
+    roi = RegionOfInterest(scale=0.5, full_frame_every=2)
+    roi.update(make_hand((0.4, 0.6), (0.4, 0.6)), IMAGE_SHAPE)
+    image = np.zeros(IMAGE_SHAPE, dtype=np.uint8)
+    boxes = [roi.prepare(image)[1] for _ in range(3)]
+    assert boxes[0] is not None and boxes[1] is not None
+    assert boxes[2] is None
+    assert roi.prepare(image)[0].shape[:2] != IMAGE_SHAPE[:2]
+
+
+class FullFrameOnlyModel:
+    """Finds a hand only when given the whole frame."""
+
+    def __init__(self):
+        self.sizes = []
+
+    def process(self, image):
+        self.sizes.append(image.shape[:2])
+        hands = []
+        if image.shape[:2] == IMAGE_SHAPE[:2]:
+            hands = [SimpleNamespace(landmark=[
+                SimpleNamespace(x=0.1, y=0.1, z=0.0)] * 21)]
+        return SimpleNamespace(multi_hand_landmarks=hands,
+                               multi_handedness=None)
+
+
+def test_detector_falls_back_to_full_frame():
+    """
+    When the crop has no hands in it, the detector searches the whole frame
+    in the same call.
+
+    return: None
+    """
+    model = FullFrameOnlyModel()
+    roi = RegionOfInterest()
+    detector = HandDetector(model, roi=roi)
+    image = np.zeros(IMAGE_SHAPE, dtype=np.uint8)
+    roi.update(make_hand((0.5, 0.6), (0.5, 0.6)), IMAGE_SHAPE)
+    landmarks = detector.detect(image)
+    assert len(model.sizes) == 2
+    assert model.sizes[0] != IMAGE_SHAPE[:2]
+    assert np.allclose(landmarks[0, 0, :2], [0.1, 0.1])
+
+
+def test_crops_use_a_static_image_model():
+    """
+    The model is only built in video mode when the frames aren't cropped.
+
+    return: None
+    """
+    assert model_builder(parse_args(["--roi"])).keywords[
+        "static_image_mode"]
+    assert not model_builder(parse_args(
+        ["--inference-scale", "0.5"])).keywords["static_image_mode"]
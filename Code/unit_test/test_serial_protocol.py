@@ -0,0 +1,209 @@
+import os
+import select
+import threading
+import time
+
+import pytest
+import serial
+
+from serial_protocol import (BinaryProtocol, FrameDecoder, HELLO,
+                             TextProtocol, crc8, decode_varint,
+                             encode_frame, encode_varint, negotiate)
+from serial_writer import SerialWriter
+
+
+class LoopbackPort:
+    """Keeps everything written to it."""
+
+    def __init__(self):
+        self.written = []
+
+    def write(self, data):
+        self.written.append(data)
+
+    def close(self):
+        pass
+
+
+def wait_for(condition, timeout=3.0):
+    """
+    Waits for a condition to become true.
+
+    return (bool): the condition's final value
+    """
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 1023, 2 ** 35,
+                                   2 ** 64 - 1])
+def test_varint_round_trip(value):
+    """
+    A value comes back the same, in as few bytes as it needs.
+
+    return: None
+    """
+    data = encode_varint(value)
+    assert len(data) == max(1, -(-value.bit_length() // 7))
+    assert decode_varint(data + b"\x00") == (value, len(data))
+
+
+def test_crc8():
+    """
+    The check value of CRC-8 with the polynomial 0x07.
+
+    return: None
+    """
+    assert crc8(b"123456789") == 0xF4
+
+
+def test_binary_protocol_only_sends_changes():
+    """
+    The first frame holds both fields, then only the ones that changed.
+
+    return: None
+    """
+    protocol = BinaryProtocol()
+    decoder = FrameDecoder()
+    first = protocol.encode(("Binary", 1023))
+    value_only = protocol.encode(("Binary", 5))
+    assert protocol.encode(("Binary", 5)) == b""
+    mode_only = protocol.encode(("Decimal", 5))
+    assert len(first) == 7 and len(value_only) == 5 and len(mode_only) == 5
+    assert decoder.feed(first + value_only + mode_only) == [
+        ("Binary", 1023), ("Binary", 5), ("Decimal", 5)]
+    assert len(TextProtocol().encode(("Binary", 1023))) == 13
+
+
+def test_counts_too_large_for_the_display_are_skipped():
+    """
+    A count over 64 bits can't be shown, so the writer skips it and keeps
+    running, and the next count is still sent as a change.
+
+    return: None
+    """
+    port = LoopbackPort()
+    writer = SerialWriter(lambda: None, port,
+                          negotiate=lambda _port: BinaryProtocol()).start()
+    writer.write(("Binary", 1 << 120))
+    assert wait_for(lambda: writer.unsendable == 1)
+    writer.write(("Binary", 6))
+    assert wait_for(lambda: port.written)
+    writer.close()
+    assert FrameDecoder().feed(b"".join(port.written)) == [("Binary", 6)]
+    with pytest.raises(ValueError):
+        encode_frame(value=1 << 64)
+
+
+def test_decoder_skips_noise_and_bad_frames():
+    """
+    Garbage and frames that fail the check are skipped, and a frame split
+    across reads is applied once it is complete.
+
+    return: None
+    """
+    decoder = FrameDecoder()
+    frame = encode_frame("Decimal", 7)
+    corrupted = frame[:-1] + bytes([frame[-1] ^ 0xFF])
+    assert decoder.feed(b"\x01\xa5" + corrupted + frame[:3]) == []
+    assert decoder.feed(frame[3:]) == [("Decimal", 7)]
+    assert decoder.errors >= 1
+
+
+class FakeDisplay:
+    """
+    The other end of a pty, behaving like display.ino. The legacy display
+    echoes every line back instead of answering the binary request. Until
+    ready_after seconds have passed, everything sent is lost, like a board
+    that is still in its bootloader after the port reset it.
+    """
+
+    def __init__(self, master, binary=True, ready_after=0.0):
+        self.master = master
+        self.binary = binary
+        self.ready_at = time.monotonic() + ready_after
+        self.decoder = FrameDecoder()
+        self.lines = []
+        self._received = b""
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(1)
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not select.select([self.master], [], [], 0.01)[0]:
+                continue
+            data = os.read(self.master, 1024)
+            if time.monotonic() < self.ready_at:
+                continue
+            self._received += data
+            if self._received.startswith(HELLO) and self.binary:
+                self._received = self._received[len(HELLO):]
+                os.write(self.master, b"BIN1\r\n")
+            if self.binary:
+                self.decoder.feed(self._received)
+                self._received = b""
+                continue
+            *lines, self._received = self._received.split(b"\n")
+            for line in lines:
+                self.lines.append(line.decode("ascii"))
+                os.write(self.master, line + b"\r\n")
+
+
+@pytest.mark.skipif(not hasattr(os, "openpty"), reason="needs a pty")
+@pytest.mark.parametrize("binary", [True, False])
+def test_loopback_over_pty(binary):
+    """
+    The writer negotiates the format with the display over a real serial
+    port, then the display ends up showing the latest count.
+
+    return: None
+    """
+    master, slave = os.openpty()
+    display = FakeDisplay(master, binary)
+    port = serial.Serial(os.ttyname(slave), 115200, timeout=0.1)
+    writer = SerialWriter(lambda: None, port, negotiate=negotiate).start()
+    try:
+        for message in [("Decimal", 3), ("Binary", 3), ("Binary", 1000)]:
+            writer.write(message)
+            time.sleep(0.05)
+        if binary:
+            assert wait_for(lambda: (display.decoder.mode,
+                                     display.decoder.value)
+                            == ("Binary", 1000))
+            assert isinstance(writer.protocol, BinaryProtocol)
+        else:
+            assert wait_for(lambda: display.lines[-2:] == ["Binary:", "1000"])
+            assert display.lines[:2] == ["Protocol:", "binary1"]
+            assert isinstance(writer.protocol, TextProtocol)
+    finally:
+        writer.close()
+        display.stop()
+        os.close(master)
+        os.close(slave)
+
+
+@pytest.mark.skipif(not hasattr(os, "openpty"), reason="needs a pty")
+def test_display_that_starts_late_is_still_asked():
+    """
+    A display that misses the first request while it starts up answers a
+    later one, so the binary format is still picked.
+
+    return: None
+    """
+    master, slave = os.openpty()
+    display = FakeDisplay(master, ready_after=0.3)
+    port = serial.Serial(os.ttyname(slave), 115200, timeout=0.1)
+    try:
+        assert isinstance(negotiate(port, hello_every=0.2), BinaryProtocol)
+    finally:
+        port.close()
+        display.stop()
+        os.close(master)
+        os.close(slave)
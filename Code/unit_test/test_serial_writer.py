@@ -0,0 +1,164 @@
+import threading
+import time
+
+import serial
+
+from serial_writer import SerialWriter
+
+
+class BlockingPort:
+    """A port whose writes wait until it is released."""
+
+    def __init__(self):
+        self.written = []
+        self.release = threading.Event()
+        self.writing = threading.Event()
+        self.closed = False
+
+    def write(self, data):
+        self.writing.set()
+        self.release.wait(5)
+        self.written.append(data)
+
+    def close(self):
+        self.closed = True
+
+
+class FailingPort:
+    """A port that has been unplugged."""
+
+    def __init__(self):
+        self.closed = False
+
+    def write(self, _data):
+        raise serial.SerialException("device disconnected")
+
+    def close(self):
+        self.closed = True
+
+
+def wait_for(condition, timeout=2.0):
+    """
+    Waits for a condition to become true.
+
+    return (bool): the condition's final value
+    """
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_stalled_port_never_blocks_and_keeps_latest():
+    """
+    While the port is stalled, writes return at once and only the newest
+    message waits to be sent.
+
+    return: None
+    """
+    port = BlockingPort()
+    writer = SerialWriter(lambda: None, port).start()
+    writer.write(("Decimal", 1))
+    assert port.writing.wait(2)
+    start = time.monotonic()
+    for value in range(2, 10):
+        writer.write(("Decimal", value))
+    assert time.monotonic() - start < 0.1
+    port.release.set()
+    writer.close()
+    assert port.written == [b"Decimal:\n1\n", b"Decimal:\n9\n"]
+    assert writer.dropped == 7
+    assert port.closed
+
+
+def test_reconnects_after_the_device_disappears():
+    """
+    A failed write closes the port, and the message is sent once connect
+    finds the device again.
+
+    return: None
+    """
+    failing = FailingPort()
+    replacement = BlockingPort()
+    replacement.release.set()
+    ports = [None, replacement]
+    writer = SerialWriter(lambda: ports.pop(0), failing,
+                          reconnect_delay=0.01).start()
+    writer.write(("Binary", 5))
+    assert wait_for(lambda: replacement.written)
+    writer.close()
+    assert failing.closed
+    assert replacement.written == [b"Binary:\n5\n"]
+    assert writer.sent == 1
+
+
+def test_no_device_at_start():
+    """
+    Without a device the messages are dropped and closing doesn't hang.
+
+    return: None
+    """
+    attempts = []
+    writer = SerialWriter(lambda: attempts.append(True),
+                          reconnect_delay=10).start()
+    for value in range(5):
+        writer.write(("Decimal", value))
+    assert wait_for(lambda: attempts)
+    start = time.monotonic()
+    writer.close()
+    assert time.monotonic() - start < 1
+    assert len(attempts) == 1
+
+
+def test_busy_port_is_retried():
+    """
+    A connect that raises, as for a port that is busy or not permitted,
+    counts as no device and the writer keeps trying until it opens.
+
+    return: None
+    """
+    port = BlockingPort()
+    port.release.set()
+
+    def connect():
+        if not port.written and len(attempts) < 2:
+            attempts.append(True)
+            raise serial.SerialException("could not open port: busy")
+        return port
+
+    attempts = []
+    writer = SerialWriter(connect, reconnect_delay=0.01).start()
+    writer.write(("Decimal", 4))
+    assert wait_for(lambda: port.written)
+    writer.close()
+    assert len(attempts) == 2
+    assert port.written == [b"Decimal:\n4\n"]
+
+
+def test_first_connection_is_made_on_the_writer_thread():
+    """
+    Opening the port for the first time happens on the writer thread, so a
+    slow or failing open doesn't hold up or stop the program.
+
+    return: None
+    """
+    opening = threading.Event()
+    threads = []
+
+    def first_connect():
+        threads.append(threading.current_thread())
+        opening.wait(2)
+        raise serial.SerialException("could not open port: busy")
+
+    port = BlockingPort()
+    port.release.set()
+    writer = SerialWriter(lambda: port, reconnect_delay=0.01,
+                          first_connect=first_connect).start()
+    start = time.monotonic()
+    writer.write(("Decimal", 7))
+    assert time.monotonic() - start < 0.1
+    opening.set()
+    assert wait_for(lambda: port.written)
+    writer.close()
+    assert [thread.name for thread in threads] == ["serial"]
+    assert port.written == [b"Decimal:\n7\n"]
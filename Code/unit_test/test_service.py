@@ -0,0 +1,185 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.client import HTTPConnection
+import json
+import threading
+import time
+from types import SimpleNamespace
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import cv2
+import numpy as np
+import pytest
+
+from service import CountService, make_server
+from streams import StreamPool
+
+
+class OpenHandHands:
+    """
+    A model that finds an open hand held upright, after a delay set by the
+    image's brightness in tenths of a second.
+    """
+
+    def process(self, image):
+        time.sleep(image[0, 0, 0] / 10)
+        landmarks = [SimpleNamespace(x=0.4 + 0.01 * index,
+                                     y=0.8 - 0.03 * index, z=0.0)
+                     for index in range(21)]
+        return SimpleNamespace(
+            multi_hand_landmarks=[SimpleNamespace(landmark=landmarks)],
+            multi_handedness=None)
+
+
+def encode(brightness=0, extension=".png"):
+    """
+    Encodes a small image of one brightness.
+
+    return (bytes): the encoded image
+    """
+    image = np.full((40, 60, 3), brightness, dtype=np.uint8)
+    return cv2.imencode(extension, image)[1].tobytes()
+
+
+def post(port, body, content_type="image/png"):
+    """
+    POSTs a body to the service.
+
+    return (tuple): the status and the decoded JSON reply
+    """
+    request = Request(f"http://127.0.0.1:{port}/count", body,
+                      {"Content-Type": content_type})
+    try:
+        with urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+def post_parts(port, parts):
+    """
+    POSTs files to the service as a multipart upload.
+
+    return (tuple): the status and the decoded JSON reply
+    """
+    boundary = "b0undary"
+    body = b"".join(
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; "
+        f"filename=\"{name}\"\r\n\r\n".encode() + data + b"\r\n"
+        for name, data in parts) + f"--{boundary}--\r\n".encode()
+    return post(port, body, f"multipart/form-data; boundary={boundary}")
+
+
+@pytest.fixture(name="service")
+def service_fixture():
+    """
+    Runs the service on a free port with one worker, taking at most three
+    waiting images.
+
+    return (tuple): the port and the CountService
+    """
+    with StreamPool(OpenHandHands, workers=1) as pool:
+        service = CountService(pool, batch_size=4, queue_size=3).start()
+        server = make_server(("127.0.0.1", 0), service)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server.server_port, service
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+def test_counts_uploaded_images(service):
+    """
+    A single image and a multipart batch are both counted, and an upload
+    that isn't an image gets an error of its own.
+
+    return: None
+    """
+    port, _service = service
+    status, reply = post(port, encode())
+    assert status == 200
+    image = reply["images"][0]
+    assert (image["hands"], image["decimal"]) == (1, 5)
+    assert image["sideways"] == [False]
+    assert np.array(image["landmarks"]).shape == (1, 21, 3)
+
+    status, reply = post_parts(port, [("one.png", encode()),
+                                      ("two.jpg", encode(0, ".jpg")),
+                                      ("notes.txt", b"not an image")])
+    assert status == 200
+    assert [image["name"] for image in reply["images"]] == \
+        ["one.png", "two.jpg", "notes.txt"]
+    assert [image.get("decimal") for image in reply["images"]] == \
+        [5, 5, None]
+
+
+def test_full_queue_returns_503(service):
+    """
+    While the worker is busy, requests beyond the queue's size are refused
+    at once instead of waiting.
+
+    return: None
+    """
+    port, _service = service
+    with ThreadPoolExecutor(8) as executor:
+        replies = list(executor.map(lambda _: post(port, encode(3)),
+                                    range(8)))
+    statuses = sorted(status for status, _reply in replies)
+    assert statuses[0] == 200 and statuses[-1] == 503
+    assert all("error" in reply for status, reply in replies
+               if status == 503)
+
+
+def test_empty_part_only_fails_itself(service):
+    """
+    An empty file in an upload gets an error of its own, and the other
+    images in the batch are still counted.
+
+    return: None
+    """
+    port, _service = service
+    status, reply = post_parts(port, [("empty.png", b""),
+                                      ("one.png", encode())])
+    assert status == 200
+    assert [image.get("decimal") for image in reply["images"]] == [None, 5]
+
+
+def test_failures_get_json_replies(service, monkeypatch):
+    """
+    A broken worker pool gets a 500 reply and counts that take too long a
+    504, instead of a dropped connection.
+
+    return: None
+    """
+    port, count_service = service
+    broken = Future()
+    broken.set_exception(BrokenProcessPool("a worker died"))
+    monkeypatch.setattr(count_service, "submit", lambda images: [broken])
+    status, reply = post(port, encode())
+    assert status == 500 and "worker died" in reply["error"]
+    monkeypatch.setattr("service.REPLY_TIMEOUT", 0.05)
+    monkeypatch.setattr(count_service, "submit", lambda images: [Future()])
+    status, reply = post(port, encode())
+    assert status == 504 and "error" in reply
+
+
+@pytest.mark.parametrize("length", ["ten", "-5"])
+def test_bad_content_length_gets_400(service, length):
+    """
+    A Content-Length that isn't a size gets a JSON 400 reply rather than a
+    dropped connection.
+
+    return: None
+    """
+    port, _service = service
+    connection = HTTPConnection("127.0.0.1", port, timeout=10)
+    connection.putrequest("POST", "/count")
+    connection.putheader("Content-Type", "image/png")
+    connection.putheader("Content-Length", length)
+    connection.endheaders()
+    response = connection.getresponse()
+    assert response.status == 400
+    assert "error" in json.loads(response.read())
+    connection.close()
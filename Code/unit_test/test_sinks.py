@@ -0,0 +1,166 @@
+import asyncio
+import base64
+import json
+import os
+import socket
+import time
+
+import pytest
+
+from sinks import (CLOSE, DROP_NEWEST, DROP_OLDEST, LATEST, DatagramSink,
+                   Sink, SinkQueue, StreamSink, WebSocketSink, open_sink,
+                   read_websocket_frame, websocket_accept, websocket_frame)
+
+
+class SlowSink(Sink):
+    """A consumer that takes a long time over every message."""
+
+    async def send(self, message):
+        await asyncio.sleep(0.05)
+
+
+class ListSink(Sink):
+    """Keeps every message it is sent."""
+
+    maxsize = 1000
+
+    def __init__(self):
+        super().__init__()
+        self.received = []
+
+    async def send(self, message):
+        self.received.append(message)
+
+
+@pytest.mark.parametrize("policy,expected", [(LATEST, [4]),
+                                             (DROP_OLDEST, [2, 3, 4]),
+                                             (DROP_NEWEST, [0, 1, 2])])
+def test_queue_policies(policy, expected):
+    """
+    A full queue keeps the newest item, the newest few or the oldest few.
+
+    return: None
+    """
+    async def fill():
+        queue = SinkQueue(3, policy)
+        for item in range(5):
+            queue.put(item)
+        queue.close()
+        return [await queue.get() for _ in range(len(queue))]
+
+    assert asyncio.run(fill()) == expected
+
+
+def test_slow_sink_doesnt_hold_up_the_others():
+    """
+    Publishing never waits for a slow sink, which drops messages while the
+    fast sink gets every one.
+
+    return: None
+    """
+    async def publish():
+        slow = await SlowSink(LATEST).start()
+        fast = await ListSink().start()
+        start = time.monotonic()
+        for value in range(100):
+            for sink in (slow, fast):
+                sink.publish({"decimal": value})
+            await asyncio.sleep(0)
+        elapsed = time.monotonic() - start
+        await fast.close()
+        await slow.close()
+        return elapsed, slow, fast
+
+    elapsed, slow, fast = asyncio.run(publish())
+    assert elapsed < 0.5
+    assert [message["decimal"] for message in fast.received] == \
+        list(range(100))
+    assert slow.dropped > 90 and slow.sent + slow.dropped == 100
+
+
+def test_websocket_client_gets_the_counts():
+    """
+    A client on localhost completes the handshake, gets each published
+    count as a text message and closes the connection cleanly.
+
+    return: None
+    """
+    async def serve():
+        sink = await WebSocketSink(port=0).start()
+        reader, writer = await asyncio.open_connection("127.0.0.1",
+                                                       sink.port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        writer.write(f"GET / HTTP/1.1\r\nHost: localhost\r\n"
+                     f"Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                     f"Sec-WebSocket-Key: {key}\r\n"
+                     f"Sec-WebSocket-Version: 13\r\n\r\n".encode())
+        response = await reader.readuntil(b"\r\n\r\n")
+        while not sink.clients:
+            await asyncio.sleep(0.01)
+        sink.publish({"decimal": 3, "mode": "Decimal"})
+        message = await asyncio.wait_for(read_websocket_frame(reader), 2)
+        writer.write(websocket_frame(b"\x03\xe8", CLOSE, mask=b"abcd"))
+        reply = await asyncio.wait_for(read_websocket_frame(reader), 2)
+        writer.close()
+        await sink.close()
+        return key, response, message, reply
+
+    key, response, message, reply = asyncio.run(serve())
+    assert response.startswith(b"HTTP/1.1 101")
+    assert websocket_accept(key).encode() in response
+    assert json.loads(message[1]) == {"decimal": 3, "mode": "Decimal"}
+    assert reply == (CLOSE, b"\x03\xe8")
+
+
+def test_datagram_and_stream_sinks(tmp_path):
+    """
+    Counts are sent as UDP datagrams and appended to a JSON lines file.
+
+    return: None
+    """
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(2)
+    path = tmp_path / "counts.jsonl"
+
+    async def publish():
+        sinks = [await DatagramSink(receiver.getsockname()).start(),
+                 await StreamSink(str(path)).start()]
+        for sink in sinks:
+            sink.publish({"binary": 5})
+        for sink in sinks:
+            await sink.close()
+
+    asyncio.run(publish())
+    assert json.loads(receiver.recv(1024)) == {"binary": 5}
+    assert path.read_text().splitlines() == ['{"binary": 5}']
+    receiver.close()
+
+
+def test_open_sink_specs():
+    """
+    Each spec opens its kind of sink, and bad specs are refused.
+
+    return: None
+    """
+    assert open_sink("udp:127.0.0.1:9000").address == ("127.0.0.1", 9000)
+    assert open_sink("unix:/tmp/counts").address == "/tmp/counts"
+    assert open_sink("ws:0.0.0.0:8765").port == 8765
+    assert open_sink("jsonl:out.jsonl").stream == "out.jsonl"
+    for spec in ["udp:9000", "ws:host:port", "jsonl:", "tcp:1.2.3.4:5"]:
+        with pytest.raises(ValueError):
+            open_sink(spec)
+
+
+def test_sink_without_send_cannot_be_made():
+    """
+    A sink that doesn't implement send fails when it is made, not when its
+    first message is sent.
+
+    return: None
+    """
+    class NoSend(Sink):
+        """Forgets to send."""
+
+    with pytest.raises(TypeError):
+        NoSend()
@@ -0,0 +1,84 @@
+import numpy as np
+
+from benchmarks.stubs import StubHands
+from detector import HandDetector
+from counting import finger_counter
+from main import process_frame
+from smoothing import (CountSmoother, FingerHysteresis, MajorityVote,
+                       MinimumHold)
+
+
+def finger_points(past_joint):
+    """
+    Builds the finger list of one hand whose fingers are past their joints
+    by the given amounts, and a hand 100 pixels from wrist to knuckle.
+
+    return (tuple): the hand list and the finger list
+    """
+    hand_list = np.zeros((1, 21, 2))
+    hand_list[0, 9] = (0, 100)
+    finger_list = np.zeros((1, 5, 2))
+    finger_list[0, :, 0] = past_joint
+    return hand_list, finger_list
+
+
+def test_hysteresis_ignores_small_movements():
+    """
+    A finger only changes state once it is past its joint by the margin.
+
+    return: None
+    """
+    hysteresis = FingerHysteresis(margin=0.1)
+    states = [hysteresis.update(*finger_points([past] * 5))[0, 0]
+              for past in [5, -5, 5, 15, 5, -5, -15, -5]]
+    assert states == [True, True, True, True, True, True, False, False]
+    hysteresis.reset()
+    assert not hysteresis.update(*finger_points([-5] * 5))[0, 0]
+
+
+def test_majority_vote_needs_more_than_half():
+    """
+    The value only changes once more than half of the window agrees.
+
+    return: None
+    """
+    vote = MajorityVote(window=5)
+    values = [vote.update(value) for value in [1, 2, 1, 2, 2, 2, 1, 1, 1]]
+    assert values == [1, 1, 1, 1, 2, 2, 2, 2, 1]
+
+
+def test_minimum_hold():
+    """
+    A new value is kept for the hold time, even if the input changes back.
+
+    return: None
+    """
+    now = [0.0]
+    hold = MinimumHold(hold_time=1.0, clock=lambda: now[0])
+    outputs = []
+    for time_step, value in [(0.0, 1), (0.1, 2), (0.5, 3), (1.0, 1),
+                             (1.2, 3), (2.0, 3)]:
+        now[0] = time_step
+        outputs.append(hold.update(value))
+    assert outputs == [1, 1, 1, 1, 3, 3]
+
+
+def test_smoother_keeps_frame_and_replaces_count():
+    """
+    The smoother swaps in the steadied count and leaves the rest of the
+    frame as it was.
+
+    return: None
+    """
+    image = np.zeros((60, 80, 3), dtype=np.uint8)
+    frame = process_frame(image, detector=HandDetector(StubHands()))
+    smoother = CountSmoother(window=3)
+    smoothed = smoother.update(frame, finger_counter)
+    assert frame.decimal > 0
+    assert (smoothed.decimal, smoothed.binary) == (frame.decimal,
+                                                   frame.binary)
+    assert smoothed.hand_list is frame.hand_list
+    empty = frame._replace(hand_list=None, finger_list=None,
+                           hand_sideways=None, decimal=0, binary=0)
+    assert smoother.update(empty, finger_counter).decimal == frame.decimal
+    assert smoother.update(empty, finger_counter).decimal == 0
@@ -0,0 +1,121 @@
+import json
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from count_writer import CountWriter
+from sources import (ArraySource, FrameSource, ImageDirectorySource,
+                     VideoFileSource, open_source)
+
+
+def make_frames(num_frames):
+    """
+    Builds small grey frames whose brightness is their frame number.
+
+    return (list): BGR image arrays
+    """
+    return [np.full((24, 32, 3), index, dtype=np.uint8)
+            for index in range(num_frames)]
+
+
+def test_array_source_reads_every_frame():
+    """
+    An array source behaves like cap.read and stops when the frames run out.
+
+    return: None
+    """
+    source = ArraySource(make_frames(3))
+    assert [frame[0, 0, 0] for frame in source] == [0, 1, 2]
+    assert source.read() == (False, None)
+
+
+def test_realtime_source_is_paced():
+    """
+    Real time mode spaces the frames out to the frame rate.
+
+    return: None
+    """
+    source = ArraySource(make_frames(4), realtime=True, fps=50)
+    start = time.monotonic()
+    assert len(list(source)) == 4
+    assert time.monotonic() - start >= 3 / 50
+
+
+def test_image_directory_source(tmp_path):
+    """
+    Images are read in file name order and other files are ignored.
+
+    return: None
+    """
+    for index, frame in reversed(list(enumerate(make_frames(3)))):
+        cv2.imwrite(str(tmp_path / f"{index:03}.png"), frame)
+    (tmp_path / "notes.txt").write_text("not an image")
+    source = open_source(str(tmp_path))
+    assert isinstance(source, ImageDirectorySource)
+    assert [frame[0, 0, 0] for frame in source] == [0, 1, 2]
+
+
+def test_video_file_source(tmp_path):
+    """
+    A video file is opened through cv2.VideoCapture with its frame rate.
+
+    return: None
+    """
+    path = str(tmp_path / "video.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25,
+                             (32, 24))
+    for frame in make_frames(5):
+        writer.write(frame)
+    writer.release()
+    source = open_source(path)
+    assert isinstance(source, VideoFileSource)
+    assert source.fps == 25
+    assert len(list(source)) == 5
+    source.release()
+
+
+def test_open_missing_source(tmp_path):
+    """
+    A path that doesn't exist raises OSError.
+
+    return: None
+    """
+    with pytest.raises(OSError):
+        open_source(str(tmp_path / "missing.mp4"))
+
+
+def test_source_without_frames_cannot_be_made():
+    """
+    A source that doesn't implement _next_frame fails when it is made, not
+    when its first frame is read.
+
+    return: None
+    """
+    class NoFrames(FrameSource):
+        """Forgets to read frames."""
+
+    with pytest.raises(TypeError):
+        NoFrames()
+
+
+@pytest.mark.parametrize("file_name", ["counts.csv", "counts.jsonl"])
+def test_count_writer(tmp_path, file_name):
+    """
+    The counts are written as CSV or JSON lines depending on the extension.
+
+    return: None
+    """
+    path = tmp_path / file_name
+    with CountWriter(path) as count_writer:
+        count_writer.write(0, 1, 5, 31, timestamp=0.0)
+        count_writer.write(1, 2, 6, 992, timestamp=0.04)
+    lines = path.read_text().splitlines()
+    if file_name.endswith(".csv"):
+        assert lines == ["frame,time,hands,decimal,binary",
+                         "0,0.0,1,5,31", "1,0.04,2,6,992"]
+    else:
+        assert json.loads(lines[1]) == {"frame": 1, "time": 0.04,
+                                        "hands": 2, "decimal": 6,
+                                        "binary": 992}
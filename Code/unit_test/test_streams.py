@@ -0,0 +1,191 @@
+from functools import partial
+from multiprocessing import shared_memory
+import os
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from shared_frames import FrameRing
+from sources import ArraySource, FrameSource
+from streams import StreamPool, make_frame_hands
+
+
+class BrightnessHands:
+    """A model that finds one hand, placed by the brightness of the image."""
+
+    def process(self, image):
+        x = image[0, 0, 0] / 255
+        landmark = SimpleNamespace(x=x, y=0.5, z=0.0)
+        return SimpleNamespace(
+            multi_hand_landmarks=[SimpleNamespace(landmark=[landmark] * 21)],
+            multi_handedness=None)
+
+
+class SequenceHands:
+    """
+    A model that finds one hand, with the number of frames it has seen
+    before as z, its process ID as y and the seconds from start to when it
+    was built as x.
+    """
+
+    def __init__(self, start=None):
+        self.frames = 0
+        self.built = 0.0 if start is None else time.time() - start
+
+    def process(self, _image):
+        landmark = SimpleNamespace(x=self.built, y=os.getpid(),
+                                   z=self.frames)
+        self.frames += 1
+        return SimpleNamespace(
+            multi_hand_landmarks=[SimpleNamespace(landmark=[landmark] * 21)],
+            multi_handedness=None)
+
+
+def test_streams_keep_their_own_frames_in_order():
+    """
+    Frames from every stream are counted on two workers, and each stream's
+    landmarks come back in order with its stream ID.
+
+    return: None
+    """
+    streams = [[0, 10, 20, 30], [100, 110], [200, 210, 220]]
+    sources = [ArraySource([np.full((8, 8, 3), value, dtype=np.uint8)
+                            for value in values]) for values in streams]
+    with StreamPool(BrightnessHands, workers=2) as pool:
+        results = list(pool.count(sources))
+    assert len(results) == sum(len(values) for values in streams)
+    for stream_id, values in enumerate(streams):
+        counts = [result for result in results
+                  if result.stream_id == stream_id]
+        assert [result.frame_index for result in counts] == \
+            list(range(len(values)))
+        # The landmarks are mirrored, like the flipped image
+        assert np.allclose([1 - result.landmarks[0, 0, 0]
+                            for result in counts],
+                           np.array(values) / 255)
+
+
+class FillingSource(FrameSource):
+    """Writes each frame into the buffer it is given, when it is given one."""
+
+    def __init__(self, values, shape=(8, 8, 3)):
+        super().__init__()
+        self.values = iter(values)
+        self.shape = shape
+        self.buffers = []
+
+    def _next_frame(self, image=None):
+        value = next(self.values, None)
+        if value is None:
+            return None
+        self.buffers.append(image is not None)
+        if image is None or image.shape != self.shape:
+            image = np.empty(self.shape, dtype=np.uint8)
+        image[...] = value
+        return image
+
+
+def test_frames_go_through_shared_memory(monkeypatch):
+    """
+    Frames after the first are read straight into the shared slots, a frame
+    too big for a slot is still counted, and the shared memory is removed
+    at the end.
+
+    return: None
+    """
+    filling = FillingSource([0, 40, 80, 120])
+    larger = ArraySource([np.full((8, 8, 3), 200, dtype=np.uint8),
+                          np.full((16, 16, 3), 220, dtype=np.uint8)])
+    rings = []
+
+    class KeptRing(FrameRing):
+        """Remembers each ring that is made."""
+
+        def __init__(self, *args):
+            super().__init__(*args)
+            rings.append(self)
+
+    monkeypatch.setattr("streams.FrameRing", KeptRing)
+    with StreamPool(BrightnessHands, workers=1) as pool:
+        results = list(pool.count([filling, larger]))
+    assert filling.buffers == [False, True, True, True]
+    values = {0: [0, 40, 80, 120], 1: [200, 220]}
+    for stream_id, expected in values.items():
+        assert np.allclose([1 - result.landmarks[0, 0, 0]
+                            for result in results
+                            if result.stream_id == stream_id],
+                           np.array(expected) / 255)
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(rings[0].name)
+
+
+def test_each_stream_stays_on_one_worker():
+    """
+    A stream's frames all go to the same worker and reach a model of their
+    own in order, so the model can track the hands between them.
+
+    return: None
+    """
+    lengths = [5, 3, 4]
+    sources = [ArraySource([np.zeros((8, 8, 3), dtype=np.uint8)] * length)
+               for length in lengths]
+    with StreamPool(SequenceHands, workers=2) as pool:
+        results = list(pool.count(sources))
+    workers = {}
+    for stream_id, length in enumerate(lengths):
+        counts = [result for result in results
+                  if result.stream_id == stream_id]
+        assert [result.landmarks[0, 0, 2] for result in counts] == \
+            list(range(length))
+        workers[stream_id] = {result.landmarks[0, 0, 1] for result in counts}
+        assert len(workers[stream_id]) == 1
+    # Streams 0 and 2 share the first worker
+    assert workers[0] == workers[2] != workers[1]
+
+
+def test_uploads_are_treated_as_separate_images(monkeypatch):
+    """
+    The models for uploaded images don't track hands from one image to the
+    next, since the images are unrelated.
+
+    return: None
+    """
+    options = []
+    monkeypatch.setattr("streams.make_hands",
+                        lambda *args, **kwargs: options.append(kwargs))
+    make_frame_hands(3)
+    assert options == [{"static_image_mode": True}]
+
+
+class TimedSource(ArraySource):
+    """Remembers when its first frame was read."""
+
+    def __init__(self, frames):
+        super().__init__(frames)
+        self.first_read = None
+
+    def _next_frame(self, image=None):
+        if self.first_read is None:
+            self.first_read = time.time()
+        return super()._next_frame(image)
+
+
+def test_stream_models_are_warm_before_reading():
+    """
+    Each stream's model is built on its worker before any frame is read,
+    rather than cold on the stream's first frame.
+
+    return: None
+    """
+    start = time.time()
+    sources = [TimedSource([np.zeros((8, 8, 3), dtype=np.uint8)] * 2)
+               for _ in range(3)]
+    with StreamPool(partial(SequenceHands, start), workers=2) as pool:
+        results = list(pool.count(sources, mirror=False))
+    first_read = min(source.first_read for source in sources) - start
+    for stream_id in range(3):
+        built = {float(result.landmarks[0, 0, 0]) for result in results
+                 if result.stream_id == stream_id}
+        assert len(built) == 1 and built.pop() < first_read
@@ -0,0 +1,121 @@
+import cv2
+import numpy as np
+import pytest
+
+from tracking import LandmarkTracker
+
+HEIGHT, WIDTH = 240, 320
+
+
+@pytest.fixture
+def texture():
+    rng = np.random.default_rng(5)
+    noise = rng.integers(0, 255, (HEIGHT, WIDTH), dtype=np.uint8)
+    return cv2.cvtColor(cv2.GaussianBlur(noise, (7, 7), 0),
+                        cv2.COLOR_GRAY2BGR)
+
+
+@pytest.fixture
+def hand():
+    rng = np.random.default_rng(6)
+    landmarks = np.zeros((1, 21, 3), dtype=np.float32)
+    landmarks[0, :, 0] = rng.uniform(0.3, 0.7, 21)
+    landmarks[0, :, 1] = rng.uniform(0.3, 0.7, 21)
+    return landmarks
+
+
+class CountingDetector:
+    """Stands in for inference, always returning the same landmarks."""
+
+    def __init__(self, landmarks):
+        self.landmarks = landmarks
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.landmarks
+
+
+def shift(image, d_x, d_y):
+    """
+    Moves the image content by a whole number of pixels.
+
+    return (ndarray): the moved image
+    """
+    return np.roll(image, (d_y, d_x), axis=(0, 1))
+
+
+def test_tracks_small_movements(texture, hand):
+    """
+    Between inference frames the points follow the image content.
+
+    return: None
+    """
+    detect = CountingDetector(hand)
+    tracker = LandmarkTracker(interval=5)
+    tracker.update(texture, detect)
+    tracked = tracker.update(shift(texture, 3, 2), detect)
+    assert detect.calls == 1
+    expected = hand[..., :2] + np.array([3 / WIDTH, 2 / HEIGHT])
+    assert np.allclose(tracked[..., :2], expected, atol=0.5 / WIDTH)
+
+
+def test_inference_runs_every_interval(texture, hand):
+    """
+    Inference runs on the first frame and then once every interval frames.
+
+    return: None
+    """
+    detect = CountingDetector(hand)
+    tracker = LandmarkTracker(interval=3)
+    for _ in range(9):
+        tracker.update(texture, detect)
+    assert detect.calls == 3
+    assert (tracker.inferred_frames, tracker.tracked_frames) == (3, 6)
+
+
+def test_fast_movement_runs_inference(texture, hand):
+    """
+    When the points move further than the threshold, inference runs early.
+
+    return: None
+    """
+    detect = CountingDetector(hand)
+    tracker = LandmarkTracker(interval=10, motion_threshold=0.005)
+    tracker.update(texture, detect)
+    tracker.update(shift(texture, 6, 0), detect)
+    assert detect.calls == 2
+
+
+def test_no_hands_waits_for_next_inference(texture):
+    """
+    With no hands found there is nothing to track until the next inference.
+
+    return: None
+    """
+    detect = CountingDetector(None)
+    tracker = LandmarkTracker(interval=4)
+    results = [tracker.update(texture, detect) for _ in range(5)]
+    assert results == [None] * 5
+    assert detect.calls == 2
+    tracker.reset()
+    tracker.update(texture, detect)
+    assert detect.calls == 3
+
+
+def test_greyscale_buffers_are_reused(texture, hand):
+    """
+    The greyscale frames take turns in two buffers, so tracking doesn't
+    allocate a new one for each frame.
+
+    return: None
+    """
+    detect = CountingDetector(hand)
+    tracker = LandmarkTracker(interval=5)
+    grays = []
+    for step in range(4):
+        tracker.update(shift(texture, step, 0), detect)
+        grays.append(tracker._previous[0])  # pylint: disable=protected-access
+    assert grays[0] is grays[2] and grays[1] is grays[3]
+    assert grays[0] is not grays[1]
+    assert detect.calls == 1